@@ -0,0 +1,9 @@
+"""Benchmarks of the analytics and rendering hot paths, run with asv (https://asv.readthedocs.io)
+
+- `asv run` times the current commit and adds the results to the history in benchmarks/results
+- `asv continuous --factor 1.2 main HEAD` compares a branch to the main baseline and fails on a regression of more
+  than 20%
+- `asv compare main HEAD` and `asv publish` show the differences and the history
+
+The benchmarks run at 1, 10 and 50 offers and 10 to 40 year loans, with the historical rates of the package.
+"""
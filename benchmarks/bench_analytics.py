@@ -0,0 +1,77 @@
+from loan_calculator import analytics
+
+from .common import N_OFFERS, SETTLEMENT_DATES, YEARS, make_expenses, make_offers, make_project, make_rates_change
+
+
+class CalculateRepayments:
+    """Loan kernel of a single offer"""
+
+    params = [YEARS, [False, True]]
+    param_names = ["years", "exact"]
+
+    def setup(self, years, exact):
+        project, offer = make_project(), make_offers(1, years)[0]
+        inputs = analytics.get_loan_inputs(
+            project=project, offer=offer, rates_change=make_rates_change(), expenses=make_expenses()
+        )
+        self.args = analytics.get_repayments_args(project=project, offer=offer, **inputs)
+        analytics.calculate_repayments(*self.args, exact)
+
+    def time_calculate_repayments(self, years, exact):
+        analytics.calculate_repayments(*self.args, exact)
+
+
+class MonthlyRateSeries:
+    """Monthly rates of a loan, with the historical rates for past settlement dates"""
+
+    params = [list(SETTLEMENT_DATES), YEARS]
+    param_names = ["settlement", "years"]
+
+    def setup(self, settlement, years):
+        self.settlement_date = SETTLEMENT_DATES[settlement]
+        self.months = analytics.loan_months(self.settlement_date, years)
+        self.rates_change = make_rates_change()
+        analytics.get_historical_rate_changes()
+
+    def time_get_monthly_rate_series(self, settlement, years):
+        analytics.get_monthly_rate_series(
+            months=self.months,
+            rate=6,
+            rates_change=self.rates_change,
+            with_fixed_rate=True,
+            fixed_rate=5.5,
+            fixed_rate_duration=3,
+            settlement_date=self.settlement_date,
+        )
+
+
+class ExpensesSeries:
+    """Expenses of a loan"""
+
+    params = [YEARS]
+    param_names = ["years"]
+
+    def setup(self, years):
+        self.months = analytics.loan_months(SETTLEMENT_DATES["future"], years)
+        self.expenses = make_expenses()
+
+    def time_get_expenses_series(self, years):
+        analytics.get_expenses_series(months=self.months, expenses=self.expenses)
+
+
+class ComputeLoanTimeseries:
+    """Loan timeseries of every offer of a comparison, without the results cache"""
+
+    params = [N_OFFERS, YEARS]
+    param_names = ["n_offers", "years"]
+
+    def setup(self, n_offers, years):
+        self.project, self.offers = make_project(), make_offers(n_offers, years)
+        self.rates_change, self.expenses = make_rates_change(), make_expenses()
+        self.time_compute_loan_timeseries(n_offers, years)
+
+    def time_compute_loan_timeseries(self, n_offers, years):
+        for offer in self.offers:
+            analytics.compute_loan_timeseries(
+                project=self.project, offer=offer, rates_change=self.rates_change, expenses=self.expenses
+            )
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from loan_calculator import analytics, plots
+from loan_calculator.components import table
+
+from .common import N_OFFERS, YEARS, make_expenses, make_offers, make_project, make_rates_change
+
+
+class Figures:
+    """Figures of the offer comparison"""
+
+    params = [N_OFFERS, YEARS]
+    param_names = ["n_offers", "years"]
+    timeout = 300
+
+    def setup(self, n_offers, years):
+        offers = make_offers(n_offers, years)
+        results = analytics.compute_loans(
+            project=make_project(), offers=offers, rates_change=make_rates_change(), expenses=make_expenses()
+        )
+        self.data_list = [data for data, _ in results]
+        self.feasible_list = [feasible for _, feasible in results]
+        self.title_list = [offer.name for offer in offers]
+
+    def time_make_dmc_chart(self, n_offers, years):
+        plots.make_dmc_chart(self.data_list, self.title_list, self.feasible_list)
+
+    def time_make_comparison_figure(self, n_offers, years):
+        plots.make_comparison_figure(self.data_list, self.title_list, self.feasible_list)
+
+
+class Table:
+    """Comparison table, with one column per offer"""
+
+    params = [N_OFFERS]
+    param_names = ["n_offers"]
+
+    def setup(self, n_offers):
+        self.data = pd.DataFrame(
+            [[f"${1_000 * (i + j):,.0f}" for j in range(n_offers)] for i in range(10)],
+            columns=[f"Offer {j}" for j in range(n_offers)],
+        ).assign(**{" ": [f"Metric {i}" for i in range(10)]})[[" "] + [f"Offer {j}" for j in range(n_offers)]]
+
+    def time_table(self, n_offers):
+        table(self.data, striped=True)
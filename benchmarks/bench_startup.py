@@ -0,0 +1,25 @@
+FIRST_LOAN_SETUP = """
+import os
+from loan_calculator import analytics
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
+os.environ.setdefault(analytics.HISTORICAL_RATES_ENV, str(analytics.HISTORICAL_RATES_PATH))
+project = Project(property_value=800_000, start_capital=250_000, monthly_income=12_000, monthly_costs=6_000)
+offer = Offer(name="Offer", rate=6, borrowed_share=80, loan_duration=30, with_offset_account=True)
+"""
+
+
+class Startup:
+    """Cold start of a worker, each measure running in a fresh interpreter"""
+
+    timeout = 300
+
+    def timeraw_import_application(self):
+        return "import loan_calculator.application"
+
+    def timeraw_first_loan(self):
+        """First loan computed, loading the numba kernels from their cache once a previous run has compiled them"""
+        return (
+            "analytics.compute_loans(project=project, offers=[offer], rates_change=RatesForecast(), "
+            "expenses=FutureExpenses())",
+            FIRST_LOAN_SETUP,
+        )
@@ -0,0 +1,55 @@
+import os
+from datetime import date
+
+from loan_calculator import analytics
+from loan_calculator.data_models import Expense, FutureExpenses, Offer, Project, RateDelta, RatesForecast
+
+os.environ.setdefault(analytics.HISTORICAL_RATES_ENV, str(analytics.HISTORICAL_RATES_PATH))
+
+N_OFFERS = [1, 10, 50]
+YEARS = [10, 20, 30, 40]
+SETTLEMENT_DATES = {"past": date(2010, 1, 1), "future": date(2040, 1, 1)}
+
+
+def make_project(settlement: str = "future") -> Project:
+    """Project settling at the given settlement date, see SETTLEMENT_DATES"""
+    return Project(
+        property_value=800_000,
+        start_capital=250_000,
+        monthly_income=12_000,
+        monthly_costs=6_000,
+        settlement_date=SETTLEMENT_DATES[settlement],
+        stamp_duty_rate=4,
+    )
+
+
+def make_offers(n_offers: int, years: int) -> list[Offer]:
+    """Offers of the given duration, alternating the offset account and a fixed rate period"""
+    return [
+        Offer(
+            name=f"Offer {i}",
+            rate=5.5 + 0.02 * i,
+            borrowed_share=80,
+            loan_duration=years,
+            yearly_fees=100 * (i % 4),
+            with_offset_account=i % 2 == 0,
+            with_fixed_rate=i % 3 == 0,
+            fixed_rate=5.2 if i % 3 == 0 else None,
+            fixed_rate_duration=3 if i % 3 == 0 else None,
+        )
+        for i in range(n_offers)
+    ]
+
+
+def make_rates_change() -> RatesForecast:
+    """Forecast of a rise and a fall of the rates"""
+    return RatesForecast(
+        changes=[RateDelta(date=date(2041, 6, 1), value=1), RateDelta(date=date(2046, 1, 1), value=-0.5)]
+    )
+
+
+def make_expenses(n_expenses: int = 20) -> FutureExpenses:
+    """Expenses spread over the forty years after the future settlement date"""
+    return FutureExpenses(
+        expenses=[Expense(date=date(2040 + 2 * i, 6, 1), value=5_000 * (1 + i % 5)) for i in range(n_expenses)]
+    )
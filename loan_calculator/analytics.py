@@ -1,231 +1,2195 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import date
-from functools import lru_cache
+from functools import lru_cache, wraps
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable
 
 import numpy as np
 import pandas as pd
-from numba import njit
 
 from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
 
+RESULTS_CACHE_SIZE = 256
+HISTORICAL_RATES_ENV = "LOAN_CALCULATOR_HISTORICAL_RATES"
+HISTORICAL_RATES_PATH = Path(__file__).parent / "assets" / "historical_rates.csv"
+REPAYMENT_COLUMNS = [
+    "principal_paid",
+    "offset",
+    "principal_payment",
+    "interest",
+    "fee",
+    "repayment",
+    "extra_repayment",
+    "outflow_present_value",
+    "real_repayment",
+    "real_offset",
+]
+N_REPAYMENT_COLUMNS = len(REPAYMENT_COLUMNS)
+COST_COLUMNS = [REPAYMENT_COLUMNS.index("interest"), REPAYMENT_COLUMNS.index("fee")]
+# Loans are made of a variable tranche and a fixed rate tranche, either being empty
+N_TRANCHES = 2
+# Each loan month accrues interest over "accrual" and gets "payments" repayments, "payment_weight" summing the time
+# from each repayment to the end of the month and "payment_period" being the time between repayments, in months of
+# 365/12 days
+SCHEDULE_ROWS = ["accrual", "payments", "payment_weight", "payment_period"]
+PAYMENTS_PER_YEAR = {"monthly": 12, "fortnightly": 26, "weekly": 52}
+# Tolerance of the rounding up of the repayments to the cent, for the float error of the annuity formula
+ROUNDING_TOLERANCE = 1e-6
+# Monthly rates discounting the outgoing cash to its present value and deflating the amounts to today's dollars
+DISCOUNT_ROWS = ["discount", "inflation"]
+# Events change the state of a loan from their "start" position on, see `get_offer_events`
+EVENT_FIELDS = [
+    "start",
+    "interest_only",
+    "monthly_fee",
+    "fixed_share",
+    "variable_offset",
+    "fixed_offset",
+    "with_offset_account",
+    "switching_cost",
+    "refinance",
+]
+# Project fields only flowing through the offset account
+BUDGET_FIELDS = ["monthly_income", "monthly_costs", "income_growth", "costs_growth", "budget_changes"]
 
-def compute_loan_timeseries(  # pylint: disable = too-many-arguments, too-many-locals, unused-argument
+_results_cache: OrderedDict[str, Any] = OrderedDict()
+_results_lock = Lock()
+
+
+def compute_loans(
+    *,
+    project: Project,
+    offers: list[Offer],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    timings: dict[str, float] = None,
+) -> list[tuple[pd.DataFrame, bool]]:
+    """Compute the loan timeseries of several offers
+
+    Results are cached on the inputs each offer depends on (see `get_dependency_key`), so that only the offers
+    affected by a change of project, rates or expenses are recomputed. Cached dataframes are shared and must not be
+    modified in place.
+
+    :param timings: Seconds spent in the "rates", "kernel" and "dataframe" stages are added to it if given
+    """
+    results = []
+    for offer in offers:
+        with timed_stage(timings, "rates"):
+            inputs = get_loan_inputs(project=project, offer=offer, rates_change=rates_change, expenses=expenses)
+        key = get_dependency_key(project=project, offer=offer, **inputs)
+        result = _get_cached(key)
+        if result is None:
+            result = compute_loan_timeseries(project=project, offer=offer, **inputs, timings=timings)
+            _set_cached(key, result)
+        results.append(result)
+    return results
+
+
+def compute_by_offer(  # pylint: disable = too-many-arguments
+    func: Callable,
+    *,
+    project: Project,
+    offers: list[Offer],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    batched: bool = False,
+    **kwargs,
+) -> list:
+    """Results of an analysis of several offers, cached per offer like `compute_loans`
+
+    The cache key of an offer is its dependency key including the budget (see `get_dependency_key`), the analysis and
+    its other arguments. Only the offers missing from the cache are computed, in one call for a batched analysis.
+    Cached results are shared and must not be modified in place.
+
+    :param func: Analysis taking the project, rates change and expenses, and an `offer` or, when batched, the `offers`
+        columns (see `get_offer_columns`) returning a dict of arrays along the offers, see `split_by_offer`
+    :param project: Home loan project
+    :param offers: Loan offers
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param batched: Whether the analysis runs all the offers at once
+    :param kwargs: Other arguments of the analysis
+    :return: Result of each offer
+    """
+    inputs = {"project": project, "rates_change": rates_change, "expenses": expenses}
+    results, missing = [], []
+    for offer in offers:
+        digest = get_dependency_key(
+            project=project, offer=offer, **get_loan_inputs(offer=offer, **inputs), with_budget=True
+        )
+        key = f"{func.__name__}:{digest}:{sorted(kwargs.items())!r}"
+        results.append(_get_cached(key))
+        if results[-1] is None:
+            missing.append((len(results) - 1, key, offer))
+    if not missing:
+        return results
+
+    missing_offers = [offer for _, _, offer in missing]
+    if batched:
+        computed = split_by_offer(func(offers=get_offer_columns(missing_offers), **inputs, **kwargs))
+    else:
+        computed = [func(offer=offer, **inputs, **kwargs) for offer in missing_offers]
+    for (position, key, _), result in zip(missing, computed):
+        results[position] = result
+        _set_cached(key, result)
+    return results
+
+
+def split_by_offer(result: dict) -> list[dict]:
+    """Result of a batched analysis split per offer, the arrays being along the offers and the other values shared"""
+    n_offers = next(value.shape[0] for value in result.values() if isinstance(value, np.ndarray))
+    return [
+        {key: value[i] if isinstance(value, np.ndarray) else value for key, value in result.items()}
+        for i in range(n_offers)
+    ]
+
+
+def stack_by_offer(results: list[dict]) -> dict:
+    """Result of a batched analysis from its results per offer, the inverse of `split_by_offer`"""
+    return {
+        key: np.stack([result[key] for result in results]) if isinstance(value, (np.ndarray, np.generic)) else value
+        for key, value in results[0].items()
+    }
+
+
+@contextmanager
+def timed_stage(timings: dict[str, float] | None, stage: str):
+    """Add the seconds spent in the block to `timings[stage]`, does nothing if timings is None"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0) + time.perf_counter() - start
+
+
+def _get_cached(key: str) -> Any:
+    with _results_lock:
+        result = _results_cache.get(key)
+        if result is not None:
+            _results_cache.move_to_end(key)
+    return result
+
+
+def _set_cached(key: str, result: Any):
+    with _results_lock:
+        _results_cache[key] = result
+        while len(_results_cache) > RESULTS_CACHE_SIZE:
+            _results_cache.popitem(last=False)
+
+
+def get_loan_inputs(
     *,
     project: Project,
     offer: Offer,
     rates_change: RatesForecast,
     expenses: FutureExpenses,
+) -> dict[str, np.ndarray]:
+    """Compute the month ordinals, monthly rate and expenses arrays of a loan
+
+    The monthly rate has one row per tranche: the variable rate, then the fixed rate tranche's.
+    """
+    months = loan_months(project.settlement_date, offer.loan_duration)
+    monthly_rate = np.stack(
+        [
+            get_monthly_rate_series(
+                months=months,
+                rate=offer.rate,
+                rates_change=rates_change,
+                settlement_date=project.settlement_date,
+            ),
+            get_monthly_rate_series(
+                months=months,
+                rate=offer.rate,
+                rates_change=rates_change,
+                with_fixed_rate=offer.with_fixed_rate,
+                fixed_rate=offer.fixed_rate,
+                fixed_rate_duration=offer.fixed_rate_duration,
+                settlement_date=project.settlement_date,
+            ),
+        ]
+    )
+    expenses_series = get_expenses_series(months=months, expenses=expenses)
+    return {"months": months, "monthly_rate": monthly_rate, "expenses_series": expenses_series}
+
+
+def get_dependencies(*, project: Project, offer: Offer) -> dict[str, tuple[int, int] | None]:
+    """Month ranges (start included, end excluded) over which the rates and expenses affect a loan
+
+    Rate changes only matter once the fixed rate window is over, unless part of the loan is variable, and expenses only
+    flow through the offset account.
+    """
+    months = loan_months(project.settlement_date, offer.loan_duration)
+    start, end = int(months[0]), int(months[-1]) + 1
+    whole_loan_fixed = offer.with_fixed_rate and offer.fixed_share in [None, 100]
+    rates_start = start + 12 * offer.fixed_rate_duration if whole_loan_fixed else start
+    return {
+        "rates": (min(rates_start, end), end),
+        "expenses": (start, end) if offer.with_offset_account else None,
+    }
+
+
+def get_dependency_key(
+    *,
+    project: Project,
+    offer: Offer,
+    months: np.ndarray,
+    monthly_rate: np.ndarray,
+    expenses_series: np.ndarray,
+    with_budget: bool = False,
+) -> str:
+    """Fingerprint of the inputs a loan result depends on
+
+    The offer name is left out, as well as the budget for loans without offset account. The rates and
+    expenses only enter through their values over the month ranges given by `get_dependencies`.
+    With the budget, for the analyses of the savings, the budget and expenses count for loans without offset account
+    too.
+    """
+    dependencies = get_dependencies(project=project, offer=offer)
+    if with_budget:
+        dependencies["expenses"] = (int(months[0]), int(months[-1]) + 1)
+    exclude_project = None if offer.with_offset_account or with_budget else set(BUDGET_FIELDS)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(project.model_dump_json(exclude=exclude_project).encode())
+    digest.update(offer.model_dump_json(exclude={"name"}).encode())
+    for name, values in [("rates", monthly_rate), ("expenses", expenses_series)]:
+        if dependencies[name] is not None:
+            start, end = dependencies[name]
+            digest.update(np.ascontiguousarray(values[..., start - months[0] : end - months[0]]).tobytes())
+    return digest.hexdigest()
+
+
+def compute_loan_timeseries(  # pylint: disable = too-many-arguments, too-many-locals, unused-argument
+    *,
+    project: Project,
+    offer: Offer,
+    rates_change: RatesForecast = None,
+    expenses: FutureExpenses = None,
+    months: np.ndarray = None,
+    monthly_rate: np.ndarray = None,
+    expenses_series: np.ndarray = None,
+    extra_repayment: np.ndarray = None,
+    schedule: np.ndarray = None,
+    events: np.ndarray = None,
+    exact: bool = False,
+    timings: dict[str, float] = None,
     **kwargs,
 ) -> tuple[pd.DataFrame, bool]:
     """Compute the loan timeseries
 
-    :param property_value: Property value in $
-    :param rate: Annual loan rate in %
-    :param borrowed_share: Borrowed share in %
-    :param loan_duration: Load duration in years
-    :param start_capital: Starting capital in $
-    :param stamp_duty_rate: Stamp duty rate in %
-    :param monthly_income: After-tax monthly income in $
-    :param monthly_costs: Monthly costs before repayment in $
-    :param with_offset_account: Whether the loan includes an offset account
-    :param yearly_fees: Yearly loan management fees in $
-    :param settlement_date: Settlement date
-    :return: Loan data timeseries
-    """
-
-    # Define the loan period
-    date_period = pd.date_range(
-        project.settlement_date,
-        project.settlement_date + pd.Timedelta(days=offer.loan_duration * 365),
-        freq="MS",
-        inclusive="left",
-    )
-
-    # Define the loan princpal
+    :param project: Home loan project
+    :param offer: Loan offer
+    :param rates_change: Forecast of rate changes, not needed if the inputs from `get_loan_inputs` are given
+    :param expenses: Future expenses, not needed if the inputs from `get_loan_inputs` are given
+    :param months: Month ordinals of the loan
+    :param monthly_rate: Monthly rate of each tranche over the loan months
+    :param expenses_series: Expenses over the loan months
+    :param extra_repayment: Extra principal repayments over the loan months, none by default
+    :param schedule: Repayment schedule over the loan months, the offer's by default (see `get_repayment_schedule`)
+    :param events: Events of the loan, the offer's by default (see `get_offer_events`)
+    :param exact: Compute in whole cents with the rounding of a lender, see `_simulate_loan`
+    :param timings: Seconds spent in the "rates", "kernel" and "dataframe" stages are added to it if given
+    :return: Loan data timeseries, indexed by month ordinal
+    """
+    if months is None:
+        with timed_stage(timings, "rates"):
+            inputs = get_loan_inputs(project=project, offer=offer, rates_change=rates_change, expenses=expenses)
+        months, monthly_rate, expenses_series = inputs["months"], inputs["monthly_rate"], inputs["expenses_series"]
+
+    with timed_stage(timings, "kernel"):
+        repayments = calculate_repayments(
+            *get_repayments_args(
+                project=project,
+                offer=offer,
+                months=months,
+                monthly_rate=monthly_rate,
+                expenses_series=expenses_series,
+                extra_repayment=extra_repayment,
+                schedule=schedule,
+                events=events,
+            ),
+            exact,
+        )
+    with timed_stage(timings, "dataframe"):
+        data = pd.DataFrame(
+            repayments.T,
+            columns=REPAYMENT_COLUMNS,
+            index=pd.Index(months, name="month"),
+        ).assign(deposit=0.0, stamp_duty=0.0)
+        data.iloc[0, data.columns.get_loc("deposit")] = project.property_value * (100 - offer.borrowed_share) / 100
+        data.iloc[0, data.columns.get_loc("stamp_duty")] = project.property_value * (project.stamp_duty_rate) / 100
+
+    feasible = (
+        project.start_capital >= project.property_value * (100 - offer.borrowed_share + project.stamp_duty_rate) / 100
+    )
+
+    return data, feasible
+
+
+def get_repayments_args(  # pylint: disable = too-many-arguments
+    *,
+    project: Project,
+    offer: Offer,
+    months: np.ndarray,
+    monthly_rate: np.ndarray,
+    expenses_series: np.ndarray,
+    extra_repayment: np.ndarray = None,
+    schedule: np.ndarray = None,
+    events: np.ndarray = None,
+) -> tuple:
+    """Positional arguments of `calculate_repayments` for a loan, from the inputs of `compute_loan_timeseries`"""
+    # Define the loan princpal, split in tranches
     principal = project.property_value * offer.borrowed_share / 100
+    offer_columns = get_offer_columns([offer])
+    tranche_shares, offset_tranche = get_tranches(offer_columns)
+    if schedule is None:
+        schedule = get_repayment_schedule(months, PAYMENTS_PER_YEAR[offer.repayment_frequency], offer.daily_interest)
+    if events is None:
+        events = get_offer_events(offer_columns)[0]
 
     # Define how much savings can be left in the offset account after deposit + stamp duty
     start_offset = (
         project.start_capital - project.property_value * (100 - offer.borrowed_share + project.stamp_duty_rate) / 100
     ) * offer.with_offset_account
 
-    # Define the monthly loan rate and fee
-    monthly_rate = get_monthly_rate_series(
-        date_period=date_period,
-        rate=offer.rate,
-        rates_change=rates_change,
-        with_fixed_rate=offer.with_fixed_rate,
-        fixed_rate=offer.fixed_rate,
-        fixed_rate_duration=offer.fixed_rate_duration,
-        settlement_date=project.settlement_date,
-    )
     monthly_fee = offer.yearly_fees / 12
+    income_series, costs_series = get_budget_series(months=months, project=project)
 
-    expenses_series = get_expenses_series(date_period=date_period, expenses=expenses)
+    return (
+        monthly_rate,
+        schedule,
+        start_offset,
+        principal * tranche_shares[0],
+        offset_tranche[0],
+        monthly_fee,
+        income_series,
+        costs_series,
+        expenses_series,
+        offer.with_offset_account,
+        np.zeros(months.shape[0]) if extra_repayment is None else extra_repayment,
+        events,
+        get_discount_series(months=months, project=project),
+    )
 
-    repayments = np.c_[
-        calculate_repayments(
-            monthly_rate.to_numpy(),
-            start_offset,
-            principal,
-            monthly_fee,
-            project.monthly_income,
-            project.monthly_costs,
-            expenses_series.to_numpy(),
-            offer.with_offset_account,
+
+def get_offer_columns(offers: list[Offer]) -> dict[str, np.ndarray]:
+    """Offers as one array per field, offers without fixed rate having a fixed rate duration of 0 and the fixed share
+    being NaN when the whole loan is fixed"""
+    columns = {
+        "rate": np.array([offer.rate for offer in offers], dtype=np.float64),
+        "borrowed_share": np.array([offer.borrowed_share for offer in offers], dtype=np.float64),
+        "loan_duration": np.array([offer.loan_duration for offer in offers], dtype=np.float64),
+        "yearly_fees": np.array([offer.yearly_fees for offer in offers], dtype=np.float64),
+        "interest_only_duration": np.array([offer.interest_only_duration or 0 for offer in offers], dtype=np.float64),
+        "with_fixed_rate": np.array([offer.with_fixed_rate for offer in offers], dtype=bool),
+        "fixed_rate": np.array(
+            [offer.fixed_rate if offer.with_fixed_rate else np.nan for offer in offers], dtype=np.float64
+        ),
+        "fixed_rate_duration": np.array(
+            [offer.fixed_rate_duration if offer.with_fixed_rate else 0 for offer in offers], dtype=np.float64
+        ),
+        "with_offset_account": np.array([offer.with_offset_account for offer in offers], dtype=bool),
+        "payments_per_year": np.array(
+            [PAYMENTS_PER_YEAR[offer.repayment_frequency] for offer in offers], dtype=np.float64
+        ),
+        "daily_interest": np.array([offer.daily_interest for offer in offers], dtype=bool),
+        "fixed_share": np.array(
+            [
+                offer.fixed_share if offer.with_fixed_rate and offer.fixed_share is not None else np.nan
+                for offer in offers
+            ],
+            dtype=np.float64,
+        ),
+    }
+    columns["initial_rate"] = np.where(columns["with_fixed_rate"], columns["fixed_rate"], columns["rate"])
+    return columns
+
+
+def get_tranches(offers: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Share of the principal in each tranche and whether the offset account applies to it, shape (n_offers, N_TRANCHES)
+
+    The offset account applies to the variable tranche, and to the fixed rate tranche when the whole loan is fixed.
+    """
+    whole_loan_fixed = np.isnan(offers["fixed_share"])
+    fixed_share = np.where(offers["with_fixed_rate"], np.where(whole_loan_fixed, 100, offers["fixed_share"]), 0) / 100
+    offset_tranche = np.c_[np.ones(fixed_share.shape[0], dtype=bool), whole_loan_fixed]
+    return np.c_[1 - fixed_share, fixed_share], offset_tranche
+
+
+def get_offer_events(
+    offers: dict[str, np.ndarray], start: np.ndarray | int = 0, refinance: bool = False, switching_cost: float = 0
+) -> np.ndarray:
+    """Events of offers taking effect at the `start` position, shape (n_offers, 2, len(EVENT_FIELDS))
+
+    The first event sets the state of the offer with its interest only period, the second one ends that period. When
+    refinancing, the first event splits the remaining balance between the offer's tranches and charges the switching
+    cost, otherwise it is only needed with an interest only period. Unused events start at infinity.
+    """
+    n_offers = offers["rate"].shape[0]
+    start = np.broadcast_to(np.asarray(start, dtype=np.float64), (n_offers,))
+    tranche_shares, offset_tranche = get_tranches(offers)
+    interest_only = offers["interest_only_duration"] > 0
+    state = np.c_[
+        start if refinance else np.where(interest_only, start, np.inf),
+        interest_only,
+        offers["yearly_fees"] / 12,
+        tranche_shares[:, 1],
+        offset_tranche & offers["with_offset_account"][:, None],
+        offers["with_offset_account"],
+        np.full(n_offers, float(switching_cost)),
+        np.full(n_offers, refinance),
+    ]
+    end = state.copy()
+    end[:, 0] = np.where(interest_only, start + 12 * offers["interest_only_duration"], np.inf)
+    end[:, [1, 7, 8]] = 0
+    return np.stack([state, end], axis=1)
+
+
+def get_repayment_schedule(months: np.ndarray, payments_per_year: int = 12, daily_interest: bool = False) -> np.ndarray:
+    """Interest accrual and repayments of each month of a loan (see SCHEDULE_ROWS), shape (..., 4, n_months)
+
+    Interest is the monthly rate on the balance, or accrues daily over the days of the month. Monthly repayments are due
+    at the end of each month, weekly and fortnightly ones every 7 or 14 days from the start of the loan and with daily
+    interest. The schedule only depends on day counts, the interest of a month having a closed form given the balance
+    at its start and its repayments.
+
+    :param months: Month ordinals of a loan, or of several loans along the last axis
+    :param payments_per_year: Number of repayments per year, 12, 26 or 52
+    :param daily_interest: Accrue interest daily with monthly repayments
+    """
+    months = np.asarray(months)
+    edges = np.concatenate([months, months[..., -1:] + 1], axis=-1)
+    days = edges.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    days = days - days[..., :1]
+    ones = np.ones(months.shape)
+    if payments_per_year == 12:
+        accrual = np.diff(days, axis=-1) * 12 / 365 if daily_interest else ones
+        return np.stack([accrual, ones, np.zeros(months.shape), ones], axis=-2)
+
+    # Repayments are due on the days k * interval falling in (start, end] of each month
+    interval = 364 // payments_per_year
+    due_before, due_end = days[..., :-1] // interval, days[..., 1:] // interval
+    payments = due_end - due_before
+    weight = payments * days[..., 1:] - interval * (due_end * (due_end + 1) - due_before * (due_before + 1)) // 2
+    return (
+        np.stack([np.diff(days, axis=-1), payments, weight, np.full(months.shape, interval)], axis=-2)
+        * np.array([12 / 365, 1, 12 / 365, 12 / 365])[:, None]
+    )
+
+
+def get_schedule_table(months: np.ndarray, offers: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct repayment schedules of the offers over the months and the position of each offer's schedule
+
+    The monthly schedule always comes first. With months of shape (n_loans, n_months), the table holds the schedules
+    of each kind for every loan, kind-major.
+    """
+    kinds, index = np.unique(
+        np.r_[[[12, 0]], np.c_[offers["payments_per_year"], offers["daily_interest"]]], axis=0, return_inverse=True
+    )
+    table = np.stack([get_repayment_schedule(months, int(n), bool(daily)) for n, daily in kinds])
+    return table.reshape(-1, *table.shape[-2:]), index.ravel()[1:]
+
+
+def get_batch_inputs(
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rate_delta: np.ndarray,
+    expenses_series: np.ndarray,
+    property_value: np.ndarray | float = None,
+) -> dict[str, np.ndarray]:
+    """Inputs of `calculate_repayments_batch` for offers given as columns (see `get_offer_columns`)
+
+    :param project: Home loan project
+    :param offers: Offer columns
+    :param rate_delta: Rate changes in % points over the months of the longest loan, from `get_rate_delta_series`
+    :param expenses_series: Expenses over the same months
+    :param property_value: Property value of each offer, the project's by default
+    """
+    property_value = project.property_value if property_value is None else property_value
+    n_offers, n_months = offers["rate"].shape[0], rate_delta.shape[0]
+    n_periods = np.minimum(np.round(offers["loan_duration"] * 12).astype(np.int64), n_months)
+    fixed = offers["with_fixed_rate"][:, None] & (
+        np.arange(n_months)[None, :] < 12 * offers["fixed_rate_duration"][:, None]
+    )
+    variable_rate_pct = np.broadcast_to(
+        get_variable_rate_pct(offers["rate"][:, None], rate_delta[None, :]), fixed.shape
+    )
+    rate_pct = np.stack([variable_rate_pct, np.where(fixed, offers["fixed_rate"][:, None], variable_rate_pct)], axis=1)
+    upfront = property_value * (100 - offers["borrowed_share"] + project.stamp_duty_rate) / 100
+    tranche_shares, offset_tranche = get_tranches(offers)
+    months = first_month_on_or_after(project.settlement_date) + np.arange(n_months)
+    schedule, schedule_index = get_schedule_table(months, offers)
+    income_series, costs_series = get_budget_series(months=months, project=project)
+    return {
+        "monthly_rate": rate_pct / 12 / 100,
+        "schedule": schedule,
+        "schedule_index": schedule_index,
+        "n_periods": n_periods,
+        "start_offset": (project.start_capital - upfront) * offers["with_offset_account"],
+        "principal": np.asarray(property_value * offers["borrowed_share"] / 100)[..., None] * tranche_shares,
+        "offset_tranche": offset_tranche,
+        "monthly_fee": offers["yearly_fees"] / 12,
+        "monthly_income": np.broadcast_to(income_series, (n_offers, n_months)),
+        "monthly_costs": np.broadcast_to(costs_series, (n_offers, n_months)),
+        "expenses": np.broadcast_to(expenses_series, (n_offers, n_months)),
+        "with_offset_account": offers["with_offset_account"],
+        "extra_repayment": np.broadcast_to(np.zeros(n_months), (n_offers, n_months)),
+        "events": get_offer_events(offers),
+        "discount_rate": get_discount_series(months=np.broadcast_to(months, (n_offers, n_months)), project=project),
+    }
+
+
+def get_batch_months(*, project: Project, offers: dict[str, np.ndarray]) -> np.ndarray:
+    """Month ordinals covering the longest of the offers"""
+    return loan_months(project.settlement_date, offers["loan_duration"].max(initial=0))
+
+
+def compute_loans_batch(
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Compute the repayments data of many offers in a single parallel kernel call
+
+    :param project: Home loan project
+    :param offers: Offer columns, see `get_offer_columns`
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :return: Month ordinals and repayments data of shape (n_offers, N_REPAYMENT_COLUMNS, n_months)
+    """
+    months = get_batch_months(project=project, offers=offers)
+    inputs = get_batch_inputs(
+        project=project,
+        offers=offers,
+        rate_delta=get_rate_delta_series(
+            months=months, rates_change=rates_change, settlement_date=project.settlement_date
+        ),
+        expenses_series=get_expenses_series(months=months, expenses=expenses),
+    )
+    return months, calculate_repayments_batch(**inputs)
+
+
+def get_cost_lower_bounds(
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rate_delta: np.ndarray,
+    expenses_series: np.ndarray,
+    years: float = None,
+) -> np.ndarray:
+    """Lower bounds of the interest and fees paid on each offer, over the loan or its first years
+
+    The bounds use the lowest rate each offer can pay over the horizon:
+    - without offset account, the remaining balance only grows with the rates so the interest is at least that of a
+      constant rate annuity at that lowest rate, and fees are paid every month;
+    - with an offset account, the principal paid plus the offset balance grows by at most the income minus the costs
+      and expenses each month, which bounds the balance the interest is charged on. Fees are not bounded.
+    Offers with daily interest or more frequent repayments only get the fees bound.
+    """
+    n_months = rate_delta.shape[0]
+    inputs = get_batch_inputs(project=project, offers=offers, rate_delta=rate_delta, expenses_series=expenses_series)
+    n_periods = inputs["n_periods"]
+    horizon = n_periods if years is None else np.minimum(n_periods, round(years * 12))
+
+    # Lowest rate over the horizon, variable months starting after the fixed rate window unless the loan is split
+    whole_loan_fixed = offers["with_fixed_rate"] & np.isnan(offers["fixed_share"])
+    variable_start = np.where(whole_loan_fixed, 12 * offers["fixed_rate_duration"], 0).astype(np.int64)
+    min_rate_pct = np.where(offers["with_fixed_rate"], offers["fixed_rate"], np.inf)
+    windows, window_index = np.unique(np.c_[variable_start, horizon], axis=0, return_inverse=True)
+    window_min = np.array([rate_delta[a:b].min() if a < b else np.inf for a, b in windows])
+    # Same rates as the kernel, the variable rates not going below zero
+    min_rate_pct = np.minimum(min_rate_pct, get_variable_rate_pct(offers["rate"], window_min[window_index.ravel()]))
+    rate = min_rate_pct / 12 / 100
+
+    # Without offset: constant rate annuity, the bound being linear in the principal of the tranches
+    principal = inputs["principal"].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth_n = (1 + rate) ** n_periods
+        growth_h = (1 + rate) ** horizon
+        payment = principal * rate * growth_n / (growth_n - 1)
+        balance = principal * (growth_n - growth_h) / (growth_n - 1)
+        annuity_interest = np.where(rate > 0, horizon * payment - (principal - balance), 0)
+    no_offset_bound = annuity_interest + inputs["monthly_fee"] * horizon
+
+    # With offset: bound on the principal paid plus the offset balance at the start of each month
+    income_series, costs_series = get_budget_series(
+        months=first_month_on_or_after(project.settlement_date) + np.arange(n_months), project=project
+    )
+    savings = np.r_[0, np.cumsum(income_series - costs_series - expenses_series)[:-1]]
+    offset_bound = np.zeros(offers["rate"].shape[0])
+    with_offset = np.flatnonzero(offers["with_offset_account"])
+    for chunk in np.array_split(with_offset, max(1, with_offset.shape[0] // 1024)):
+        exposed = np.maximum(principal[chunk, None] - inputs["start_offset"][chunk, None] - savings[None, :], 0)
+        exposed[np.arange(n_months)[None, :] >= horizon[chunk, None]] = 0
+        offset_bound[chunk] = rate[chunk] * exposed.sum(axis=1)
+
+    monthly_schedule = (offers["payments_per_year"] == 12) & ~offers["daily_interest"]
+    fees_bound = np.where(offers["with_offset_account"], 0, inputs["monthly_fee"] * horizon)
+    interest_bound = np.where(offers["with_offset_account"], offset_bound, no_offset_bound)
+    return np.where(monthly_schedule, interest_bound, fees_bound)
+
+
+def rank_offers(  # pylint: disable = too-many-arguments, too-many-locals
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    k: int = 10,
+    years: float = None,
+    chunk_size: int = 256,
+) -> tuple[np.ndarray, np.ndarray, int]:
+    """Find the k offers paying the least interest and fees, over the loan or its first years
+
+    Offers are simulated by chunks in increasing order of their cost lower bound (see `get_cost_lower_bounds`), and
+    the ones whose lower bound exceeds the k-th best cost found so far are never simulated.
+
+    :param project: Home loan project
+    :param offers: Offer columns, see `get_offer_columns`
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param k: Number of offers to return
+    :param years: Horizon of the cost in years, the whole loan if None
+    :param chunk_size: Number of offers simulated per kernel call
+    :return: Positions of the best offers sorted by cost, their cost and the number of offers simulated
+    """
+    months = get_batch_months(project=project, offers=offers)
+    rate_delta = get_rate_delta_series(
+        months=months, rates_change=rates_change, settlement_date=project.settlement_date
+    )
+    expenses_series = get_expenses_series(months=months, expenses=expenses)
+    bounds = get_cost_lower_bounds(
+        project=project, offers=offers, rate_delta=rate_delta, expenses_series=expenses_series, years=years
+    )
+    horizon = months.shape[0] if years is None else round(years * 12)
+
+    order = np.argsort(bounds, kind="stable")
+    best_positions, best_costs = np.empty(0, dtype=np.int64), np.empty(0)
+    threshold = np.inf
+    n_simulated = 0
+    for start in range(0, order.shape[0], chunk_size):
+        chunk = order[start : start + chunk_size]
+        chunk = chunk[bounds[chunk] <= threshold]
+        if not chunk.shape[0]:
+            break
+        data = calculate_repayments_batch(
+            **get_batch_inputs(
+                project=project,
+                offers={key: values[chunk] for key, values in offers.items()},
+                rate_delta=rate_delta,
+                expenses_series=expenses_series,
+            )
         )
+        costs = data[:, COST_COLUMNS, :horizon].sum(axis=(1, 2))
+        n_simulated += chunk.shape[0]
+
+        best_positions, best_costs = np.r_[best_positions, chunk], np.r_[best_costs, costs]
+        keep = np.argsort(best_costs, kind="stable")[:k]
+        best_positions, best_costs = best_positions[keep], best_costs[keep]
+        if best_costs.shape[0] == k:
+            threshold = best_costs[-1]
+
+    return best_positions, best_costs, n_simulated
+
+
+def bisect_batch(func, low: np.ndarray, high: np.ndarray, n_iter: int = 40, end: str = None) -> np.ndarray:
+    """Roots of a batch of increasing functions by bisection, NaN where the root is not within [low, high]
+
+    :param func: Vectorised function, value i being the function i evaluated at x[i]
+    :param low: Lower ends of the brackets
+    :param high: Upper ends of the brackets
+    :param n_iter: Number of bisection steps, each one calling func once on the whole batch
+    :param end: End of the final brackets returned, "low" where func < 0 or "high" where func >= 0, so that a
+        constraint holds at the result, their middle by default
+    """
+    low, high = np.array(low, dtype=np.float64), np.array(high, dtype=np.float64)
+    bracketed = (func(low) <= 0) & (func(high) >= 0)
+    for _ in range(n_iter):
+        middle = (low + high) / 2
+        above = func(middle) >= 0
+        high, low = np.where(above, middle, high), np.where(above, low, middle)
+    root = {"low": low, "high": high}.get(end, (low + high) / 2)
+    return np.where(bracketed, root, np.nan)
+
+
+def compute_refinance(  # pylint: disable = too-many-arguments, too-many-locals
+    *,
+    project: Project,
+    offer: Offer,
+    new_offer: Offer,
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    switch_months: np.ndarray = None,
+    rate_differentials: np.ndarray = None,
+    switching_cost: float = 0,
+) -> dict[str, np.ndarray]:
+    """Break-even analysis of refinancing a loan from `offer` to `new_offer`
+
+    At the switch month, the remaining balance of the loan is refinanced with the new offer over the remaining term,
+    its offset balance carries over when both offers have an offset account and the switching cost is charged as a fee,
+    with the same refinance event as `compute_refinance_chain`. The new offer's fixed rate and interest only periods
+    start at the switch. Costs are the interest, fees and switching cost paid until the end of the loan, savings are
+    relative to keeping the current offer.
+
+    :param project: Home loan project
+    :param offer: Current loan offer
+    :param new_offer: Offer refinanced to
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param switch_months: Switch months counted from the start of the loan, every 6 months by default
+    :param rate_differentials: Shifts in % points applied to the new offer rates, from -1 to 1 by default
+    :param switching_cost: Cost of switching ($)
+    :return: Dict of arrays:
+        - "months": month ordinals of the switches
+        - "rate_differentials": rate shifts
+        - "savings": savings for each switch month and rate shift, shape (n_switches, n_differentials)
+        - "break_even_month": month ordinal after which the savings stay positive, -1 if they never do
+        - "break_even_rate": rate shift at which the new offer saves nothing, for each switch month
+        - "break_even_cost": switching cost at which the new offer saves nothing, for each switch month
+    """
+    inputs = get_loan_inputs(project=project, offer=offer, rates_change=rates_change, expenses=expenses)
+    months, expenses_series = inputs["months"], inputs["expenses_series"]
+    n_months = months.shape[0]
+    data, _ = compute_loan_timeseries(project=project, offer=offer, **inputs)
+    stay_cost = data[REPAYMENT_COLUMNS].to_numpy()[:, COST_COLUMNS].sum(axis=1).cumsum()
+
+    switch_months = np.arange(6, n_months, 6) if switch_months is None else np.asarray(switch_months, dtype=np.int64)
+    switch_months = switch_months[(switch_months > 0) & (switch_months < n_months)]
+    rate_differentials = np.linspace(-1, 1, 21) if rate_differentials is None else np.asarray(rate_differentials)
+
+    # State of the current loan at the switch
+    principal_paid, offset = data["principal_paid"].to_numpy(), data["offset"].to_numpy()
+    principal = project.property_value * offer.borrowed_share / 100
+    balance = principal - principal_paid[switch_months - 1]
+    tranche_shares, offset_tranche = get_tranches(get_offer_columns([new_offer]))
+    schedule = get_repayment_schedule(
+        months, PAYMENTS_PER_YEAR[new_offer.repayment_frequency], new_offer.daily_interest
+    )
+    carried_offset = offset[switch_months - 1] if offer.with_offset_account else np.zeros(switch_months.shape[0])
+    events = get_offer_events(get_offer_columns([new_offer]), refinance=True)[0]
+    income_series, costs_series = get_budget_series(months=months, project=project)
+    discount_series = get_discount_series(months=months, project=project)
+
+    # Rates of the new offer tranches, with its fixed rate period starting at the switch
+    rate_delta = get_rate_delta_series(
+        months=months, rates_change=rates_change, settlement_date=project.settlement_date
+    )
+    # Rates before the rate shift, which applies to both tranches
+    variable_rate_pct = np.broadcast_to(new_offer.rate + rate_delta, (switch_months.shape[0], n_months))
+    fixed_rate_pct = variable_rate_pct
+    if new_offer.with_fixed_rate:
+        position = np.arange(n_months)[None, :] - switch_months[:, None]
+        fixed = (position >= 0) & (position < 12 * new_offer.fixed_rate_duration)
+        fixed_rate_pct = np.where(fixed, new_offer.fixed_rate, variable_rate_pct)
+    new_rate_pct = np.stack([variable_rate_pct, fixed_rate_pct], axis=1)
+
+    def refinance(rows: np.ndarray, differential: np.ndarray, cost: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Savings and break-even positions of the switches `rows` with the given rate shifts and switching costs"""
+        row_events = np.repeat(events[None], rows.shape[0], axis=0)
+        row_events[:, 0, EVENT_FIELDS.index("switching_cost")] = cost
+        return calculate_refinance_batch(
+            stay_cost,
+            switch_months[rows],
+            get_variable_rate_pct(new_rate_pct[rows], differential[:, None, None]) / 12 / 100,
+            schedule,
+            carried_offset[rows] * new_offer.with_offset_account,
+            balance[rows, None] * tranche_shares,
+            offset_tranche[0],
+            new_offer.yearly_fees / 12,
+            income_series,
+            costs_series,
+            expenses_series,
+            new_offer.with_offset_account,
+            row_events,
+            discount_series,
+        )
+
+    # Surface over switch months and rate shifts
+    n_switches, n_differentials = switch_months.shape[0], rate_differentials.shape[0]
+    rows = np.repeat(np.arange(n_switches), n_differentials)
+    savings, break_even = refinance(
+        rows, np.tile(rate_differentials, n_switches), np.full(rows.shape[0], float(switching_cost))
+    )
+
+    # Break-even rate shift and switching cost, solved for all the switch months at once
+    rows = np.arange(n_switches)
+    costs = np.full(n_switches, float(switching_cost))
+    zeros = np.zeros(n_switches)
+    max_rate = max(new_offer.rate, new_offer.fixed_rate or 0) + rate_delta.max(initial=0)
+    break_even_rate = bisect_batch(
+        lambda x: -refinance(rows, x, costs)[0], np.full(n_switches, -max_rate), np.full(n_switches, 20.0)
+    )
+    break_even_cost = bisect_batch(lambda x: -refinance(rows, zeros, x)[0], zeros, np.full(n_switches, stay_cost[-1]))
+
+    return {
+        "months": months[switch_months],
+        "rate_differentials": rate_differentials,
+        "savings": savings.reshape(n_switches, n_differentials),
+        "break_even_month": np.where(break_even >= 0, months[np.maximum(break_even, 0)], -1).reshape(
+            n_switches, n_differentials
+        ),
+        "break_even_rate": break_even_rate,
+        "break_even_cost": break_even_cost,
+    }
+
+
+def compute_refinance_chain(  # pylint: disable = too-many-arguments, too-many-locals
+    *,
+    project: Project,
+    offer: Offer,
+    switches: list[tuple[date, Offer]],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    switching_cost: float = 0,
+) -> tuple[pd.DataFrame, bool]:
+    """Compute the loan timeseries of an offer refinanced to other offers at given dates
+
+    At each switch, the remaining balance is refinanced with the new offer over the remaining term of the loan, the
+    offset balance carries over and the switching cost is charged as a fee. The new offer's rates, repayment schedule,
+    fixed rate and interest only periods apply from the switch. The switches are events of a single kernel run.
+
+    :param project: Home loan project
+    :param offer: Initial loan offer
+    :param switches: Dates of the switches and offers switched to, switches outside of the loan are ignored
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param switching_cost: Cost of each switch ($)
+    :return: Loan data timeseries, indexed by month ordinal
+    """
+    inputs = get_loan_inputs(project=project, offer=offer, rates_change=rates_change, expenses=expenses)
+    months, monthly_rate = inputs["months"], inputs["monthly_rate"].copy()
+    rate_delta = get_rate_delta_series(
+        months=months, rates_change=rates_change, settlement_date=project.settlement_date
+    )
+    schedule = get_repayment_schedule(months, PAYMENTS_PER_YEAR[offer.repayment_frequency], offer.daily_interest)
+    events = get_offer_events(get_offer_columns([offer]))[0]
+
+    for switch_date, new_offer in sorted(switches, key=lambda switch: switch[0]):
+        start = first_month_on_or_after(switch_date) - int(months[0])
+        if not 0 < start < months.shape[0]:
+            continue
+        variable_rate_pct = get_variable_rate_pct(new_offer.rate, rate_delta[start:])
+        fixed_rate_pct = variable_rate_pct
+        if new_offer.with_fixed_rate:
+            fixed = np.arange(months.shape[0] - start) < 12 * new_offer.fixed_rate_duration
+            fixed_rate_pct = np.where(fixed, new_offer.fixed_rate, variable_rate_pct)
+        monthly_rate[:, start:] = np.stack([variable_rate_pct, fixed_rate_pct]) / 12 / 100
+        schedule[:, start:] = get_repayment_schedule(
+            months, PAYMENTS_PER_YEAR[new_offer.repayment_frequency], new_offer.daily_interest
+        )[:, start:]
+        # The events of the previous offers after the switch no longer apply
+        new_events = get_offer_events(
+            get_offer_columns([new_offer]), start, refinance=True, switching_cost=switching_cost
+        )[0]
+        events = np.r_[events[events[:, 0] < start], new_events]
+
+    return compute_loan_timeseries(
+        project=project,
+        offer=offer,
+        **{**inputs, "monthly_rate": monthly_rate},
+        schedule=schedule,
+        events=events[np.argsort(events[:, 0], kind="stable")],
+    )
+
+
+def get_affordability_margins(
+    *,
+    project: Project,
+    inputs: dict[str, np.ndarray],
+    principal: np.ndarray,
+    upfront: np.ndarray,
+    max_repayment_share: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """How far each loan is from breaking the affordability constraints, the constraints holding when both are <= 0
+
+    :param project: Home loan project
+    :param inputs: Inputs of `calculate_repayments_batch` from `get_batch_inputs`, the principal and start offset
+        being replaced
+    :param principal: Principal of each tranche of each loan
+    :param upfront: Deposit and stamp duty of each loan
+    :param max_repayment_share: Maximum share of the monthly income spent on repayments (%)
+    :return: Highest ratio of the monthly repayment to the income above the share (% points), and lowest savings below
+        zero. The savings are the capital left after the upfront payment plus the income minus the costs, repayments
+        and expenses; they are the offset balance for loans with an offset account.
+    """
+    start_savings = project.start_capital - upfront
+    peak_ratio, lowest_savings, _ = calculate_affordability_batch(
+        **{**inputs, "principal": principal, "start_offset": start_savings * inputs["with_offset_account"]},
+        start_savings=start_savings,
+    )
+    return 100 * peak_ratio - max_repayment_share, -lowest_savings
+
+
+def solve_affordability_chunk(
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    inputs: dict[str, np.ndarray],
+    max_repayment_share: float,
+    n_iter: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Largest property value and smallest deposit of a chunk of offers, see `solve_affordability`
+
+    :param project: Home loan project
+    :param offers: Offer columns of the chunk
+    :param inputs: Inputs of `calculate_repayments_batch` for the chunk, from `get_batch_inputs`
+    :param max_repayment_share: Maximum share of the monthly income spent on repayments (%)
+    :param n_iter: Number of bisection steps
+    :return: Largest property value and smallest deposit of each offer, NaN where nothing is affordable
+    """
+    borrowed = offers["borrowed_share"] / 100
+    upfront_share = (100 - offers["borrowed_share"] + project.stamp_duty_rate) / 100
+    tranche_shares, _ = get_tranches(offers)
+
+    def margins(property_value):
+        return get_affordability_margins(
+            project=project,
+            inputs=inputs,
+            principal=(property_value * borrowed)[:, None] * tranche_shares,
+            upfront=property_value * upfront_share,
+            max_repayment_share=max_repayment_share,
+        )
+
+    # The capital covers the upfront payment and the repayments add up to at least the principal
+    total_income = np.cumsum(inputs["monthly_income"], axis=1)[
+        np.arange(inputs["n_periods"].shape[0]), inputs["n_periods"] - 1
     ]
-    data = pd.DataFrame(
-        repayments,
-        columns=[
-            "principal_paid",
-            "offset",
-            "principal_payment",
-            "interest",
-            "fee",
-            "repayment",
-        ],
-        index=date_period,
-    ).assign(deposit=0, stamp_duty=0)
-    data.at[data.index[0], "deposit"] = project.property_value * (100 - offer.borrowed_share) / 100
-    data.at[data.index[0], "stamp_duty"] = project.property_value * (project.stamp_duty_rate) / 100
-
-    feasible = project.start_capital >= project.property_value * (100 - offer.borrowed_share + project.stamp_duty_rate) / 100
+    with np.errstate(divide="ignore"):
+        high = np.minimum(project.start_capital / upfront_share, max_repayment_share / 100 * total_income / borrowed)
+    high = np.maximum(high, 0)
+    # The lower ends of the brackets meet both constraints, the upper ends break one
+    max_property_value = bisect_batch(lambda x: np.maximum(*margins(x)), np.zeros_like(high), high, n_iter, end="low")
 
-    return data, feasible
+    # Smallest deposit at the project's property value
+    value = project.property_value
+    if value <= 0:
+        return max_property_value, np.full_like(max_property_value, np.nan)
+
+    def deposit_margins(deposit):
+        return get_affordability_margins(
+            project=project,
+            inputs=inputs,
+            principal=(value - deposit)[:, None] * tranche_shares,
+            upfront=deposit + value * project.stamp_duty_rate / 100,
+            max_repayment_share=max_repayment_share,
+        )
+
+    low = value * (1 - borrowed)
+    # The upper ends of the brackets keep the repayments under the share of income
+    deposit = bisect_batch(lambda x: -deposit_margins(x)[0], low, np.full_like(low, value), n_iter, end="high")
+    deposit = np.where(deposit_margins(low)[0] <= 0, low, deposit)
+    deposit = np.where(deposit_margins(np.nan_to_num(deposit, nan=value))[1] <= 0, deposit, np.nan)
+    return max_property_value, deposit
+
+
+def solve_affordability(  # pylint: disable = too-many-arguments, too-many-locals
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    max_repayment_share: float = 30,
+    n_iter: int = 30,
+    chunk_size: int = 1024,
+) -> dict[str, np.ndarray]:
+    """Largest property value and smallest deposit each offer allows
+
+    A loan is affordable when the savings (see `get_affordability_margins`) never go negative and the monthly
+    repayments stay under `max_repayment_share` % of the monthly income. Both constraints tighten as the property value
+    grows, so the largest property value is found by bisection, for all the offers at once. The smallest deposit for
+    the project's property value is the one bringing the repayments under the share of income, at least the deposit
+    required by the offer's borrowed share, and NaN when the savings then go negative.
+
+    :param project: Home loan project, its property value is only used for the smallest deposit
+    :param offers: Offer columns, see `get_offer_columns`
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param max_repayment_share: Maximum share of the monthly income spent on repayments (%)
+    :param n_iter: Number of bisection steps
+    :param chunk_size: Number of offers solved per kernel call
+    :return: Dict with the arrays "max_property_value" and "min_deposit", NaN where nothing is affordable
+    """
+    months = get_batch_months(project=project, offers=offers)
+    rate_delta = get_rate_delta_series(
+        months=months, rates_change=rates_change, settlement_date=project.settlement_date
+    )
+    expenses_series = get_expenses_series(months=months, expenses=expenses)
+    n_offers = offers["rate"].shape[0]
+    max_property_value, min_deposit = np.full(n_offers, np.nan), np.full(n_offers, np.nan)
+
+    for start in range(0, n_offers, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        chunk_offers = {key: values[chunk] for key, values in offers.items()}
+        max_property_value[chunk], min_deposit[chunk] = solve_affordability_chunk(
+            project=project,
+            offers=chunk_offers,
+            inputs=get_batch_inputs(
+                project=project, offers=chunk_offers, rate_delta=rate_delta, expenses_series=expenses_series
+            ),
+            max_repayment_share=max_repayment_share,
+            n_iter=n_iter,
+        )
+
+    return {"max_property_value": max_property_value, "min_deposit": min_deposit}
+
+
+def optimise_extra_repayments(  # pylint: disable = too-many-arguments, too-many-locals
+    *,
+    project: Project,
+    offer: Offer,
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    phase_years: float = 5,
+    n_levels: int = 5,
+    max_sweeps: int = 20,
+) -> dict[str, np.ndarray | float]:
+    """Cost-minimising split of the monthly surplus between extra repayments and savings
+
+    The surplus is the income minus the costs, repayment and expenses of the loan without extra repayment each month.
+    The loan months are split in phases, the fixed rate period then blocks of `phase_years`, and a plan puts a share of
+    the surplus into extra repayments in each phase. Plans are improved by coordinate descent: each sweep simulates
+    every plan differing from the current one in a single phase in one batched kernel call, and keeps the cheapest.
+    A plan must leave the borrower able to pay the expenses: its savings (as in `calculate_affordability_batch`) may not
+    go negative, or lower than without extra repayment when they already do.
+
+    :param project: Home loan project
+    :param offer: Loan offer
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param phase_years: Duration of the phases after the fixed rate period (years)
+    :param n_levels: Number of shares of the surplus tried in each phase, evenly spaced from 0 to 1
+    :param max_sweeps: Maximum number of coordinate descent sweeps
+    :return: Dict with the "phases" start positions, the "shares" of the surplus for each phase, the monthly
+        "extra_repayment" of the plan, its interest and fees "cost", its "lowest_savings", the "base_cost" without
+        extra repayment and the number of plans simulated "n_simulated"
+    """
+    inputs = get_loan_inputs(project=project, offer=offer, rates_change=rates_change, expenses=expenses)
+    months, expenses_series = inputs["months"], inputs["expenses_series"]
+    n_months = months.shape[0]
+    base, _ = compute_loan_timeseries(project=project, offer=offer, **inputs)
+    base_cost = base[["interest", "fee"]].to_numpy().sum()
+    income_series, costs_series = get_budget_series(months=months, project=project)
+    surplus = np.maximum(income_series - costs_series - base["repayment"].to_numpy() - expenses_series, 0)
+    start_savings = (
+        project.start_capital - project.property_value * (100 - offer.borrowed_share + project.stamp_duty_rate) / 100
+    )
+    cashflow = income_series - costs_series - expenses_series
+
+    fixed_end = min(12 * offer.fixed_rate_duration, n_months) if offer.with_fixed_rate else 0
+    phases = np.unique(np.r_[0, np.arange(fixed_end, n_months, max(1, round(phase_years * 12)))])
+    phase_of_month = np.searchsorted(phases, np.arange(n_months), side="right") - 1
+    n_phases, levels = phases.shape[0], np.linspace(0, 1, n_levels)
+
+    batch_inputs = get_batch_inputs(
+        project=project,
+        offers=get_offer_columns([offer]),
+        rate_delta=get_rate_delta_series(
+            months=months, rates_change=rates_change, settlement_date=project.settlement_date
+        ),
+        expenses_series=expenses_series,
+    )
+
+    def evaluate(plans: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Interest and fees, and lowest savings of each plan of shares"""
+        n_plans = plans.shape[0]
+        data = calculate_repayments_batch(
+            **{
+                **{key: np.repeat(values, n_plans, axis=0) for key, values in batch_inputs.items()},
+                "schedule": batch_inputs["schedule"],
+                "extra_repayment": plans[:, phase_of_month] * surplus[None, :],
+            }
+        )
+        outflow = data[:, REPAYMENT_COLUMNS.index("repayment")] + data[:, REPAYMENT_COLUMNS.index("extra_repayment")]
+        savings = start_savings + np.cumsum(cashflow[None, :] - outflow, axis=1)
+        return data[:, COST_COLUMNS].sum(axis=(1, 2)), np.minimum(savings.min(axis=1), start_savings)
+
+    shares, cost, n_simulated = np.zeros(n_phases), base_cost, 0
+    _, (lowest_savings,) = evaluate(shares[None, :])
+    min_savings = min(lowest_savings, 0) - 0.01
+    changed_phase = np.repeat(np.arange(n_phases), n_levels)
+    for _ in range(max_sweeps):
+        plans = np.repeat(shares[None, :], n_phases * n_levels, axis=0)
+        plans[np.arange(plans.shape[0]), changed_phase] = np.tile(levels, n_phases)
+        plan_costs, plan_savings = evaluate(plans)
+        plan_costs[plan_savings < min_savings] = np.inf
+        n_simulated += plans.shape[0]
+        best = np.argmin(plan_costs)
+        if plan_costs[best] >= cost - 0.01:
+            break
+        shares, cost, lowest_savings = plans[best], plan_costs[best], plan_savings[best]
+
+    return {
+        "phases": phases,
+        "shares": shares,
+        "extra_repayment": shares[phase_of_month] * surplus,
+        "cost": cost,
+        "lowest_savings": lowest_savings,
+        "base_cost": base_cost,
+        "n_simulated": n_simulated,
+    }
+
+
+def get_backtest_rate_deltas(*, starts: np.ndarray, n_months: int, rates_change: RatesForecast) -> np.ndarray:
+    """Rate changes (in % points) over the months of loans settled at the start of each of the `starts` months
+
+    Same as `get_rate_delta_series` for each settlement date, the history and forecast being merged once for all.
+    """
+    effective, cumulative = get_historical_rate_changes()
+    is_history = np.ones(effective.shape[0], dtype=bool)
+    values = cumulative
+    if rates_change.changes:
+        effective = np.r_[effective, first_month_on_or_after([c.date for c in rates_change.changes])]
+        values = np.r_[values, [c.value for c in rates_change.changes]]
+        is_history = np.r_[is_history, np.zeros(len(rates_change.changes), dtype=bool)]
+    order = np.argsort(effective, kind="stable")
+    effective, values, is_history = effective[order], values[order], is_history[order]
+
+    # Historical changes are relative to the first one effective after settlement
+    history_effective = effective[is_history]
+    reference = cumulative[np.minimum(np.searchsorted(history_effective, starts), cumulative.shape[0] - 1)]
+
+    latest = np.searchsorted(effective, starts[:, None] + np.arange(n_months)[None, :], side="right") - 1
+    delta = np.where(is_history[latest], values[latest] - reference[:, None], values[latest])
+    return np.where(latest >= 0, delta, 0)
+
+
+def backtest_offers(  # pylint: disable = too-many-locals
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+) -> dict[str, np.ndarray]:
+    """Run offers for every monthly settlement date of the historical rates, up to the current month
+
+    Each settlement gets the realised rate path from the history, continued by the rates forecast. The project is
+    otherwise unchanged, its settlement date being replaced.
+
+    :param project: Home loan project
+    :param offers: Offer columns, see `get_offer_columns`
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :return: Dict of arrays:
+        - "months": month ordinals of the settlements
+        - "interest", "fees": interest and fees paid over each loan, shape (n_offers, n_settlements)
+        - "payoff_months": number of months until each loan is repaid, shape (n_offers, n_settlements)
+    """
+    effective, _ = get_historical_rate_changes()
+    starts = np.arange(effective[0], month_ordinal(date.today()), dtype=np.int32)
+    n_offers, n_starts = offers["rate"].shape[0], starts.shape[0]
+    n_months = int(np.round(offers["loan_duration"].max(initial=0) * 12))
+    rate_delta = get_backtest_rate_deltas(starts=starts, n_months=n_months, rates_change=rates_change)
+
+    expenses_series = np.zeros((n_starts, n_months))
+    if expenses.expenses:
+        position = month_ordinal([e.date for e in expenses.expenses])[None, :] + 1 - starts[:, None]
+        rows, columns = np.nonzero((position >= 0) & (position < n_months))
+        values = np.array([e.value for e in expenses.expenses])
+        np.add.at(expenses_series, (rows, position[rows, columns]), values[columns])
+
+    inputs = get_batch_inputs(
+        project=project, offers=offers, rate_delta=np.zeros(n_months), expenses_series=np.zeros(n_months)
+    )
+    fixed = offers["with_fixed_rate"][:, None] & (
+        np.arange(n_months)[None, :] < 12 * offers["fixed_rate_duration"][:, None]
+    )
+    variable_rate_pct = get_variable_rate_pct(offers["rate"][:, None, None], rate_delta[None, :, :])
+    rate_pct = np.stack(
+        [variable_rate_pct, np.where(fixed[:, None, :], offers["fixed_rate"][:, None, None], variable_rate_pct)],
+        axis=2,
+    )
+    loans_months = starts[:, None] + np.arange(n_months)[None, :]
+    schedule, schedule_index = get_schedule_table(loans_months, offers)
+    income_series, costs_series = get_budget_series(months=loans_months, project=project)
+    interest, fees, payoff_months = calculate_backtest_batch(
+        **{key: np.repeat(values, n_starts, axis=0) for key, values in inputs.items()}
+        | {
+            "monthly_rate": rate_pct.reshape(n_offers * n_starts, N_TRANCHES, n_months) / 12 / 100,
+            "schedule": schedule,
+            "schedule_index": (schedule_index[:, None] * n_starts + np.arange(n_starts)[None, :]).ravel(),
+            "expenses": np.tile(expenses_series, (n_offers, 1)),
+            "monthly_income": np.tile(income_series, (n_offers, 1)),
+            "monthly_costs": np.tile(costs_series, (n_offers, 1)),
+        }
+    )
+    return {
+        "months": starts,
+        "interest": interest.reshape(n_offers, n_starts),
+        "fees": fees.reshape(n_offers, n_starts),
+        "payoff_months": payoff_months.reshape(n_offers, n_starts),
+    }
+
+
+def stress_test_offers(  # pylint: disable = too-many-arguments, too-many-locals
+    *,
+    project: Project,
+    offers: dict[str, np.ndarray],
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+    shocks: list[float] = (1, 2, 3),
+    buffers: list[float] = (3,),
+    budgets: dict[str, Project] = None,
+    max_repayment_share: float = 30,
+) -> dict[str, np.ndarray | list[str]]:
+    """Run offers under rate shocks, serviceability buffers and budgets, all scenarios in one batched kernel call
+
+    A shock raises the rates once the fixed rate period is over, a buffer raises them over the whole loan as lenders do
+    to assess serviceability, and a budget replaces the income and costs of the project. An offer passes a scenario
+    when its savings (the offset balance for loans with an offset account, see `get_affordability_margins`) never go
+    negative and its repayments stay under `max_repayment_share` % of the monthly income.
+
+    :param project: Home loan project
+    :param offers: Offer columns, see `get_offer_columns`
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :param shocks: Rate shocks in % points
+    :param buffers: Serviceability buffers in % points
+    :param budgets: Projects with other budgets (see BUDGET_FIELDS) by scenario label
+    :param max_repayment_share: Maximum share of the monthly income spent on repayments (%)
+    :return: Dict with the "scenarios" labels and arrays of shape (n_offers, n_scenarios):
+        - "first_shortfall": month ordinal of the first month of negative savings, -1 if they never are
+        - "peak_ratio": highest repayment to income ratio (%)
+        - "passes": whether the offer passes the scenario
+    """
+    months = get_batch_months(project=project, offers=offers)
+    rate_delta = get_rate_delta_series(
+        months=months, rates_change=rates_change, settlement_date=project.settlement_date
+    )
+    expenses_series = get_expenses_series(months=months, expenses=expenses)
+    n_offers = offers["rate"].shape[0]
+
+    budgets = budgets or {}
+
+    def scenario_inputs(shock: float, buffer: float, budget: Project = project) -> dict[str, np.ndarray]:
+        inputs = get_batch_inputs(
+            project=budget, offers=offers, rate_delta=rate_delta + shock, expenses_series=expenses_series
+        )
+        return {**inputs, "monthly_rate": inputs["monthly_rate"] + buffer / 12 / 100}
+
+    scenarios = (
+        [scenario_inputs(shock, 0) for shock in shocks]
+        + [scenario_inputs(0, buffer) for buffer in buffers]
+        + [scenario_inputs(0, 0, budget) for budget in budgets.values()]
+    )
+    labels = [f"{shock:+g}%" for shock in shocks] + [f"Buffer {buffer:+g}%" for buffer in buffers] + list(budgets)
+    inputs = {key: np.concatenate([scenario[key] for scenario in scenarios]) for key in scenarios[0]}
+    inputs["schedule"] = scenarios[0]["schedule"]
+    start_savings = (
+        project.start_capital
+        - project.property_value * (100 - offers["borrowed_share"] + project.stamp_duty_rate) / 100
+    )
+    peak_ratio, lowest_savings, first_shortfall = calculate_affordability_batch(
+        **inputs, start_savings=np.tile(start_savings, len(scenarios))
+    )
+
+    def by_offer(values: np.ndarray) -> np.ndarray:
+        return values.reshape(len(scenarios), n_offers).T
+
+    peak_ratio = by_offer(100 * peak_ratio)
+    return {
+        "scenarios": labels,
+        "first_shortfall": np.where(by_offer(first_shortfall) >= 0, months[0] + by_offer(first_shortfall), -1),
+        "peak_ratio": peak_ratio,
+        "passes": (by_offer(lowest_savings) >= 0) & (peak_ratio <= max_repayment_share),
+    }
+
+
+def compute_sensitivities(  # pylint: disable = too-many-locals
+    *,
+    project: Project,
+    offer: Offer,
+    rates_change: RatesForecast,
+    expenses: FutureExpenses,
+) -> dict[str, np.ndarray | list[str] | float]:
+    """Change of the interest and fees paid over the loan when each input is bumped, to first order
+
+    The derivatives come with the loan in a single pass of the loan engine (see `calculate_sensitivities`). The inputs
+    are the rates (+1%), the borrowed share (+5%), the yearly fees (+$100), the income (+10%) and each expense within
+    the loan (+10%); the income and expenses only matter with an offset account.
+
+    :param project: Home loan project
+    :param offer: Loan offer
+    :param rates_change: Forecast of rate changes
+    :param expenses: Future expenses
+    :return: dict with
+        - "cost": interest and fees paid over the loan
+        - "inputs": label of each bumped input
+        - "impact": change of the cost for each bump
+    """
+    inputs = get_loan_inputs(project=project, offer=offer, rates_change=rates_change, expenses=expenses)
+    months = inputs["months"]
+    n_months = months.shape[0]
+    tranche_shares, _ = get_tranches(get_offer_columns([offer]))
+    income_series, _ = get_budget_series(months=months, project=project)
+
+    expense_position = month_ordinal([e.date for e in expenses.expenses]) + 1 - months[0]
+    expense_rows = [k for k, position in enumerate(expense_position) if 0 <= position < n_months]
+    labels = ["Rates ±1%", "Borrowed share ±5%", "Yearly fees ±$100", "Income ±10%"] + [
+        f"Expense {expenses.expenses[k].date:%b %Y} ±10%" for k in expense_rows
+    ]
+    n_inputs = len(labels)
+    d_monthly_rate = np.zeros((n_inputs, N_TRANCHES, n_months))
+    d_principal = np.zeros((n_inputs, N_TRANCHES))
+    d_start_offset = np.zeros(n_inputs)
+    d_monthly_fee = np.zeros(n_inputs)
+    d_cashflow = np.zeros((n_inputs, n_months))
+    # The rates held at zero by `get_variable_rate_pct` do not move with a small bump
+    d_monthly_rate[0] = np.where(inputs["monthly_rate"] > 0, 1 / 12 / 100, 0)
+    d_principal[1] = project.property_value * 5 / 100 * tranche_shares[0]
+    d_start_offset[1] = project.property_value * 5 / 100 * offer.with_offset_account
+    d_monthly_fee[2] = 100 / 12
+    d_cashflow[3] = 0.1 * income_series
+    for p, k in enumerate(expense_rows, start=4):
+        d_cashflow[p, expense_position[k]] = -0.1 * expenses.expenses[k].value
+
+    out, d_out = calculate_sensitivities(
+        *get_repayments_args(project=project, offer=offer, **inputs),
+        d_monthly_rate,
+        d_principal,
+        d_start_offset,
+        d_monthly_fee,
+        d_cashflow,
+    )
+    return {
+        "cost": out[COST_COLUMNS].sum(),
+        "inputs": labels,
+        "impact": d_out[:, COST_COLUMNS].sum(axis=(1, 2)),
+    }
+
+
+# Numba kernels, as (python function, njit options) by name, jitted on the first call of any of them
+_kernels: dict[str, tuple[Callable, dict]] = {}
+_kernels_lock = Lock()
+_kernels_jitted = False
+prange = range  # numba.prange once the kernels are jitted
+
+
+def njit(func: Callable = None, **options) -> Callable:
+    """numba.njit deferring the import of numba and the jitting of the kernels to the first call of one of them
+
+    On that call, every kernel replaces its python function in the module, as numba looks up the kernels a kernel
+    calls, and `prange`, in the module globals when compiling it. The compiled kernels are cached on disk, so that
+    the workers after the first one load them instead of compiling them.
+    """
+    if func is None:
+        return lambda func: njit(func, **options)
+    _kernels[func.__name__] = (func, options)
+
+    @wraps(func)
+    def call_kernel(*args, **kwargs):
+        jit_kernels()
+        return globals()[func.__name__](*args, **kwargs)
+
+    return call_kernel
+
+
+def jit_kernels():
+    """Import numba and jit the kernels of the module, once"""
+    global _kernels_jitted, prange  # pylint: disable = global-statement
+    with _kernels_lock:
+        if _kernels_jitted:
+            return
+        import numba  # pylint: disable = import-outside-toplevel
+
+        prange = numba.prange
+        for name, (func, options) in _kernels.items():
+            globals()[name] = numba.njit(cache=True, **options)(func)
+        _kernels_jitted = True
 
 
 @njit(fastmath=True)
-def calculate_repayments(  # pylint: disable = too-many-arguments, too-many-locals
+def calculate_repayments(  # pylint: disable = too-many-arguments
     monthly_rate: np.ndarray,
+    schedule: np.ndarray,
     start_offset: float,
-    principal: float,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
     monthly_fee: float,
-    monthly_income: float,
-    monthly_costs: float,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
     expenses: np.ndarray,
     with_offset_account: bool,
+    extra_repayment: np.ndarray,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+    exact: bool,
 ) -> np.ndarray:
-    """Calculate the repayments data with numba"""
-    n_periods = monthly_rate.shape[0]
-    principal_paid_ = np.zeros(n_periods)
-    offset_ = np.zeros(n_periods)
-    principal_payment_ = np.zeros(n_periods)
-    interest_ = np.zeros(n_periods)
-    fee_ = np.zeros(n_periods)
-    repayment_ = np.zeros(n_periods)
-    principal_paid_no_offset_ = np.zeros(n_periods)
+    """Calculate the repayments data with numba, of shape (N_REPAYMENT_COLUMNS, n_months), in whole cents in exact
+    mode (see `_simulate_loan`)"""
+    out = np.zeros((N_REPAYMENT_COLUMNS, monthly_rate.shape[1]))
+    _simulate_loan(
+        out,
+        monthly_rate,
+        schedule,
+        start_offset,
+        principal,
+        offset_tranche,
+        monthly_fee,
+        monthly_income,
+        monthly_costs,
+        expenses,
+        with_offset_account,
+        extra_repayment,
+        events,
+        discount_rate,
+        exact,
+        *_no_derivatives(),
+    )
+    return out
 
-    for i in range(n_periods):
-        if i == 0:
-            offset = start_offset
-            principal_paid = 0
-            principal_paid_no_offset = 0
-        else:
-            offset = offset_[i - 1]
-            principal_paid = principal_paid_[i - 1]
-            principal_paid_no_offset = principal_paid_no_offset_[i - 1]
-
-        # Compute the amortisatino payment (i.e. the constant cashflow that will repay the loan + interests
-        # over the remainnig duration)
-        amortisation_payment = (
-            (principal - principal_paid_no_offset)
-            * monthly_rate[i]
-            * (1 + monthly_rate[i]) ** (n_periods - i)
-            / ((1 + monthly_rate[i]) ** (n_periods - i) - 1)
+
+@njit(fastmath=True)
+def calculate_sensitivities(  # pylint: disable = too-many-arguments
+    monthly_rate: np.ndarray,
+    schedule: np.ndarray,
+    start_offset: float,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
+    monthly_fee: float,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
+    expenses: np.ndarray,
+    with_offset_account: bool,
+    extra_repayment: np.ndarray,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+    d_monthly_rate: np.ndarray,
+    d_principal: np.ndarray,
+    d_start_offset: np.ndarray,
+    d_monthly_fee: np.ndarray,
+    d_cashflow: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Calculate the repayments data with numba, and its derivatives with respect to n_inputs inputs in the same pass
+
+    The d_ inputs hold the derivatives of the inputs along their first axis (see `_simulate_loan`). Returns the
+    repayments data and its derivatives, of shape (n_inputs, N_REPAYMENT_COLUMNS, n_months).
+    """
+    out = np.zeros((N_REPAYMENT_COLUMNS, monthly_rate.shape[1]))
+    d_out = np.zeros((d_start_offset.shape[0], N_REPAYMENT_COLUMNS, monthly_rate.shape[1]))
+    _simulate_loan(
+        out,
+        monthly_rate,
+        schedule,
+        start_offset,
+        principal,
+        offset_tranche,
+        monthly_fee,
+        monthly_income,
+        monthly_costs,
+        expenses,
+        with_offset_account,
+        extra_repayment,
+        events,
+        discount_rate,
+        False,
+        d_out,
+        d_monthly_rate,
+        d_principal,
+        d_start_offset,
+        d_monthly_fee,
+        d_cashflow,
+    )
+    return out, d_out
+
+
+@njit(fastmath=True, parallel=True)
+def calculate_repayments_batch(  # pylint: disable = too-many-arguments
+    monthly_rate: np.ndarray,
+    schedule: np.ndarray,
+    schedule_index: np.ndarray,
+    n_periods: np.ndarray,
+    start_offset: np.ndarray,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
+    monthly_fee: np.ndarray,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
+    expenses: np.ndarray,
+    with_offset_account: np.ndarray,
+    extra_repayment: np.ndarray,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+) -> np.ndarray:
+    """Calculate the repayments data of several loans in parallel with numba
+
+    Row i of the inputs holds loan i, with its tranches over its first n_periods[i] months for the monthly rate, and its
+    repayment schedule is schedule[schedule_index[i]]. The result has the shape (n_loans, N_REPAYMENT_COLUMNS, n_months)
+    and is zero after the end of each loan.
+    """
+    n_loans, _, n_months = monthly_rate.shape
+    out = np.zeros((n_loans, N_REPAYMENT_COLUMNS, n_months))
+    no_derivatives = _no_derivatives()
+    for i in prange(n_loans):  # pylint: disable = not-an-iterable
+        n = n_periods[i]
+        _simulate_loan(
+            out[i, :, :n],
+            monthly_rate[i, :, :n],
+            schedule[schedule_index[i], :, :n],
+            start_offset[i],
+            principal[i],
+            offset_tranche[i],
+            monthly_fee[i],
+            monthly_income[i, :n],
+            monthly_costs[i, :n],
+            expenses[i, :n],
+            with_offset_account[i],
+            extra_repayment[i, :n],
+            events[i],
+            discount_rate[i, :, :n],
+            False,
+            *no_derivatives,
+        )
+    return out
+
+
+@njit(fastmath=True, parallel=True)
+def calculate_refinance_batch(  # pylint: disable = too-many-arguments, too-many-locals
+    stay_cost: np.ndarray,
+    switch_index: np.ndarray,
+    monthly_rate: np.ndarray,
+    schedule: np.ndarray,
+    start_offset: np.ndarray,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
+    monthly_fee: float,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
+    expenses: np.ndarray,
+    with_offset_account: bool,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Simulate refinanced loans in parallel with numba and compare their costs to the current loan
+
+    Row i switches at the position switch_index[i] and runs with the rates monthly_rate[i], the events events[i]
+    (charging the switching cost, see `get_offer_events`) and the repayment schedule from there until the end of the
+    current loan, whose cumulative interest and fees are stay_cost. Returns the savings at the end of the loan and the
+    position after which the cumulative savings stay positive, -1 if they never do.
+    """
+    n_rows, n_months = switch_index.shape[0], stay_cost.shape[0]
+    savings = np.zeros(n_rows)
+    break_even = np.full(n_rows, -1, dtype=np.int64)
+    no_derivatives = _no_derivatives()
+    for i in prange(n_rows):  # pylint: disable = not-an-iterable
+        switch = switch_index[i]
+        out = np.zeros((N_REPAYMENT_COLUMNS, n_months - switch))
+        _simulate_loan(
+            out,
+            monthly_rate[i, :, switch:],
+            schedule[:, switch:],
+            start_offset[i],
+            principal[i],
+            offset_tranche,
+            monthly_fee,
+            monthly_income[switch:],
+            monthly_costs[switch:],
+            expenses[switch:],
+            with_offset_account,
+            np.zeros(n_months - switch),
+            events[i],
+            discount_rate[:, switch:],
+            False,
+            *no_derivatives,
         )
-        # If the loan is paid don't pay anything else
-        loan_payment = min(amortisation_payment, principal - principal_paid)
+        cost = stay_cost[switch - 1]
+        last_loss = switch - 1
+        for t in range(switch, n_months):
+            cost += out[3, t - switch] + out[4, t - switch]
+            if cost > stay_cost[t]:
+                last_loss = t
+        savings[i] = stay_cost[n_months - 1] - cost
+        if last_loss < n_months - 1:
+            break_even[i] = last_loss + 1
+    return savings, break_even
+
+
+@njit(fastmath=True, parallel=True)
+def calculate_affordability_batch(  # pylint: disable = too-many-arguments, too-many-locals
+    monthly_rate: np.ndarray,
+    schedule: np.ndarray,
+    schedule_index: np.ndarray,
+    n_periods: np.ndarray,
+    start_offset: np.ndarray,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
+    monthly_fee: np.ndarray,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
+    expenses: np.ndarray,
+    with_offset_account: np.ndarray,
+    extra_repayment: np.ndarray,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+    start_savings: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Highest ratio of the monthly repayment to the income, lowest savings and first month of negative savings of
+    several loans with numba
+
+    The inputs are those of `calculate_repayments_batch`, the savings start at start_savings (included in the lowest)
+    and grow by the income minus the costs, repayment and expenses each month of the loan. The first month of negative
+    savings is -1 when they never are, 0 when the start savings are.
+    """
+    n_loans = monthly_rate.shape[0]
+    peak_ratio = np.zeros(n_loans)
+    lowest_savings = np.zeros(n_loans)
+    first_shortfall = np.full(n_loans, -1, dtype=np.int64)
+    no_derivatives = _no_derivatives()
+    for i in prange(n_loans):  # pylint: disable = not-an-iterable
+        n = n_periods[i]
+        out = np.zeros((N_REPAYMENT_COLUMNS, n))
+        _simulate_loan(
+            out,
+            monthly_rate[i, :, :n],
+            schedule[schedule_index[i], :, :n],
+            start_offset[i],
+            principal[i],
+            offset_tranche[i],
+            monthly_fee[i],
+            monthly_income[i, :n],
+            monthly_costs[i, :n],
+            expenses[i, :n],
+            with_offset_account[i],
+            extra_repayment[i, :n],
+            events[i],
+            discount_rate[i, :, :n],
+            False,
+            *no_derivatives,
+        )
+        savings = start_savings[i]
+        lowest = savings
+        highest = 0.0
+        if savings < 0:
+            first_shortfall[i] = 0
+        for t in range(n):
+            savings += monthly_income[i, t] - monthly_costs[i, t] - out[5, t] - out[6, t] - expenses[i, t]
+            if savings < 0 and first_shortfall[i] < 0:
+                first_shortfall[i] = t
+            lowest = min(lowest, savings)
+            if monthly_income[i, t] > 0:
+                highest = max(highest, out[5, t] / monthly_income[i, t])
+            elif out[5, t] > 0:
+                highest = np.inf
+        peak_ratio[i] = highest
+        lowest_savings[i] = lowest
+    return peak_ratio, lowest_savings, first_shortfall
+
+
+@njit(fastmath=True, parallel=True)
+def calculate_backtest_batch(  # pylint: disable = too-many-arguments, too-many-locals
+    monthly_rate: np.ndarray,
+    schedule: np.ndarray,
+    schedule_index: np.ndarray,
+    n_periods: np.ndarray,
+    start_offset: np.ndarray,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
+    monthly_fee: np.ndarray,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
+    expenses: np.ndarray,
+    with_offset_account: np.ndarray,
+    extra_repayment: np.ndarray,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Interest, fees and number of months until repaid of several loans in parallel with numba
+
+    The inputs are those of `calculate_repayments_batch`.
+    """
+    n_loans = monthly_rate.shape[0]
+    interest = np.zeros(n_loans)
+    fees = np.zeros(n_loans)
+    payoff_months = np.zeros(n_loans, dtype=np.int64)
+    no_derivatives = _no_derivatives()
+    for i in prange(n_loans):  # pylint: disable = not-an-iterable
+        n = n_periods[i]
+        out = np.zeros((N_REPAYMENT_COLUMNS, n))
+        _simulate_loan(
+            out,
+            monthly_rate[i, :, :n],
+            schedule[schedule_index[i], :, :n],
+            start_offset[i],
+            principal[i],
+            offset_tranche[i],
+            monthly_fee[i],
+            monthly_income[i, :n],
+            monthly_costs[i, :n],
+            expenses[i, :n],
+            with_offset_account[i],
+            extra_repayment[i, :n],
+            events[i],
+            discount_rate[i, :, :n],
+            False,
+            *no_derivatives,
+        )
+        for t in range(n):
+            interest[i] += out[3, t]
+            fees[i] += out[4, t]
+            if out[5, t] > 0:
+                payoff_months[i] = t + 1
+    return interest, fees, payoff_months
+
+
+@njit
+def _to_unit(amount: float, unit: float) -> float:
+    """Amount in dollars converted to the unit of `_simulate_loan`, rounded to whole cents"""
+    return np.round(amount * unit) if unit != 1 else amount
 
-        # The interest depends on the amount still to pay on the loan
-        interest = max(0, principal - offset - principal_paid) * monthly_rate[i]
-        interest_no_offset = max(0, principal - principal_paid_no_offset) * monthly_rate[i]
+
+@njit
+def _no_derivatives() -> tuple:
+    """Empty d_ arguments of `_simulate_loan`, to only compute the values"""
+    return (
+        np.zeros((0, N_REPAYMENT_COLUMNS, 0)),
+        np.zeros((0, N_TRANCHES, 0)),
+        np.zeros((0, N_TRANCHES)),
+        np.zeros(0),
+        np.zeros(0),
+        np.zeros((0, 0)),
+    )
+
+
+@njit(fastmath=True)
+def _simulate_loan(  # pylint: disable = too-many-arguments, too-many-locals, too-many-branches, too-many-statements
+    out: np.ndarray,
+    monthly_rate: np.ndarray,
+    schedule: np.ndarray,
+    start_offset: float,
+    principal: np.ndarray,
+    offset_tranche: np.ndarray,
+    monthly_fee: float,
+    monthly_income: np.ndarray,
+    monthly_costs: np.ndarray,
+    expenses: np.ndarray,
+    with_offset_account: bool,
+    extra_repayment: np.ndarray,
+    events: np.ndarray,
+    discount_rate: np.ndarray,
+    exact: bool,
+    d_out: np.ndarray,
+    d_monthly_rate: np.ndarray,
+    d_principal: np.ndarray,
+    d_start_offset: np.ndarray,
+    d_monthly_fee: np.ndarray,
+    d_cashflow: np.ndarray,
+):
+    """Run the repayments recurrence of one loan, writing the REPAYMENT_COLUMNS rows of out
+
+    The loan is made of tranches amortised separately, each with its row of monthly_rate and its principal. The offset
+    account reduces the balance of the tranches flagged in offset_tranche, in order.
+    Each month follows its column of the repayment schedule (see `get_repayment_schedule`): the repayments reduce the
+    balance interest accrues on from their due date, the offset balance being constant over the month.
+    Extra repayments are paid on top of the scheduled repayment, which is left unchanged so that the loan ends earlier.
+    They go to the tranches in order and, with an offset account, are taken from it and limited to its balance.
+    The events (rows of EVENT_FIELDS sorted by start) change the state of the loan in one pass: during interest only
+    periods the repayments only cover the interest, and refinancing splits the remaining balance into new tranches
+    amortised over the remaining repayments.
+    The outgoing cash is discounted to its present value and the repayment and offset balance deflated to today's
+    dollars at the end of each month, with the rows of discount_rate (see `get_discount_series`).
+
+    In exact mode the amounts are whole numbers of cents, held exactly in float64 so that the reorderings allowed by
+    fastmath cannot change them. Like a lender does, each scheduled repayment is rounded up to the cent, the interest
+    of each month rounded half up to the cent and the last repayment clears the balance.
+
+    The d_ arrays carry forward mode derivatives (dual numbers) along with the values: row p of d_out gets the
+    derivatives of out with respect to an input whose derivatives are row p of the d_ inputs, d_cashflow being that of
+    the income minus the costs and expenses. They have no rows to only compute the values, and ignore the rounding of
+    the exact mode.
+    """
+    n_tranches, n_periods = monthly_rate.shape
+    n_inputs = d_out.shape[0]
+    # Amounts are in cents in exact mode, in dollars otherwise
+    unit = 100.0 if exact else 1.0
+    offset = _to_unit(start_offset, unit)
+    principal = principal.copy()
+    for j in range(n_tranches):
+        principal[j] = _to_unit(principal[j], unit)
+    monthly_fee = _to_unit(monthly_fee, unit)
+    offset_tranche = offset_tranche.copy()
+    principal_paid = np.zeros(n_tranches)
+    principal_paid_no_offset = np.zeros(n_tranches)
+    refinanced_principal_paid = 0.0
+    remaining_payments = 0
+    for i in range(n_periods):
+        remaining_payments += int(schedule[1, i])
+    next_event = 0
+    interest_only = False
+    discount_factor = 1.0
+    price_index = 1.0
+
+    d_offset = d_start_offset.copy()
+    d_principal = d_principal.copy()
+    d_principal_paid = np.zeros((n_inputs, n_tranches))
+    d_principal_paid_no_offset = np.zeros((n_inputs, n_tranches))
+    d_refinanced_principal_paid = np.zeros(n_inputs)
+    d_available_offset = np.zeros(n_inputs)
+    d_loan_payment = np.zeros(n_inputs)
+    d_interest = np.zeros(n_inputs)
+    d_extra_left = np.zeros(n_inputs)
+    d_extra = np.zeros(n_inputs)
+
+    for i in range(n_periods):
+        switching_cost = 0.0
+        while next_event < events.shape[0] and events[next_event, 0] <= i:
+            event = events[next_event]
+            interest_only = event[1] > 0
+            monthly_fee = _to_unit(event[2], unit)
+            offset_tranche[0], offset_tranche[1] = event[4] > 0, event[5] > 0
+            with_offset_account = event[6] > 0
+            switching_cost += _to_unit(event[7], unit)
+            if event[8] > 0:
+                balance = (principal - principal_paid).sum()
+                refinanced_principal_paid += principal_paid.sum()
+                if exact:
+                    principal[1] = np.round(balance * event[3])
+                    principal[0] = balance - principal[1]
+                else:
+                    principal[0], principal[1] = balance * (1 - event[3]), balance * event[3]
+                principal_paid[:] = 0
+                principal_paid_no_offset[:] = 0
+                for p in range(n_inputs):
+                    d_balance = (d_principal[p] - d_principal_paid[p]).sum()
+                    d_refinanced_principal_paid[p] += d_principal_paid[p].sum()
+                    d_principal[p, 0], d_principal[p, 1] = d_balance * (1 - event[3]), d_balance * event[3]
+                    d_principal_paid[p] = 0
+                    d_principal_paid_no_offset[p] = 0
+            next_event += 1
+
+        accrual, payments, payment_weight = schedule[0, i], schedule[1, i], schedule[2, i]
+        loan_payment = 0.0
+        interest = 0.0
+        available_offset = offset
+        d_available_offset[:] = d_offset
+        d_loan_payment[:] = 0
+        d_interest[:] = 0
+        for j in range(n_tranches):
+            rate = monthly_rate[j, i]
+            period_rate = rate * schedule[3, i]
+            # Compute the amortisatino payment (i.e. the constant cashflow that will repay the loan + interests
+            # over the remainnig repayments)
+            if period_rate > 0:
+                amortisation_payment = (
+                    (principal[j] - principal_paid_no_offset[j])
+                    * period_rate
+                    * (1 + period_rate) ** remaining_payments
+                    / ((1 + period_rate) ** remaining_payments - 1)
+                )
+            else:
+                amortisation_payment = (principal[j] - principal_paid_no_offset[j]) / remaining_payments
+            if exact:
+                amortisation_payment = np.ceil(amortisation_payment - ROUNDING_TOLERANCE)
+            # If the loan is paid don't pay anything else, the balance is constant over interest only months
+            tranche_payment = min(payments * amortisation_payment, principal[j] - principal_paid[j])
+            paid_early = 0.0 if interest_only else tranche_payment * payment_weight / payments
+
+            # The interest depends on the amount still to pay on the loan over the month
+            balance = principal[j] - principal_paid[j]
+            if offset_tranche[j]:
+                exposed = (balance - available_offset) * accrual - paid_early
+                next_available_offset = max(available_offset - balance, 0)
+            else:
+                exposed = balance * accrual - paid_early
+                next_available_offset = available_offset
+            tranche_interest = max(0, exposed) * rate
+            exposed_no_offset = (principal[j] - principal_paid_no_offset[j]) * accrual - paid_early
+            interest_no_offset = max(0, exposed_no_offset) * rate
+            if exact:
+                tranche_interest = np.floor(tranche_interest + 0.5)
+                interest_no_offset = np.floor(interest_no_offset + 0.5)
+
+            if n_inputs:
+                # Derivatives of the annuity factor with respect to the period rate, and of the payments
+                if period_rate > 0:
+                    growth = (1 + period_rate) ** remaining_payments
+                    annuity = period_rate * growth / (growth - 1)
+                    d_annuity = growth / (growth - 1) - period_rate * remaining_payments * growth / (
+                        (1 + period_rate) * (growth - 1) ** 2
+                    )
+                else:
+                    annuity = 1 / remaining_payments
+                    d_annuity = (remaining_payments + 1) / (2 * remaining_payments)
+                amortised = payments * amortisation_payment <= principal[j] - principal_paid[j]
+                for p in range(n_inputs):
+                    d_rate = d_monthly_rate[p, j, i]
+                    d_remaining = d_principal[p, j] - d_principal_paid_no_offset[p, j]
+                    d_balance = d_principal[p, j] - d_principal_paid[p, j]
+                    if amortised:
+                        d_amortisation = d_remaining * annuity + (principal[j] - principal_paid_no_offset[j]) * (
+                            d_annuity * d_rate * schedule[3, i]
+                        )
+                        d_payment = payments * d_amortisation
+                    else:
+                        d_payment = d_balance
+                    d_paid_early = 0.0 if interest_only else d_payment * payment_weight / payments
+                    if offset_tranche[j]:
+                        d_exposed = (d_balance - d_available_offset[p]) * accrual - d_paid_early
+                        d_available_offset[p] = d_available_offset[p] - d_balance if available_offset > balance else 0
+                    else:
+                        d_exposed = d_balance * accrual - d_paid_early
+                    d_tranche_interest = (d_exposed * rate + exposed * d_rate) if exposed > 0 else 0.0
+                    d_exposed_no_offset = d_remaining * accrual - d_paid_early
+                    d_interest_no_offset = (
+                        (d_exposed_no_offset * rate + exposed_no_offset * d_rate) if exposed_no_offset > 0 else 0.0
+                    )
+                    if interest_only:
+                        d_payment = d_interest_no_offset = d_tranche_interest
+                    d_principal_paid[p, j] += d_payment - d_tranche_interest
+                    d_principal_paid_no_offset[p, j] += d_payment - d_interest_no_offset
+                    d_loan_payment[p] += d_payment
+                    d_interest[p] += d_tranche_interest
+
+            available_offset = next_available_offset
+            if interest_only:
+                tranche_payment = interest_no_offset = tranche_interest
+            if exact and i == n_periods - 1:
+                tranche_payment = max(balance, 0.0) + tranche_interest
+
+            principal_paid[j] = principal_paid[j] + tranche_payment - tranche_interest
+            principal_paid_no_offset[j] = principal_paid_no_offset[j] + tranche_payment - interest_no_offset
+            loan_payment += tranche_payment
+            interest += tranche_interest
 
         # Don't pay fees once the loan is fully repaid
-        fee = monthly_fee if loan_payment > 0 else 0
+        fee = (monthly_fee if loan_payment > 0 else 0) + switching_cost
+
+        if with_offset_account:
+            offset = (
+                offset
+                + _to_unit(monthly_income[i], unit)
+                - loan_payment
+                - _to_unit(monthly_costs[i], unit)
+                - fee
+                - _to_unit(expenses[i], unit)
+            )
+            for p in range(n_inputs):
+                d_offset[p] += d_cashflow[p, i] - d_loan_payment[p] - (d_monthly_fee[p] if loan_payment > 0 else 0)
 
-        principal_paid_[i] = principal_paid + loan_payment - interest
-        principal_paid_no_offset_[i] = principal_paid_no_offset + loan_payment - interest_no_offset
+        extra_left = max(0.0, _to_unit(extra_repayment[i], unit))
+        d_extra_left[:] = 0
+        if with_offset_account and offset < extra_left:
+            extra_left = max(offset, 0.0)
+            if offset > 0:
+                d_extra_left[:] = d_offset
+        extra = 0.0
+        d_extra[:] = 0
+        for j in range(n_tranches):
+            tranche_extra = min(extra_left, max(principal[j] - principal_paid[j], 0.0))
+            for p in range(n_inputs):
+                if extra_left <= principal[j] - principal_paid[j]:
+                    d_tranche_extra = d_extra_left[p]
+                elif principal[j] - principal_paid[j] > 0:
+                    d_tranche_extra = d_principal[p, j] - d_principal_paid[p, j]
+                else:
+                    d_tranche_extra = 0.0
+                d_principal_paid[p, j] += d_tranche_extra
+                d_extra_left[p] -= d_tranche_extra
+                d_extra[p] += d_tranche_extra
+            principal_paid[j] = principal_paid[j] + tranche_extra
+            extra_left -= tranche_extra
+            extra += tranche_extra
         if with_offset_account:
-            offset_[i] = offset + monthly_income - loan_payment - monthly_costs - fee - expenses[i]
-        principal_payment_[i] = loan_payment - interest
-        interest_[i] = interest
-        fee_[i] = fee
-        repayment_[i] = loan_payment + fee
+            offset = offset - extra
+            for p in range(n_inputs):
+                d_offset[p] -= d_extra[p]
 
-    return principal_paid_, offset_, principal_payment_, interest_, fee_, repayment_
+        out[0, i] = (refinanced_principal_paid + principal_paid.sum()) / unit
+        out[1, i] = offset / unit
+        out[2, i] = (loan_payment - interest + extra) / unit
+        out[3, i] = interest / unit
+        out[4, i] = fee / unit
+        out[5, i] = (loan_payment + fee) / unit
+        out[6, i] = extra / unit
+        discount_factor /= 1 + discount_rate[0, i]
+        price_index *= 1 + discount_rate[1, i]
+        out[7, i] = (loan_payment + fee + extra) / unit * discount_factor
+        out[8, i] = (loan_payment + fee) / unit / price_index
+        out[9, i] = offset / unit / price_index
+        for p in range(n_inputs):
+            d_fee = d_monthly_fee[p] if loan_payment > 0 else 0.0
+            d_out[p, 0, i] = d_refinanced_principal_paid[p] + d_principal_paid[p].sum()
+            d_out[p, 1, i] = d_offset[p]
+            d_out[p, 2, i] = d_loan_payment[p] - d_interest[p] + d_extra[p]
+            d_out[p, 3, i] = d_interest[p]
+            d_out[p, 4, i] = d_fee
+            d_out[p, 5, i] = d_loan_payment[p] + d_fee
+            d_out[p, 6, i] = d_extra[p]
+            d_out[p, 7, i] = (d_loan_payment[p] + d_fee + d_extra[p]) * discount_factor
+            d_out[p, 8, i] = (d_loan_payment[p] + d_fee) / price_index
+            d_out[p, 9, i] = d_offset[p] / price_index
+        remaining_payments -= int(payments)
 
 
 @lru_cache
 def read_historical_rates() -> pd.DataFrame:
-    """Read the historical rates"""
+    """Read the historical rates, from the CSV file given by LOAN_CALCULATOR_HISTORICAL_RATES if set"""
+    if os.environ.get(HISTORICAL_RATES_ENV):
+        return pd.read_csv(os.environ[HISTORICAL_RATES_ENV])
     try:
         return pd.read_html("https://www.rba.gov.au/statistics/cash-rate#datatable")[0]
     except Exception:
-        return pd.read_csv("loan_calculator/assets/historical_rates.csv")
+        return pd.read_csv(HISTORICAL_RATES_PATH)
+
+
+@lru_cache
+def get_historical_rate_changes() -> tuple[np.ndarray, np.ndarray]:
+    """Historical cash rate changes as (effective month ordinal, cumulative change in %)
+
+    Changes take effect from the month following their announcement.
+    """
+    histo = (
+        read_historical_rates()
+        .rename(columns={"Effective Date": "date", "Change%\xa0points": "value"})
+        .assign(
+            date=lambda df: pd.to_datetime(df["date"], format="%d %b %Y", errors="coerce"),
+            value=lambda df: pd.to_numeric(df["value"], errors="coerce"),
+        )[["date", "value"]]
+        .dropna()
+        .query("value != 0")
+    )
+    months = month_ordinal(histo["date"].to_numpy()) + 1
+    order = np.argsort(months, kind="stable")
+    effective, first = np.unique(months[order], return_index=True)
+    cumulative = np.cumsum(np.add.reduceat(histo["value"].to_numpy()[order], first))
+    return effective.astype(np.int32), cumulative
+
+
+def month_ordinal(dates) -> np.ndarray | int:
+    """Month ordinal (number of months since January 1970) of one or several dates"""
+    months = np.asarray(dates, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int32)
+    return months if months.ndim else int(months)
+
+
+def first_month_on_or_after(dates) -> np.ndarray | int:
+    """Month ordinal of the first month start falling on or after each date"""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    months = month_ordinal(days) + (days != days.astype("datetime64[M]").astype("datetime64[D]"))
+    return months.astype(np.int32) if days.ndim else int(months)
+
+
+def loan_months(settlement_date: str | date | pd.Timestamp, loan_duration: float) -> np.ndarray:
+    """Month ordinals of the loan repayments, starting on the first month start after settlement"""
+    start = first_month_on_or_after(settlement_date)
+    return np.arange(start, start + round(loan_duration * 12), dtype=np.int32)
+
 
-def get_monthly_rate_series(
+def month_index(months: np.ndarray) -> pd.DatetimeIndex:
+    """Convert month ordinals to a DatetimeIndex of month starts, for plotting and export"""
+    return pd.DatetimeIndex(np.asarray(months).astype("datetime64[M]").astype("datetime64[ns]"), name="date")
+
+
+def with_date_index(data: pd.DataFrame) -> pd.DataFrame:
+    """Convert a loan timeseries indexed by month ordinals to a DatetimeIndex"""
+    return data.set_axis(month_index(data.index.to_numpy()))
+
+
+def get_rate_delta_series(
     *,
-    date_period: pd.DatetimeIndex,
+    months: np.ndarray,
+    rates_change: RatesForecast,
+    settlement_date: str | date | pd.Timestamp,
+) -> np.ndarray:
+    """Create the array of rate changes (in % points) from the history and forecast over the month ordinals"""
+    effective = np.empty(0, dtype=np.int32)
+    values = np.empty(0)
+    if settlement_date < date.today():
+        # Historical changes, relative to the first change after settlement
+        effective, cumulative = get_historical_rate_changes()
+        start = np.searchsorted(effective, first_month_on_or_after(settlement_date))
+        values = cumulative - cumulative[min(start, cumulative.shape[0] - 1)]
+
+    if rates_change.changes:
+        effective = np.r_[effective, first_month_on_or_after([c.date for c in rates_change.changes])]
+        values = np.r_[values, [c.value for c in rates_change.changes]]
+
+    if not effective.shape[0]:
+        return np.zeros(months.shape[0])
+    # Each change holds until the next one
+    order = np.argsort(effective, kind="stable")
+    latest = np.searchsorted(effective[order], months, side="right") - 1
+    return np.where(latest >= 0, values[order][latest], 0)
+
+
+def get_variable_rate_pct(rate: np.ndarray | float, rate_delta: np.ndarray | float) -> np.ndarray:
+    """Variable rates in %, from the offer rates and the rate changes in % points, not going below zero
+
+    Every path building the rates of the kernels goes through it, e.g. when the cuts replayed from a high rate era or a
+    forecast take a low rate offer below zero.
+    """
+    return np.maximum(rate + rate_delta, 0)
+
+
+def get_monthly_rate_series(  # pylint: disable = too-many-arguments
+    *,
+    months: np.ndarray,
     rate: float,
     rates_change: RatesForecast,
     with_fixed_rate: bool = False,
     fixed_rate: float = None,
     fixed_rate_duration: int = None,
     settlement_date: str | date | pd.Timestamp,
-):
-    """Create the monthly rate time series"""
-    # Define the monthly loan rate and fee
-    if settlement_date < date.today():
-        histo = read_historical_rates()
-        past_changes = (
-            histo.rename(columns={"Effective Date": "date", "Change%\xa0points": "value"})
-            .assign(
-                date=lambda df: pd.to_datetime(df["date"], format="%d %b %Y", errors="coerce")
-                + pd.offsets.MonthEnd()
-                + pd.Timedelta(days=1),
-                value=lambda df: pd.to_numeric(df["value"], errors="coerce"),
-            )
-            [["date", "value"]]
-            .dropna(subset=["value"])
-            .query("value != 0")
-            .groupby("date")[["value"]].sum()
-            .assign(value=lambda df: df["value"].cumsum() - df["value"].cumsum().loc[settlement_date:].iat[0])
-            .reset_index()
-            .to_dict("records")
-        )
-        rates_change = RatesForecast(changes=past_changes + rates_change.changes)
-
-    rate_pct = pd.Series(rate, index=date_period)
-    if rates_change.changes:
-        rate_change = (
-            pd.DataFrame(rates_change.model_dump()["changes"])
-            .dropna()
-            .assign(date=lambda df: pd.to_datetime(df["date"])).set_index("date")["value"]
-        )
-        rate_pct += (
-            rate_change.reindex(set(date_period).union(rate_change.index)).resample("MS").asfreq().ffill().fillna(0)
-        )
+) -> np.ndarray:
+    """Create the monthly rate array over the month ordinals of the loan"""
+    rate_pct = get_variable_rate_pct(
+        rate, get_rate_delta_series(months=months, rates_change=rates_change, settlement_date=settlement_date)
+    )
     if with_fixed_rate:
-        fixed_rate_end = pd.Timestamp(
-            f"{pd.Timestamp(settlement_date).year + fixed_rate_duration}-"
-            f"{pd.Timestamp(settlement_date).strftime('%m-%d')}"
-        ) - pd.Timedelta("1D")
-        rate_pct.loc[:fixed_rate_end] = fixed_rate
+        fixed_rate_end = first_month_on_or_after(settlement_date) + 12 * fixed_rate_duration
+        rate_pct[months < fixed_rate_end] = fixed_rate
 
-    monthly_rate = rate_pct / 12 / 100
+    return rate_pct / 12 / 100
 
-    return monthly_rate
 
+def get_expenses_series(*, months: np.ndarray, expenses: FutureExpenses) -> np.ndarray:
+    """Create the array of extra expenses over the month ordinals of the loan
 
-def get_expenses_series(*, date_period: pd.DatetimeIndex, expenses: FutureExpenses):
-    """Create the time series of extra expenses"""
+    Expenses are taken from the offset account the month following their date.
+    """
+    series = np.zeros(months.shape[0])
     if expenses.expenses:
-        return (
-            pd.DataFrame(expenses.model_dump()["expenses"])
-            .dropna()
-            .assign(date=lambda df: pd.to_datetime(df["date"]) + pd.offsets.MonthBegin())
-            .set_index("date")["value"]
-            .reindex(date_period)
-            .fillna(0)
-        )
-    return pd.Series(0, index=date_period)
+        position = month_ordinal([e.date for e in expenses.expenses]) + 1 - months[0]
+        in_period = (position >= 0) & (position < months.shape[0])
+        np.add.at(series, position[in_period], np.array([e.value for e in expenses.expenses])[in_period])
+    return series
+
+
+def get_budget_series(*, months: np.ndarray, project: Project) -> tuple[np.ndarray, np.ndarray]:
+    """Create the arrays of monthly income and costs over the month ordinals of the loan
+
+    The project's income and costs change by its budget changes from the first month starting on or after their date,
+    and grow at their yearly rate from the start of the loan.
+
+    :param months: Month ordinals of a loan, or of several loans along the last axis
+    :param project: Home loan project
+    """
+    months = np.asarray(months)
+    income = np.full(months.shape, float(project.monthly_income))
+    costs = np.full(months.shape, float(project.monthly_costs))
+    if project.budget_changes:
+        active = months[..., None] >= first_month_on_or_after([c.date for c in project.budget_changes])
+        income += active @ np.array([c.income for c in project.budget_changes])
+        costs += active @ np.array([c.costs for c in project.budget_changes])
+    years = (months - months[..., :1]) / 12
+    return income * (1 + project.income_growth / 100) ** years, costs * (1 + project.costs_growth / 100) ** years
+
+
+def get_discount_series(*, months: np.ndarray, project: Project) -> np.ndarray:
+    """Create the monthly discount and inflation rates (see DISCOUNT_ROWS) over the month ordinals of the loan
+
+    :param months: Month ordinals of a loan, or of several loans along the last axis
+    :param project: Home loan project
+    :return: Array of shape (..., 2, n_months)
+    """
+    months = np.asarray(months)
+    yearly_rates = np.array([project.discount_rate, project.inflation_rate], dtype=float)
+    monthly_rates = (1 + yearly_rates / 100) ** (1 / 12) - 1
+    return np.ones((*months.shape[:-1], len(DISCOUNT_ROWS), months.shape[-1])) * monthly_rates[:, None]
@@ -1,6 +1,7 @@
 import dash_mantine_components as dmc
 from dash import Dash, _dash_renderer
 
+from loan_calculator import single_flight, timing
 from loan_calculator.shell import create_appshell
 
 _dash_renderer._set_react_version("18.2.0")
@@ -18,6 +19,20 @@ app.config.suppress_callback_exceptions = True
 app.css.config.serve_locally = True
 app.scripts.config.serve_locally = True
 server = app.server
+timing.configure_logging()
+server.after_request(timing.record_response)
+
+
+@server.get("/_stats/single-flight")
+def single_flight_stats():
+    """Duplicate work counters of the single flight layers of this worker"""
+    return single_flight.get_stats()
+
+
+@server.get("/_stats/timing")
+def timing_stats():
+    """p50/p95/p99 durations of the stages of the timed callbacks of this worker"""
+    return timing.get_stats()
 
 
 app.layout = create_appshell()
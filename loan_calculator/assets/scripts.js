@@ -2,3 +2,64 @@
 if (!window.dash_clientside) {
     window.dash_clientside = {};
 }
+
+/** Decode a plotly array, which may be serialised as a base64 typed array */
+const decodePlotlyArray = (values) => {
+    if (!values || !values.bdata) return values || []
+    const types = {
+        f8: Float64Array, f4: Float32Array, i4: Int32Array, i2: Int16Array, i1: Int8Array,
+        u4: Uint32Array, u2: Uint16Array, u1: Uint8Array,
+    }
+    const bytes = Uint8Array.from(atob(values.bdata), c => c.charCodeAt(0))
+    return Array.from(new types[values.dtype](bytes.buffer))
+}
+
+window.dash_clientside.home = {
+    /** Show the offer cards whose name contains the search, case insensitive */
+    filterOffers: function(search, cardIds) {
+        const query = (search || "").toLowerCase()
+        return cardIds.map(({name}) => ({display: !query || name.toLowerCase().includes(query) ? "flex" : "none"}))
+    },
+
+    /** Principal of each offer card given the property value of the project */
+    offerPrincipals: function(project, principalIds, loans) {
+        const propertyValue = (project && project.property_value) || 0
+        return principalIds.map(({name}) => {
+            const principal = ((loans && loans[name] && loans[name].borrowed_share) || 0) * propertyValue / 100
+            return `Principal: $${principal.toLocaleString("en-US", {maximumFractionDigits: 0})}`
+        })
+    },
+
+    /** Crop the comparison charts to the first years of the loans, or show the whole loan duration.
+     * The y ranges are shared between charts of the same metric, as when they are created. */
+    cropCharts: function(checked, years, chartIds, figures) {
+        const ctx = dash_clientside.callback_context
+        const cropChanged = ctx.triggered.some(t => !t.prop_id.endsWith(".id"))
+        const nMonths = checked && years > 0 ? Math.round(years * 12) : null
+        if (!figures.length || (!nMonths && !cropChanged)) return dash_clientside.no_update
+
+        const margins = {cumulative: 1.1, monthly: 1.05}
+        const yMax = {}
+        const totals = figures.map((figure, i) => {
+            const total = figure.data.find(trace => trace.name === "Total")
+            const y = decodePlotlyArray(total?.y).slice(0, nMonths || undefined)
+            const metric = chartIds[i].metric
+            yMax[metric] = Math.max(yMax[metric] || 0, ...y)
+            return total
+        })
+
+        return figures.map((figure, i) => {
+            const x = totals[i]?.x || []
+            const layout = {...figure.layout}
+            if (nMonths && x.length) {
+                const yRange = [0, yMax[chartIds[i].metric] * (margins[chartIds[i].metric] || 1.1)]
+                layout.xaxis = {...layout.xaxis, range: [x[0], x[Math.min(nMonths, x.length) - 1]], autorange: false}
+                layout.yaxis = {...layout.yaxis, range: yRange, autorange: false}
+            } else {
+                layout.xaxis = {...layout.xaxis, range: undefined, autorange: true}
+                layout.yaxis = {...layout.yaxis, range: undefined, autorange: true}
+            }
+            return {...figure, layout}
+        })
+    },
+}
@@ -0,0 +1,82 @@
+import dash_mantine_components as dmc
+import numpy as np
+import pandas as pd
+from dash import dcc, html
+from pydantic import ValidationError
+
+from loan_calculator import analytics, plots
+from loan_calculator.components import table
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
+
+
+class ids:  # pylint: disable = invalid-name
+    """Backtest panel IDs"""
+
+    select = "backtest_selection"
+    results = "backtest_results"
+
+
+def layout():
+    """Backtest panel layout"""
+    return [
+        dmc.MultiSelect(id=ids.select, label="Offers", data=[], value=[], persistence=True),
+        dmc.Space(h="md"),
+        html.Div(id=ids.results),
+    ]
+
+
+def backtest_content(
+    loans_names: list[str],
+    project_data: dict,
+    rates_change: dict,
+    expenses: dict,
+    loans_data: dict,
+):
+    """Distributions of the interest and fees paid and of the time to repay the offers over past settlement dates"""
+    if not loans_names or not loans_data:
+        return dmc.Text("Select offers to run them for every past settlement month.", c="gray")
+    try:
+        project = Project(**project_data)
+        offers = [Offer(**loans_data[name]) for name in loans_names]
+    except (ValidationError, TypeError, KeyError):
+        return dmc.Text("Complete the project and the offers to run the backtest.", c="gray")
+
+    backtest = analytics.backtest_offers(
+        project=project,
+        offers=analytics.get_offer_columns(offers),
+        rates_change=RatesForecast(**rates_change),
+        expenses=FutureExpenses(**expenses),
+    )
+    cost = backtest["interest"] + backtest["fees"]
+    years = backtest["payoff_months"] / 12
+    table_data = pd.DataFrame(
+        {
+            "Offer": loans_names,
+            **{
+                f"Interest & Fees {label}": [f"${x:,.0f}" for x in np.percentile(cost, q, axis=1)]
+                for label, q in [("P10", 10), ("median", 50), ("P90", 90)]
+            },
+            "Worst Interest & Fees": [f"${x:,.0f}" for x in cost.max(axis=1)],
+            **{
+                f"Years to repay {label}": [f"{x:.1f}" for x in np.percentile(years, q, axis=1)]
+                for label, q in [("P10", 10), ("median", 50), ("P90", 90)]
+            },
+        }
+    )
+    start, end = analytics.month_index(backtest["months"][[0, -1]]).strftime("%b %Y")
+    return [
+        dmc.Text(f"{backtest['months'].shape[0]} settlement months from {start} to {end}", size="sm", c="gray"),
+        dmc.Space(h="xs"),
+        dmc.Paper(table(table_data, striped=True), px="sm", pt="sm"),
+        dmc.Space(h="lg"),
+        dmc.Paper(
+            dcc.Graph(
+                figure=plots.make_backtest_figure(backtest, loans_names),
+                responsive=True,
+                style={"height": 400},
+                config={"displayModeBar": False},
+            ),
+            radius="md",
+            p="1rem",
+        ),
+    ]
@@ -0,0 +1,117 @@
+import time
+
+import dash_mantine_components as dmc
+import pandas as pd
+from dash import Input, Output, callback, dcc, html, no_update
+from dash_iconify import DashIconify
+from dash_pydantic_form import ModelForm
+from pydantic import ValidationError
+
+from loan_calculator import analytics, catalogue_panel
+from loan_calculator.catalogue import get_catalogue
+from loan_calculator.components import table
+from loan_calculator.data_models import FutureExpenses, Project, RatesForecast
+from loan_calculator.shell import ids as shell_ids
+
+
+class ids:  # pylint: disable = invalid-name
+    """Best offers panel IDs"""
+
+    k = "best_offers_k"
+    horizon = "best_offers_horizon"
+    years = "best_offers_years"
+    results = "best_offers_results"
+    best = "best_offers_store"
+    add = "best_offers_add"
+
+
+def layout():
+    """Best offers panel layout"""
+    return [
+        dmc.Group(
+            [
+                dmc.NumberInput(id=ids.k, label="Number of offers", value=10, min=1, max=100, w=150),
+                dmc.SegmentedControl(
+                    id=ids.horizon,
+                    data=[{"value": "loan", "label": "Whole loan"}, {"value": "years", "label": "First years"}],
+                    value="loan",
+                ),
+                dmc.NumberInput(id=ids.years, label="Years", value=10, min=1, max=40, w=100),
+                dmc.Button(
+                    "Add to my offers",
+                    leftSection=DashIconify(icon="carbon:add", height=16),
+                    id=ids.add,
+                    variant="outline",
+                    ml="auto",
+                ),
+            ],
+            align="end",
+            gap="md",
+        ),
+        dmc.Space(h="md"),
+        html.Div(id=ids.results),
+        dcc.Store(id=ids.best),
+    ]
+
+
+@callback(
+    Output(ids.results, "children"),
+    Output(ids.best, "data"),
+    Input(ids.k, "value"),
+    Input(ids.horizon, "value"),
+    Input(ids.years, "value"),
+    Input(ModelForm.ids.main("project", "sidebar"), "data"),
+    Input(ModelForm.ids.main("rates", "sidebar"), "data"),
+    Input(ModelForm.ids.main("expenses", "sidebar"), "data"),
+    Input(catalogue_panel.ids.version, "data"),
+    Input(shell_ids.tabs, "value"),
+)
+def rank_catalogue(  # pylint: disable = too-many-arguments
+    k, horizon, years, project_data, rates_change, expenses, _, tab
+):
+    """Rank the catalogue offers for the project, while the best offers tab is visible"""
+    if tab != "best_offers":
+        return no_update, no_update
+    catalogue = get_catalogue()
+    if not catalogue:
+        return dmc.Text("Import a catalogue of offers in the Catalogue tab.", c="gray"), []
+    try:
+        project = Project(**project_data)
+    except (ValidationError, TypeError):
+        return dmc.Text("Complete the project to rank the offers.", c="gray"), []
+
+    years = years if horizon == "years" and years else None
+    start = time.perf_counter()
+    positions, costs, n_simulated = analytics.rank_offers(
+        project=project,
+        offers=catalogue.columns,
+        rates_change=RatesForecast(**rates_change),
+        expenses=FutureExpenses(**expenses),
+        k=int(k or 10),
+        years=years,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+
+    offers = catalogue.offers(positions)
+    data = pd.DataFrame(
+        {
+            "Rank": range(1, len(offers) + 1),
+            "Name": [offer.name for offer in offers],
+            "Initial rate": [f"{catalogue.columns['initial_rate'][i]:.2f}%" for i in positions],
+            "Variable rate": [f"{offer.rate:.2f}%" for offer in offers],
+            "Fixed period": [f"{offer.fixed_rate_duration}y" if offer.with_fixed_rate else "" for offer in offers],
+            "Yearly fees": [f"${offer.yearly_fees:,.0f}" for offer in offers],
+            "Offset": ["Yes" if offer.with_offset_account else "No" for offer in offers],
+            "Interest & Fees" + (f" @ year {years:g}" if years else ""): [f"${cost:,.0f}" for cost in costs],
+        }
+    )
+    return [
+        dmc.Text(
+            f"{n_simulated:,} of {len(catalogue):,} offers simulated, the others could not make the top {len(offers)} "
+            f"({elapsed:.0f} ms)",
+            size="sm",
+            c="gray",
+        ),
+        dmc.Space(h="xs"),
+        dmc.Paper(table(data, striped=True), px="sm", pt="sm"),
+    ], [offer.model_dump() for offer in offers]
@@ -0,0 +1,195 @@
+import io
+import json
+import os
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from pydantic import ValidationError
+
+from loan_calculator.analytics import PAYMENTS_PER_YEAR, get_offer_columns
+from loan_calculator.data_models import Offer
+
+CATALOGUE_ENV = "LOAN_CALCULATOR_CATALOGUE"
+
+INDEXED_COLUMNS = ["rate", "initial_rate", "yearly_fees", "fixed_rate_duration"]
+FREQUENCIES = {n: frequency for frequency, n in PAYMENTS_PER_YEAR.items()}
+
+
+class OfferCatalogue:
+    """Columnar catalogue of lender offers.
+
+    Offers are stored as one numpy array per field. Sorted indexes on the rates, fees and fixed rate period turn range
+    filters into binary searches, and the offset account availability is a boolean mask.
+    The initial rate is the fixed rate for offers with a fixed rate period, the variable rate otherwise.
+    """
+
+    def __init__(self, offers: list[Offer], rejected: list[tuple[int, str]] = None):
+        self.rejected = rejected or []
+        self.names = np.array([offer.name for offer in offers], dtype=object)
+        self._lower_names = np.char.lower(self.names.astype(str))
+        self.columns = get_offer_columns(offers)
+        self._indexes = {}
+        for column in INDEXED_COLUMNS:
+            order = np.argsort(self.columns[column], kind="stable")
+            self._indexes[column] = (order, self.columns[column][order])
+
+    def __len__(self) -> int:
+        return self.names.shape[0]
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "OfferCatalogue":
+        """Create a catalogue from offer records, the invalid ones are kept in `rejected` with their error"""
+        offers, rejected = [], []
+        for i, record in enumerate(records):
+            try:
+                offers.append(Offer(**{k: v for k, v in record.items() if v is not None and v == v}))
+            except (ValidationError, TypeError) as exc:
+                rejected.append((i, str(exc).splitlines()[0]))
+        return cls(offers, rejected)
+
+    @classmethod
+    def from_csv(cls, file: str | Path | io.IOBase) -> "OfferCatalogue":
+        """Create a catalogue from a CSV file with one offer per row and the Offer fields as columns"""
+        return cls.from_records(pd.read_csv(file).to_dict("records"))
+
+    @classmethod
+    def from_json(cls, file: str | Path | io.IOBase) -> "OfferCatalogue":
+        """Create a catalogue from a JSON list of offers, or an object with the list under "offers" """
+        if isinstance(file, (str, Path)):
+            data = json.loads(Path(file).read_text(encoding="utf-8"))
+        else:
+            data = json.load(file)
+        return cls.from_records(data["offers"] if isinstance(data, dict) else data)
+
+    @classmethod
+    def from_file(cls, file: str | Path) -> "OfferCatalogue":
+        """Create a catalogue from a CSV or JSON file, depending on its extension"""
+        if Path(file).suffix.lower() == ".json":
+            return cls.from_json(file)
+        return cls.from_csv(file)
+
+    def query(  # pylint: disable = too-many-arguments
+        self,
+        *,
+        ranges: dict[str, tuple[float | None, float | None]] = None,
+        with_offset_account: bool = None,
+        name: str = None,
+        sort_by: str = None,
+        ascending: bool = True,
+        limit: int = None,
+    ) -> np.ndarray:
+        """Positions of the offers matching the filters
+
+        :param ranges: Inclusive (min, max) bounds per numeric column, None for an open bound
+        :param with_offset_account: Only keep the offers with (or without) an offset account
+        :param name: Only keep the offers whose name contains this text, case insensitive
+        :param sort_by: Column to sort by
+        :param ascending: Sort direction
+        :param limit: Maximum number of offers to return
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for column, (low, high) in (ranges or {}).items():
+            if low is None and high is None:
+                continue
+            if column in self._indexes:
+                order, values = self._indexes[column]
+                start = 0 if low is None else np.searchsorted(values, low, side="left")
+                end = len(self) if high is None else np.searchsorted(values, high, side="right")
+                in_range = np.zeros(len(self), dtype=bool)
+                in_range[order[start:end]] = True
+                mask &= in_range
+            else:
+                values = self.columns[column]
+                mask &= (values >= (-np.inf if low is None else low)) & (values <= (np.inf if high is None else high))
+        if with_offset_account is not None:
+            mask &= self.columns["with_offset_account"] == with_offset_account
+        if name:
+            mask &= np.char.find(self._lower_names, name.lower()) >= 0
+
+        if sort_by is None:
+            positions = np.flatnonzero(mask)
+        else:
+            order = self._indexes[sort_by][0] if sort_by in self._indexes else np.argsort(self.columns[sort_by])
+            positions = order[mask[order]]
+            if not ascending:
+                positions = positions[::-1]
+        return positions[:limit]
+
+    def offers(self, positions: np.ndarray = None) -> list[Offer]:
+        """Offers at the given positions"""
+        positions = np.arange(len(self)) if positions is None else positions
+        return [
+            Offer(
+                name=self.names[i],
+                **{
+                    column: self.columns[column][i].item()
+                    for column in ["rate", "borrowed_share", "loan_duration", "yearly_fees", "with_offset_account"]
+                },
+                with_fixed_rate=bool(self.columns["with_fixed_rate"][i]),
+                fixed_rate=self.columns["fixed_rate"][i].item() if self.columns["with_fixed_rate"][i] else None,
+                fixed_rate_duration=(
+                    int(self.columns["fixed_rate_duration"][i]) if self.columns["with_fixed_rate"][i] else None
+                ),
+                fixed_share=(
+                    None if np.isnan(self.columns["fixed_share"][i]) else self.columns["fixed_share"][i].item()
+                ),
+                interest_only_duration=int(self.columns["interest_only_duration"][i]) or None,
+                repayment_frequency=FREQUENCIES[self.columns["payments_per_year"][i]],
+                daily_interest=bool(self.columns["daily_interest"][i]),
+            )
+            for i in positions
+        ]
+
+    def to_frame(self, positions: np.ndarray = None) -> pd.DataFrame:
+        """Catalogue as a dataframe, restricted to the given positions"""
+        positions = np.arange(len(self)) if positions is None else positions
+        return (
+            pd.DataFrame(
+                {
+                    "name": self.names[positions],
+                    **{k: v[positions] for k, v in self.columns.items() if k != "initial_rate"},
+                }
+            )
+            .assign(payments_per_year=lambda df: df["payments_per_year"].map(FREQUENCIES))
+            .rename(columns={"payments_per_year": "repayment_frequency"})
+        )
+
+
+_catalogue: OfferCatalogue | None = None
+_catalogue_mtime: float | None = None
+_catalogue_lock = Lock()
+
+
+def get_catalogue() -> OfferCatalogue | None:
+    """Catalogue of the process, reloaded when the file given by LOAN_CALCULATOR_CATALOGUE changes"""
+    global _catalogue, _catalogue_mtime  # pylint: disable = global-statement
+    path = os.environ.get(CATALOGUE_ENV)
+    if not path or not Path(path).exists():
+        return _catalogue
+    mtime = Path(path).stat().st_mtime
+    with _catalogue_lock:
+        if mtime != _catalogue_mtime:
+            _catalogue, _catalogue_mtime = OfferCatalogue.from_file(path), mtime
+    return _catalogue
+
+
+def set_catalogue(catalogue: OfferCatalogue) -> bool:
+    """Replace the catalogue of the process, and save it to LOAN_CALCULATOR_CATALOGUE for other workers if set
+
+    :param catalogue: New catalogue
+    :return: Whether the catalogue was saved for the other workers, otherwise only this process uses it
+    """
+    global _catalogue, _catalogue_mtime  # pylint: disable = global-statement
+    path = os.environ.get(CATALOGUE_ENV)
+    with _catalogue_lock:
+        _catalogue = catalogue
+        if path:
+            frame = catalogue.to_frame()
+            if Path(path).suffix.lower() == ".json":
+                frame.to_json(path, orient="records")
+            else:
+                frame.to_csv(path, index=False)
+            _catalogue_mtime = Path(path).stat().st_mtime
+    return bool(path)
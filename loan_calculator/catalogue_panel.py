@@ -0,0 +1,205 @@
+import base64
+import io
+import time
+
+import dash_mantine_components as dmc
+from dash import Input, Output, State, callback, dcc, html, no_update
+from dash_iconify import DashIconify
+
+from loan_calculator.catalogue import CATALOGUE_ENV, OfferCatalogue, get_catalogue, set_catalogue
+from loan_calculator.components import table
+
+SORT_OPTIONS = {
+    "initial_rate": "Initial rate",
+    "rate": "Variable rate",
+    "yearly_fees": "Yearly fees",
+    "fixed_rate_duration": "Fixed period",
+}
+MAX_ROWS = 50
+
+
+class ids:  # pylint: disable = invalid-name
+    """Catalogue panel IDs"""
+
+    upload = "catalogue_upload"
+    status = "catalogue_status"
+    version = "catalogue_version"
+    name = "catalogue_name"
+    max_rate = "catalogue_max_rate"
+    max_fees = "catalogue_max_fees"
+    fixed_period = "catalogue_fixed_period"
+    offset = "catalogue_offset"
+    sort_by = "catalogue_sort_by"
+    order = "catalogue_order"
+    results = "catalogue_results"
+
+
+def layout():
+    """Catalogue panel layout"""
+    return [
+        dmc.Group(
+            [
+                dcc.Upload(
+                    dmc.Button("Import offers", leftSection=DashIconify(icon="carbon:upload", height=16)),
+                    id=ids.upload,
+                    accept=".csv,.json",
+                ),
+                dmc.Text(id=ids.status, size="sm", c="gray"),
+            ],
+            gap="md",
+        ),
+        dmc.Space(h="md"),
+        dmc.SimpleGrid(
+            [
+                dmc.TextInput(id=ids.name, label="Name", leftSection=DashIconify(icon="carbon:search")),
+                dmc.NumberInput(id=ids.max_rate, label="Max initial rate (%)", min=0, step=0.1, decimalScale=2),
+                dmc.NumberInput(id=ids.max_fees, label="Max yearly fees ($)", min=0, step=50),
+                dmc.RangeSlider(
+                    id=ids.fixed_period,
+                    label=None,
+                    min=0,
+                    max=10,
+                    value=[0, 10],
+                    marks=[{"value": v, "label": "Var." if v == 0 else f"{v}y"} for v in [0, 1, 2, 3, 5, 10]],
+                    mt="1.75rem",
+                ),
+                dmc.SegmentedControl(
+                    id=ids.offset,
+                    data=[
+                        {"value": "any", "label": "Any"},
+                        {"value": "yes", "label": "Offset"},
+                        {"value": "no", "label": "No offset"},
+                    ],
+                    value="any",
+                    mt="1.5rem",
+                ),
+                dmc.Group(
+                    [
+                        dmc.Select(
+                            id=ids.sort_by,
+                            label="Sort by",
+                            data=[{"value": k, "label": v} for k, v in SORT_OPTIONS.items()],
+                            value="initial_rate",
+                            style={"flex": 1},
+                        ),
+                        dmc.SegmentedControl(
+                            id=ids.order,
+                            data=[{"value": "asc", "label": "Asc"}, {"value": "desc", "label": "Desc"}],
+                            value="asc",
+                        ),
+                    ],
+                    align="end",
+                    gap="xs",
+                ),
+            ],
+            cols={"base": 1, "sm": 3},
+        ),
+        dmc.Space(h="md"),
+        html.Div(id=ids.results),
+        dcc.Store(id=ids.version),
+    ]
+
+
+def parse_upload(contents: str, filename: str) -> OfferCatalogue:
+    """Catalogue from the contents of a dcc.Upload"""
+    data = base64.b64decode(contents.split(",", 1)[1])
+    if filename.lower().endswith(".json"):
+        return OfferCatalogue.from_json(io.BytesIO(data))
+    return OfferCatalogue.from_csv(io.BytesIO(data))
+
+
+@callback(
+    Output(ids.status, "children"),
+    Output(ids.version, "data"),
+    Input(ids.upload, "contents"),
+    State(ids.upload, "filename"),
+)
+def import_catalogue(contents, filename):
+    """Import the uploaded catalogue"""
+    if not contents:
+        catalogue = get_catalogue()
+        return (f"{len(catalogue):,} offers in the catalogue" if catalogue else "No catalogue imported"), no_update
+    try:
+        catalogue = parse_upload(contents, filename)
+    except Exception as exc:  # pylint: disable = broad-except
+        return f"Could not read {filename}: {exc}", no_update
+    shared = set_catalogue(catalogue)
+    status = f"{len(catalogue):,} offers imported from {filename}"
+    if catalogue.rejected:
+        status += f", {len(catalogue.rejected):,} invalid rows skipped"
+    if not shared:
+        status += f". Only this worker uses it, set {CATALOGUE_ENV} to share it with the other workers"
+    return status, time.time()
+
+
+@callback(
+    Output(ids.results, "children"),
+    Input(ids.name, "value"),
+    Input(ids.max_rate, "value"),
+    Input(ids.max_fees, "value"),
+    Input(ids.fixed_period, "value"),
+    Input(ids.offset, "value"),
+    Input(ids.sort_by, "value"),
+    Input(ids.order, "value"),
+    Input(ids.version, "data"),
+)
+def query_catalogue(  # pylint: disable = too-many-arguments
+    name, max_rate, max_fees, fixed_period, offset, sort_by, order, _
+):
+    """Filter and sort the catalogue"""
+    catalogue = get_catalogue()
+    if not catalogue:
+        return dmc.Text("Import a CSV or JSON file of offers, with one offer per row and the offer fields as columns.")
+
+    start = time.perf_counter()
+    positions = catalogue.query(
+        ranges={
+            "initial_rate": (None, max_rate if max_rate != "" else None),
+            "yearly_fees": (None, max_fees if max_fees != "" else None),
+            "fixed_rate_duration": (fixed_period[0], None if fixed_period[1] >= 10 else fixed_period[1]),
+        },
+        with_offset_account={"yes": True, "no": False}.get(offset),
+        name=name,
+        sort_by=sort_by,
+        ascending=order != "desc",
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+
+    data = (
+        catalogue.to_frame(positions[:MAX_ROWS])
+        .assign(
+            rate=lambda df: df["rate"].map("{:.2f}%".format),
+            fixed_rate=lambda df: df["fixed_rate"].map(lambda x: "" if x != x else f"{x:.2f}%"),
+            fixed_rate_duration=lambda df: df["fixed_rate_duration"].map(lambda x: f"{x:.0f}y" if x else ""),
+            interest_only_duration=lambda df: df["interest_only_duration"].map(lambda x: f"{x:.0f}y" if x else ""),
+            fixed_share=lambda df: df["fixed_share"].map(lambda x: "" if x != x else f"{x:.0f}%"),
+            yearly_fees=lambda df: df["yearly_fees"].map("${:,.0f}".format),
+            borrowed_share=lambda df: df["borrowed_share"].map("{:.0f}%".format),
+            loan_duration=lambda df: df["loan_duration"].map("{:.0f}y".format),
+            with_offset_account=lambda df: df["with_offset_account"].map({True: "Yes", False: "No"}),
+            repayment_frequency=lambda df: df["repayment_frequency"].str.capitalize(),
+            daily_interest=lambda df: df["daily_interest"].map({True: "Yes", False: "No"}),
+        )
+        .drop(columns="with_fixed_rate")
+        .rename(
+            columns={
+                "name": "Name",
+                "rate": "Variable rate",
+                "borrowed_share": "Max LVR",
+                "loan_duration": "Duration",
+                "yearly_fees": "Yearly fees",
+                "fixed_rate": "Fixed rate",
+                "fixed_rate_duration": "Fixed period",
+                "fixed_share": "Fixed share",
+                "interest_only_duration": "Interest only",
+                "with_offset_account": "Offset",
+                "repayment_frequency": "Repayments",
+                "daily_interest": "Daily interest",
+            }
+        )
+    )
+    return [
+        dmc.Text(f"{len(positions):,} of {len(catalogue):,} offers ({elapsed:.1f} ms)", size="sm", c="gray"),
+        dmc.Space(h="xs"),
+        dmc.Paper(table(data, striped=True), px="sm", pt="sm") if len(data) else None,
+    ]
@@ -1,6 +1,7 @@
+from .budget import BudgetChange
 from .expense import Expense, FutureExpenses
 from .offer import Offer
 from .project import Project
 from .rate_change import RateDelta, RatesForecast
 
-__all__ = ["Expense", "FutureExpenses", "Offer", "Project", "RateDelta", "RatesForecast"]
+__all__ = ["BudgetChange", "Expense", "FutureExpenses", "Offer", "Project", "RateDelta", "RatesForecast"]
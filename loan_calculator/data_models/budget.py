@@ -0,0 +1,11 @@
+from datetime import date as date_
+
+from pydantic import BaseModel, Field
+
+
+class BudgetChange(BaseModel):
+    """Change of the monthly budget."""
+
+    date: date_ = Field(title="Date")
+    income: float = Field(title="Income change ($)", default=0)
+    costs: float = Field(title="Costs change ($)", default=0)
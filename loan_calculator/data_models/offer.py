@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field, model_validator
 
 
@@ -9,10 +11,33 @@ class Offer(BaseModel):
     borrowed_share: float = Field(title="Borrowed share (%)", default=80, ge=0, le=100)
     loan_duration: float = Field(title="Loan duration (years)", default=25, ge=1)
     yearly_fees: float = Field(title="Yearly fees ($)", default=0, ge=0)
+    interest_only_duration: int | None = Field(
+        title="Interest only period (years)",
+        description="Only the interest is repaid over the first years of the loan",
+        default=None,
+        ge=0,
+    )
     with_fixed_rate: bool = Field(title="With fixed rate", default=False)
     fixed_rate: float | None = Field(title="Fixed rate (%)", default=None)
     fixed_rate_duration: int | None = Field(title="Fixed rate duration (years)", default=None)
+    fixed_share: float | None = Field(
+        title="Fixed share (%)",
+        description="Share of the loan at the fixed rate, the rest being variable with the offset account. "
+        "The whole loan if empty.",
+        default=None,
+        ge=0,
+        le=100,
+    )
     with_offset_account: bool = Field(title="With offset account", default=False)
+    repayment_frequency: Literal["monthly", "fortnightly", "weekly"] = Field(
+        title="Repayment frequency", default="monthly"
+    )
+    daily_interest: bool = Field(
+        title="Daily interest",
+        description="Interest accrued on the daily balance and charged monthly, always the case with weekly or "
+        "fortnightly repayments",
+        default=False,
+    )
 
     @model_validator(mode="after")
     def validate_fixed_rate(self):
@@ -1,6 +1,8 @@
 from datetime import date
 from pydantic import BaseModel, Field
 
+from .budget import BudgetChange
+
 
 class Project(BaseModel):
     """Home load project."""
@@ -11,3 +13,19 @@ class Project(BaseModel):
     monthly_costs: float = Field(title="Monthly costs ($)", description="Expected costs before repayment")
     settlement_date: date = Field(title="Settlement date", default_factory=lambda : date.today())
     stamp_duty_rate: float = Field(title="Stamp duty rate (%)", ge=0, le=100, default=0)
+    income_growth: float = Field(title="Income growth (%/year)", default=0)
+    costs_growth: float = Field(title="Costs growth (%/year)", description="e.g. inflation", default=0)
+    budget_changes: list[BudgetChange] = Field(
+        title="Budget changes",
+        description="Changes of the monthly income and costs from a date on, e.g. a pay rise or a parental leave. "
+        "In today's dollars, they grow with the income and costs.",
+        default_factory=list,
+    )
+    discount_rate: float = Field(
+        title="Discount rate (%/year)",
+        description="Return the money would earn otherwise, to compare the outgoing cash in present value",
+        default=0,
+    )
+    inflation_rate: float = Field(
+        title="Inflation (%/year)", description="To compare the repayments and offset in today's dollars", default=0
+    )
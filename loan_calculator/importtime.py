@@ -0,0 +1,97 @@
+"""Import time report of the app
+
+Run with `python -m loan_calculator.importtime <command>`:
+- `report` prints the modules taking the most time to import with the app, from `python -X importtime`
+- `check` fails if importing the app takes longer than the budget, or imports one of the modules kept lazy
+
+The import time of the app is also tracked over the history by the asv benchmarks, see `benchmarks/bench_startup.py`.
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+import pandas as pd
+
+MODULE = "loan_calculator.application"
+# Best import time of the app over the runs, in seconds
+IMPORT_BUDGET = 3.0
+# Modules only imported on first use, by the kernels of `analytics` and the figures of `plots`
+LAZY_MODULES = ["numba", "llvmlite", "plotly.express", "plotly.subplots", "lxml"]
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure_imports(module: str = MODULE) -> pd.DataFrame:
+    """Import times of the modules imported by a module in a fresh interpreter, from `python -X importtime`
+
+    :param module: Module to import
+    :return: Dataframe indexed by module name, in import order, with the self and cumulative import times in ms and
+        the nesting level of the import
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = [
+        {
+            "module": name,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "level": len(indent) // 2,
+        }
+        for self_us, cumulative_us, indent, name in IMPORTTIME_PATTERN.findall(process.stderr)
+    ]
+    return pd.DataFrame(rows).set_index("module")
+
+
+def report(imports: pd.DataFrame, n_modules: int = 30) -> str:
+    """Report of the total import time, the slowest modules and the loan_calculator modules"""
+    total = imports["cumulative_ms"].iat[-1]
+    with pd.option_context("display.float_format", "{:,.1f}".format, "display.width", 120):
+        return "\n\n".join(
+            [
+                f"Import of {imports.index[-1]}: {total:,.0f}ms, {len(imports)} modules",
+                "Slowest modules, self time:\n" + imports.nlargest(n_modules, "self_ms").to_string(),
+                "Slowest top level packages, cumulative time:\n"
+                + imports.query("level <= 1").nlargest(n_modules, "cumulative_ms").to_string(),
+                "loan_calculator modules:\n" + imports.filter(like="loan_calculator", axis=0).to_string(),
+            ]
+        )
+
+
+def check(n_runs: int = 3, budget: float = IMPORT_BUDGET) -> list[str]:
+    """Check the import of the app against its budget and the modules kept lazy
+
+    :param n_runs: Number of imports measured, the best one is compared to the budget
+    :param budget: Import time budget, in seconds
+    :return: Description of each failure
+    """
+    runs = [measure_imports() for _ in range(n_runs)]
+    failures = [f"{module} is imported at startup" for module in LAZY_MODULES if module in runs[0].index]
+    best = min(imports["cumulative_ms"].iat[-1] for imports in runs) / 1000
+    if best > budget:
+        failures.append(f"Import of {MODULE} takes {best:.2f}s, more than the budget of {budget:.2f}s")
+    return failures
+
+
+def main():
+    """Run a command of the import time report"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["report", "check"], nargs="?", default="report")
+    parser.add_argument("--modules", type=int, default=30, help="Number of modules listed, for report")
+    parser.add_argument("--runs", type=int, default=3, help="Number of imports measured, for check")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET, help="Import time budget in seconds, for check")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        print(report(measure_imports(), n_modules=args.modules))
+    else:
+        failures = check(n_runs=args.runs, budget=args.budget)
+        print("\n".join(failures) or f"Import of {MODULE} within {args.budget:.2f}s without the lazy modules")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""Load testing harness of the Dash callbacks
+
+Run with `python -m loan_calculator.loadtest`. It starts the app with gunicorn for each combination of worker profile
+(`--profile 2x4` for 2 workers of 4 threads) and engine settings (`--settings NUMBA_NUM_THREADS=1`, environment
+variables of the app), then virtual users replay `_dash-update-component` requests for a duration:
+- `sidebar`: an edit of the project in the sidebar, firing every callback the sidebar forms are an input of
+- `selection`: a change of the offers selected for the comparison
+- `offers`: an edit of an offer, re-rendering the offers grid and the panels the offer book is an input of
+
+The first 10 years switch and the years slider of the comparison only run clientside callbacks and are not replayed.
+The report gives the throughput, the latency percentiles, the server time from the Server-Timing header (see
+`loan_calculator.timing`) and the peak memory of the workers, in total and per callback.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+APP = "loan_calculator.application:server"
+READY_TIMEOUT = 120
+REQUEST_TIMEOUT = 600
+MEMORY_INTERVAL = 0.5
+# Ids of the components the scenarios change, the sidebar forms being identified by their aio_id
+FORMS = ["project", "rates", "expenses"]
+SELECTION_ID = "loan_selection"
+LOANS_ID = "loans_store"
+BREAKPOINTS_ID = "breakpoints"
+SESSION_ID = "session-id"
+# Tab of the home page, the analysis panels only computing while their tab is visible
+TABS_ID = "home-tabs"
+DEFAULT_MIX = {"sidebar": 0.5, "selection": 0.4, "offers": 0.1}
+
+
+def get_offers(n_offers: int, seed: int = 0) -> dict[str, dict]:
+    """Offer book of n_offers varied offers, by name"""
+    rng = random.Random(seed)
+    offers = {}
+    for i in range(n_offers):
+        name = f"Offer {i + 1}"
+        offers[name] = {
+            "name": name,
+            "rate": round(rng.uniform(5, 7), 2),
+            "borrowed_share": rng.choice([70, 80, 90]),
+            "loan_duration": rng.choice([25, 30]),
+            "yearly_fees": rng.choice([0, 250, 400]),
+            "with_offset_account": i % 2 == 0,
+        }
+        if i % 3 == 2:
+            offers[name].update(with_fixed_rate=True, fixed_rate=round(rng.uniform(4.5, 6), 2), fixed_rate_duration=3)
+    return offers
+
+
+def get_initial_state(offers: dict[str, dict], session: str) -> dict:
+    """Values of the components of a virtual user, by component id"""
+    return {
+        "project": {
+            "property_value": 800_000,
+            "start_capital": 250_000,
+            "monthly_income": 12_000,
+            "monthly_costs": 6_000,
+            "settlement_date": "2025-01-01",
+            "stamp_duty_rate": 4,
+        },
+        "rates": {"changes": [{"date": "2027-01-01", "value": 0.5}]},
+        "expenses": {"expenses": []},
+        SELECTION_ID: list(offers)[:3],
+        LOANS_ID: json.loads(json.dumps(offers)),
+        BREAKPOINTS_ID: "desktop",
+        SESSION_ID: session,
+        TABS_ID: "comparison",
+    }
+
+
+def edit_sidebar(state: dict, rng: random.Random) -> str:
+    """Change the project as a sidebar edit would, returning the id of the changed component"""
+    state["project"]["property_value"] = rng.randrange(500_000, 1_200_000, 10_000)
+    state["project"]["monthly_income"] = rng.randrange(8_000, 16_000, 500)
+    return "project"
+
+
+def select_offers(state: dict, rng: random.Random) -> str:
+    """Change the offers selected for the comparison, returning the id of the changed component"""
+    names = list(state[LOANS_ID])
+    state[SELECTION_ID] = rng.sample(names, rng.randint(1, min(5, len(names))))
+    return SELECTION_ID
+
+
+def edit_offer(state: dict, rng: random.Random) -> str:
+    """Change the rate of an offer, returning the id of the changed component"""
+    offer = state[LOANS_ID][rng.choice(list(state[LOANS_ID]))]
+    offer["rate"] = round(rng.uniform(5, 7), 2)
+    return LOANS_ID
+
+
+SCENARIOS = {"sidebar": edit_sidebar, "selection": select_offers, "offers": edit_offer}
+
+
+def get_key(component_id: str) -> str:
+    """Key of a component in the state of a virtual user"""
+    if component_id.startswith("{"):
+        return json.loads(component_id).get("aio_id")
+    return component_id
+
+
+def parse_output(output: str) -> dict | list[dict]:
+    """Outputs of a callback in the format of the update request, from its dependency output string"""
+
+    def parse(item: str) -> dict:
+        component_id, _, prop = item.rpartition(".")
+        return {"id": json.loads(component_id) if component_id.startswith("{") else component_id, "property": prop}
+
+    if output.startswith(".."):
+        return [parse(item) for item in output[2:-2].split("...")]
+    return parse(output)
+
+
+def make_payload(dependency: dict, state: dict, trigger: str) -> dict:
+    """Body of the update request of a callback, with the values of a virtual user
+
+    The components the scenarios do not drive, e.g. the inputs of the analysis panels, get no value as before their
+    first use.
+    """
+
+    def prop(item: dict) -> dict:
+        component_id = item["id"]
+        return {
+            "id": json.loads(component_id) if component_id.startswith("{") else component_id,
+            "property": item["property"],
+            "value": state.get(get_key(component_id)),
+        }
+
+    return {
+        "output": dependency["output"],
+        "outputs": parse_output(dependency["output"]),
+        "inputs": [prop(item) for item in dependency["inputs"]],
+        "state": [prop(item) for item in dependency["state"]],
+        "changedPropIds": [
+            f"{item['id']}.{item['property']}" for item in dependency["inputs"] if get_key(item["id"]) == trigger
+        ],
+    }
+
+
+def get_triggered(dependencies: list[dict], trigger: str) -> list[dict]:
+    """Server callbacks fired by a change of the trigger component"""
+    return [
+        dependency
+        for dependency in dependencies
+        if not dependency.get("clientside_function")
+        and any(get_key(item["id"]) == trigger for item in dependency["inputs"])
+    ]
+
+
+def get_callback_name(dependency: dict) -> str:
+    """Short name of a callback, its first output"""
+    return dependency["output"].strip(".").split("...")[0]
+
+
+def post(url: str, payload: dict) -> tuple[int, float]:
+    """Send an update request, returning its status and the server time of the callback in ms (NaN if not timed)"""
+    request = urllib.request.Request(
+        url + "/_dash-update-component",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            response.read()
+            status, server_timing = response.status, response.headers.get("Server-Timing", "")
+    except urllib.error.HTTPError as exc:
+        status, server_timing = exc.code, exc.headers.get("Server-Timing", "")
+    except (urllib.error.URLError, OSError):
+        return 0, np.nan
+    for metric in server_timing.split(","):
+        name, *params = metric.strip().split(";")
+        if name == "total":
+            return status, float(dict(param.split("=", 1) for param in params)["dur"])
+    return status, np.nan
+
+
+def run_user(  # pylint: disable = too-many-arguments
+    url: str, dependencies: list[dict], offers: dict[str, dict], mix: dict[str, float], end: float, seed: int
+) -> list[dict]:
+    """Replay the scenarios as a virtual user until the end time, returning one record per request
+
+    The callbacks fired by a scenario are sent one after the other, the latency of the scenario adding them up.
+    """
+    rng = random.Random(seed)
+    state = get_initial_state(offers, session=uuid.uuid4().hex)
+    records = []
+    while time.perf_counter() < end:
+        scenario = rng.choices(list(mix), weights=list(mix.values()))[0]
+        trigger = SCENARIOS[scenario](state, rng)
+        for dependency in get_triggered(dependencies, trigger):
+            start = time.perf_counter()
+            status, server_ms = post(url, make_payload(dependency, state, trigger))
+            records.append(
+                {
+                    "scenario": scenario,
+                    "callback": get_callback_name(dependency),
+                    "start": start,
+                    "latency_ms": 1000 * (time.perf_counter() - start),
+                    "server_ms": server_ms,
+                    "status": status,
+                }
+            )
+    return records
+
+
+def run_load(  # pylint: disable = too-many-arguments
+    url: str, dependencies: list[dict], offers: dict[str, dict], mix: dict[str, float], users: int, duration: float
+) -> pd.DataFrame:
+    """Run the virtual users concurrently for a duration, returning the requests as a dataframe"""
+    end = time.perf_counter() + duration
+    with ThreadPoolExecutor(users) as executor:
+        futures = [executor.submit(run_user, url, dependencies, offers, mix, end, seed) for seed in range(users)]
+        records = [record for future in futures for record in future.result()]
+    return pd.DataFrame(records, columns=["scenario", "callback", "start", "latency_ms", "server_ms", "status"])
+
+
+def get_free_port() -> int:
+    """Free local port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_rss(pid: int) -> float:
+    """Resident memory of a process in MB, NaN if unavailable"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text(encoding="utf-8").splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return np.nan
+
+
+def get_children(pid: int) -> list[int]:
+    """Child processes of a process, empty if unavailable"""
+    try:
+        return [int(child) for child in Path(f"/proc/{pid}/task/{pid}/children").read_text(encoding="utf-8").split()]
+    except OSError:
+        return []
+
+
+class MemorySampler(threading.Thread):
+    """Thread sampling the resident memory of the workers of a gunicorn master, keeping the peak of each worker"""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peaks: dict[int, float] = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(MEMORY_INTERVAL):
+            for child in get_children(self.pid):
+                rss = get_rss(child)
+                if not np.isnan(rss):
+                    self.peaks[child] = max(self.peaks.get(child, 0), rss)
+
+    def stop(self) -> dict[int, float]:
+        """Stop sampling, returning the peak memory of each worker in MB"""
+        self.stopped.set()
+        self.join()
+        return self.peaks
+
+
+def read_dependencies(url: str, timeout: float = READY_TIMEOUT) -> list[dict]:
+    """Callback dependencies of the app, waiting for it to be ready"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url + "/_dash-dependencies", timeout=10) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, OSError):
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+@contextmanager
+def serve(workers: int, threads: int, settings: dict[str, str]):
+    """Start the app with gunicorn, yielding its url and process"""
+    port = get_free_port()
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(  # pylint: disable = consider-using-with
+            [
+                sys.executable,
+                *("-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--timeout", "0"),
+                *("--workers", str(workers), "--threads", str(threads), APP),
+            ],
+            env={**os.environ, **settings},
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}"
+            try:
+                read_dependencies(url)
+            except (urllib.error.URLError, OSError) as exc:
+                log.seek(0)
+                raise RuntimeError(f"The app did not start:\n{log.read().decode()[-2000:]}") from exc
+            yield url, process
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def summarise(requests: pd.DataFrame, duration: float) -> pd.DataFrame:
+    """Throughput, errors and latency percentiles in total and per callback"""
+
+    def stats(group: pd.DataFrame) -> pd.Series:
+        latency = group["latency_ms"].to_numpy()
+        p50, p95, p99 = np.percentile(latency, [50, 95, 99]) if latency.size else [np.nan] * 3
+        return pd.Series(
+            {
+                "requests": len(group),
+                "errors": int((group["status"] != 200).sum()),
+                "throughput": len(group) / duration,
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "server_p50_ms": group["server_ms"].median(),
+            }
+        )
+
+    per_callback = {callback: stats(group) for callback, group in requests.groupby("callback")}
+    return pd.DataFrame({"all": stats(requests), **per_callback}).T.rename_axis(index="callback")
+
+
+def parse_settings(settings: str) -> dict[str, str]:
+    """Environment variables from a comma separated list of NAME=VALUE"""
+    return dict(item.split("=", 1) for item in settings.split(",") if item)
+
+
+def main():
+    """Run the load test of each worker profile and engine settings"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profile", action="append", help="Gunicorn workers x threads, e.g. 2x4, can be repeated (default 1x1)"
+    )
+    parser.add_argument(
+        "--settings", action="append", help="Comma separated environment variables of the app, can be repeated"
+    )
+    parser.add_argument("--users", type=int, default=4, help="Number of concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Duration of the measure, in seconds")
+    parser.add_argument(
+        "--warmup", type=float, default=30, help="Duration of the load before the measure, for the numba compilation"
+    )
+    parser.add_argument("--offers", type=int, default=10, help="Number of offers in the offer book")
+    parser.add_argument(
+        "--mix",
+        default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+        help="Comma separated weights of the scenarios",
+    )
+    parser.add_argument("--url", help="Load an app already running at this url instead, without the memory report")
+    parser.add_argument("--output", help="CSV file to save the report to")
+    args = parser.parse_args()
+
+    mix = {name: float(weight) for name, weight in parse_settings(args.mix).items()}
+    if unknown := set(mix) - set(SCENARIOS):
+        parser.error(f"Unknown scenarios {sorted(unknown)}, expected some of {list(SCENARIOS)}")
+    offers = get_offers(args.offers)
+
+    def measure(url: str, process: subprocess.Popen = None) -> pd.DataFrame:
+        dependencies = read_dependencies(url)
+        if args.warmup:
+            run_load(url, dependencies, offers, mix, args.users, args.warmup)
+        sampler = MemorySampler(process.pid) if process else None
+        if sampler:
+            sampler.start()
+        requests = run_load(url, dependencies, offers, mix, args.users, args.duration)
+        summary = summarise(requests, args.duration)
+        peaks = list(sampler.stop().values()) if sampler else []
+        summary["workers"] = len(peaks) or np.nan
+        summary["peak_rss_mb"] = max(peaks, default=np.nan)
+        summary["mean_peak_rss_mb"] = np.mean(peaks) if peaks else np.nan
+        return summary
+
+    reports = {}
+    if args.url:
+        reports[("external", "")] = measure(args.url.rstrip("/"))
+    else:
+        for profile, settings in itertools.product(args.profile or ["1x1"], args.settings or [""]):
+            workers, threads = (int(n) for n in profile.lower().split("x"))
+            print(f"Loading {workers} workers x {threads} threads with {settings or 'default settings'}...")
+            with serve(workers, threads, parse_settings(settings)) as (url, process):
+                reports[(profile, settings or "default")] = measure(url, process)
+
+    report = pd.concat(reports, names=["profile", "settings"])
+    with pd.option_context("display.float_format", "{:,.1f}".format, "display.width", 160, "display.max_columns", None):
+        print(report)
+    if args.output:
+        report.to_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -38,8 +38,10 @@ def modal_content(name: str, **kwargs):
                     "name": {"n_cols": 4},
                     "fixed_rate": {"visible": ("with_fixed_rate", "==", True)},
                     "fixed_rate_duration": {"visible": ("with_fixed_rate", "==", True)},
+                    "fixed_share": {"visible": ("with_fixed_rate", "==", True)},
                     "with_fixed_rate": {"n_cols": 4},
                     "with_offset_account": {"n_cols": 4},
+                    "daily_interest": {"n_cols": 4},
                 }
             ),
             html.Div(
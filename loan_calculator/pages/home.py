@@ -1,17 +1,52 @@
+import hashlib
+import json
+import time
+
 import dash_mantine_components as dmc
+import numpy as np
 import pandas as pd
-from dash import ALL, MATCH, Input, Output, State, callback, clientside_callback, ctx, dcc, html, no_update, register_page
+from dash import (
+    ALL,
+    MATCH,
+    ClientsideFunction,
+    Input,
+    Output,
+    State,
+    callback,
+    clientside_callback,
+    ctx,
+    dcc,
+    html,
+    no_update,
+    register_page,
+)
 from dash_iconify import DashIconify
 from dash_pydantic_form import ModelForm
 from pydantic import ValidationError
 
-from loan_calculator import analytics, delete_modal, loan_modal, plots
+from loan_calculator import (
+    analytics,
+    backtest_panel,
+    best_offers_panel,
+    catalogue_panel,
+    delete_modal,
+    loan_modal,
+    plots,
+    refinance_panel,
+    sensitivity_panel,
+    session_store,
+    timing,
+)
 from loan_calculator.components import LoadingOverlay, table
 from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
 from loan_calculator.shell import ids as shell_ids
+from loan_calculator.single_flight import SingleFlight, Superseded
 
 register_page(__name__, "/", title="Loan Calculator")
 
+# Share of the income the repayments can take for an offer to be affordable (%)
+MAX_REPAYMENT_SHARE = 30
+
 
 class ids:  # pylint: disable = invalid-name
     """Home IDs"""
@@ -23,9 +58,13 @@ class ids:  # pylint: disable = invalid-name
     # Comparison
     comparison_wrapper = "offer_comparison_wrapper"
     loans = "loans_store"
+    loans_ref = "loans_ref_store"
+    loans_missing = "loans_missing_store"
     select = "loan_selection"
     #
     first_10 = "first_10"
+    crop_years = "crop_years"
+    custom_shock = "custom_shock"
 
     @staticmethod
     def edit_offer(name): return {"type": "edit-offer", "name": name}
@@ -36,6 +75,12 @@ class ids:  # pylint: disable = invalid-name
     @staticmethod
     def create_offer(name): return {"type": "create-offer", "name": name}
 
+    @staticmethod
+    def offer_card(name): return {"type": "offer-card", "name": name}
+
+    @staticmethod
+    def offer_principal(name): return {"type": "offer-principal", "name": name}
+
 
 def layout():
     """Layout function"""
@@ -47,16 +92,29 @@ def layout():
                         [
                             dmc.TabsTab("My offers", value="my_offers"),
                             dmc.TabsTab("Offer comparison", value="comparison"),
+                            dmc.TabsTab("Refinance", value="refinance"),
+                            dmc.TabsTab("Backtest", value="backtest"),
+                            dmc.TabsTab("Sensitivities", value="sensitivities"),
+                            dmc.TabsTab("Catalogue", value="catalogue"),
+                            dmc.TabsTab("Best offers", value="best_offers"),
                         ],
                         className="bg-sticky",
                     ),
                     dmc.TabsPanel(offers_grid(), value="my_offers"),
                     dmc.TabsPanel(offers_comparison(), value="comparison"),
+                    dmc.TabsPanel(refinance_panel.layout(), value="refinance"),
+                    dmc.TabsPanel(backtest_panel.layout(), value="backtest"),
+                    dmc.TabsPanel(sensitivity_panel.layout(), value="sensitivities"),
+                    dmc.TabsPanel(catalogue_panel.layout(), value="catalogue"),
+                    dmc.TabsPanel(best_offers_panel.layout(), value="best_offers"),
                 ],
+                id=shell_ids.tabs,
                 style={"maxWidth": "1200px", "margin": "0 auto"},
                 value="comparison",
             ),
             dcc.Store(id=ids.loans, storage_type="local"),
+            dcc.Store(id=ids.loans_ref, storage_type="local"),
+            dcc.Store(id=ids.loans_missing),
             loan_modal.layout(),
             delete_modal.layout(),
         ],
@@ -89,8 +147,8 @@ def offers_grid():
     ]
 
 
-def offers_grid_contents(loans_data: dict, search: str, property_value: float):
-    """Offers cards to be displayed in the grid"""
+def offers_grid_contents(loans_data: dict):
+    """Offers cards to be displayed in the grid, filtered and completed with the principal in the browser"""
     return [
         dmc.Paper(
             [
@@ -98,11 +156,7 @@ def offers_grid_contents(loans_data: dict, search: str, property_value: float):
                     [
                         dmc.Text(name or "undefined", fw="bold"),
                         dmc.Space(h=12),
-                        dmc.Text(
-                            f"Principal: ${(loan.get('borrowed_share') or 0) * (property_value or 0) / 100:,.0f}",
-                            size="sm",
-                            c="gray",
-                        ),
+                        dmc.Text("Principal:", size="sm", c="gray", id=ids.offer_principal(name)),
                         dmc.Space(h=3),
                         dmc.Text(f"Annual rate: {loan.get('rate', '')}% p.a.", size="sm", c="gray"),
                     ],
@@ -133,9 +187,9 @@ def offers_grid_contents(loans_data: dict, search: str, property_value: float):
             radius="md",
             p="md",
             style={"display": "flex"},
+            id=ids.offer_card(name),
         )
         for name, loan in loans_data.items()
-        if not search or search.lower() in name.lower()
     ]
 
 
@@ -163,7 +217,20 @@ def offers_comparison():
         dmc.Group(
             [
                 dmc.MultiSelect(id=ids.select, persistence=True, maxValues=2, value=[], data=[], style={"flex": 1}),
-                dmc.Switch("Show first 10 years", id=ids.first_10),
+                dmc.Switch("Show first", id=ids.first_10),
+                dmc.NumberInput(id=ids.crop_years, value=10, min=1, max=40, suffix=" years", w=100, size="xs"),
+                dmc.NumberInput(
+                    id=ids.custom_shock,
+                    placeholder="Custom shock",
+                    min=0,
+                    max=10,
+                    step=0.5,
+                    decimalScale=2,
+                    prefix="+",
+                    suffix="%",
+                    w=120,
+                    size="xs",
+                ),
             ],
             pos="sticky",
             top="3.25rem",
@@ -211,6 +278,19 @@ clientside_callback(
 )
 
 
+clientside_callback(
+    """function(n_clicks, best, loans) {
+        if (!n_clicks || !best || best.length === 0) return dash_clientside.no_update
+        return {...(loans || {}), ...Object.fromEntries(best.map(offer => [offer.name, offer]))}
+    }""",
+    Output(ids.loans, "data", allow_duplicate=True),
+    Input(best_offers_panel.ids.add, "n_clicks"),
+    State(best_offers_panel.ids.best, "data"),
+    State(ids.loans, "data"),
+    prevent_initial_call=True,
+)
+
+
 clientside_callback(
     """function(a, b, c, d, opened) {
         const ctx = window.dash_clientside.callback_context
@@ -257,122 +337,385 @@ clientside_callback(
 @callback(
     Output(ids.offers_wrapper, "children"),
     Input(ids.loans, "data"),
-    Input(ids.search, "value"),
-    Input(ModelForm.ids.main("project", "sidebar"), "data"),
 )
-def update_offers(loans_data, search, project_data):
+@timing.timed("update_offers")
+def update_offers(loans_data):
     """Update the content of the offers grid"""
     if not loans_data:
         return no_offers_grid_contents()
-    return offers_grid_contents(loans_data, search, project_data["property_value"])
+    with timing.span("cards"):
+        return offers_grid_contents(loans_data)
+
+
+clientside_callback(
+    ClientsideFunction(namespace="home", function_name="filterOffers"),
+    Output(ids.offer_card(ALL), "style"),
+    Input(ids.search, "value"),
+    Input(ids.offer_card(ALL), "id"),
+)
+
+
+clientside_callback(
+    ClientsideFunction(namespace="home", function_name="offerPrincipals"),
+    Output(ids.offer_principal(ALL), "children"),
+    Input(ModelForm.ids.main("project", "sidebar"), "data"),
+    Input(ids.offer_principal(ALL), "id"),
+    State(ids.loans, "data"),
+)
+
+
+def read_loans(loans: dict) -> dict | None:
+    """Offer book from the browser store, or from the session store given its reference"""
+    store = session_store.get_store()
+    if store is None or not loans:
+        return loans
+    return store.get(loans.get("session"), "loans", loans.get("version"))
+
+
+if session_store.get_store():
+
+    @callback(
+        Output(ids.loans_ref, "data"),
+        Input(ids.loans, "data"),
+        Input(ids.loans_missing, "data"),
+        State(ids.loans_ref, "data"),
+        prevent_initial_call=True,
+    )
+    def sync_loans(loans_data, _, loans_ref):
+        """Send the offer book to the session store when it changes, or when the store is missing it
+
+        The reference kept in the browser holds the session key of the offer book and its version.
+        """
+        store = session_store.get_store()
+        session = (loans_ref or {}).get("session")
+        if not isinstance(session, str) or not session_store.SESSION_KEY_PATTERN.match(session):
+            session = store.new_session()
+        return {"session": session, "version": store.put(session, "loans", loans_data or {})}
+
+    @callback(
+        Output(ids.loans_missing, "data"),
+        Input(ids.loans_ref, "data"),
+    )
+    def check_loans_ref(loans_ref):
+        """Ask for the offer book when the session store does not have the referenced version"""
+        if loans_ref and session_store.get_store().has(loans_ref.get("session"), "loans", loans_ref.get("version")):
+            return no_update
+        return time.time()
+
+
+compute_flight = SingleFlight("compute_loan")
 
 
 @callback(
     Output(ids.comparison_wrapper, "children"),
     Input(ids.select, "value"),
-    Input(ids.first_10, "checked"),
     Input(ModelForm.ids.main("project", "sidebar"), "data"),
     Input(ModelForm.ids.main("rates", "sidebar"), "data"),
     Input(ModelForm.ids.main("expenses", "sidebar"), "data"),
-    State(ids.loans, "data"),
+    Input(ids.custom_shock, "value"),
+    Input(ids.loans_ref, "data") if session_store.get_store() else State(ids.loans, "data"),
     State(shell_ids.breakpoints, "widthBreakpoint"),
+    State(shell_ids.session, "data"),
 )
-def compute_loan(
+@timing.timed("compute_loan")
+def compute_loan(  # pylint: disable = too-many-arguments
     loans_names: list[str],
-    first_10: bool,
     project_data: dict,
     rates_change: dict,
     expenses: dict,
+    custom_shock: float,
     loans_data: dict,
     breakpoint: str,
+    session: str,
 ):
     """Compute the loan results"""
+    if loans_data and (loans_data := read_loans(loans_data)) is None:
+        # Waiting for the offer book to reach the session store
+        return no_update
     if not loans_data or not loans_names:
         return offers_comparison_empty_content()
 
+    inputs = [loans_names, project_data, rates_change, expenses, custom_shock, loans_data, breakpoint]
+    key = hashlib.blake2b(
+        json.dumps(
+            inputs[:-2] + [{name: loans_data.get(name) for name in loans_names}, breakpoint],
+            sort_keys=True,
+            default=str,
+        ).encode(),
+        digest_size=16,
+    ).hexdigest()
     try:
-        project = Project(**project_data)
-    except ValidationError:
+        return compute_flight.do(key, lambda: compute_loan_content(*inputs), session=session)
+    except Superseded:
         return no_update
 
-    rates_change = RatesForecast(**rates_change)
-    expenses = FutureExpenses(**expenses)
 
-    data_list = []
-    title_list = []
-    feasible_list = []
-    for name in loans_names:
+def compute_loan_content(  # pylint: disable = too-many-arguments, too-many-locals
+    loans_names: list[str],
+    project_data: dict,
+    rates_change: dict,
+    expenses: dict,
+    custom_shock: float,
+    loans_data: dict,
+    breakpoint: str,
+):
+    """Content of the comparison tab"""
+    with timing.span("validation"):
         try:
-            offer = Offer(**loans_data[name])
+            project = Project(**project_data)
         except ValidationError:
-            continue
-        data, feasible = analytics.compute_loan_timeseries(
-            project=project,
-            offer=offer,
-            rates_change=rates_change,
-            expenses=expenses,
-        )
-        if data is not None:
-            data_list.append(data)
-            title_list.append(name)
-            feasible_list.append(feasible)
+            return no_update
+
+        rates_change = RatesForecast(**rates_change)
+        expenses = FutureExpenses(**expenses)
+
+        offers = {}
+        for name in loans_names:
+            try:
+                offers[name] = Offer(**loans_data[name])
+            except ValidationError:
+                continue
 
-    if not data_list:
+    if not offers:
         return no_update
 
-    fig = plots.make_dmc_chart(
-        [d.iloc[:10 * 12] if first_10 else d for d in data_list],
-        title_list,
-        feasible_list,
-        breakpoint,
+    title_list = list(offers)
+    timings = {}
+    data_list, feasible_list = map(
+        list,
+        zip(
+            *analytics.compute_loans(
+                project=project,
+                offers=list(offers.values()),
+                rates_change=rates_change,
+                expenses=expenses,
+                timings=timings,
+            )
+        ),
     )
+    for stage, duration in timings.items():
+        timing.record(stage, duration)
+
+    with timing.span("analytics"):
+        # Cached per offer, so that only the offers affected by a change are analysed again
+        inputs = {
+            "project": project,
+            "offers": list(offers.values()),
+            "rates_change": rates_change,
+            "expenses": expenses,
+        }
+        affordability = analytics.stack_by_offer(
+            analytics.compute_by_offer(
+                analytics.solve_affordability, **inputs, batched=True, max_repayment_share=MAX_REPAYMENT_SHARE
+            )
+        )
 
-    table_data = (
-        pd.DataFrame(
-            [
+        extra_repayments = analytics.compute_by_offer(analytics.optimise_extra_repayments, **inputs)
+
+        stress_test = analytics.stack_by_offer(
+            analytics.compute_by_offer(
+                analytics.stress_test_offers,
+                **inputs,
+                batched=True,
+                shocks=[1, 2, 3] + ([custom_shock] if custom_shock and custom_shock not in [1, 2, 3] else []),
+                budgets={"Income -20%": project.model_copy(update={"monthly_income": 0.8 * project.monthly_income})},
+                max_repayment_share=MAX_REPAYMENT_SHARE,
+            )
+        )
+
+    with timing.span("figures"):
+        fig = plots.make_dmc_chart(
+            data_list,
+            title_list,
+            feasible_list,
+            breakpoint,
+        )
+
+        table_data = (
+            pd.DataFrame(
                 [
-                    data[["principal_payment", "interest", "fee"]]
-                    .sum(axis=1)
-                    .to_frame("repayment")
-                    .query("repayment > 0")
-                    .mean()[0]
-                    for data in data_list
+                    [
+                        data[["principal_payment", "interest", "fee"]]
+                        .sum(axis=1)
+                        .to_frame("repayment")
+                        .query("repayment > 0")
+                        .mean()
+                        .iat[0]
+                        for data in data_list
+                    ],
+                    [
+                        data[["interest", "fee"]].sum(axis=1).cumsum().iat[min(10 * 12, len(data) - 1)]
+                        for data in data_list
+                    ],
+                    [
+                        (data["principal_paid"].iat[min(10 * 12, len(data) - 1)] + data["deposit"].iat[0])
+                        / (data["principal_paid"].iat[-1] + data["deposit"].iat[0])
+                        * 100
+                        for data in data_list
+                    ],
+                    [data[["interest", "fee"]].sum(axis=1).cumsum().iat[-1] for data in data_list],
+                    [data[["outflow_present_value", "deposit", "stamp_duty"]].sum().sum() for data in data_list],
+                    [data["real_repayment"].where(data["repayment"] > 0).mean() for data in data_list],
+                    [
+                        data["real_offset"].iat[-1] if offer.with_offset_account else np.nan
+                        for data, offer in zip(data_list, offers.values())
+                    ],
+                    [plan["cost"] for plan in extra_repayments],
+                    affordability["max_property_value"],
+                    affordability["min_deposit"],
                 ],
-                [data[["interest", "fee"]].sum(axis=1).cumsum()[10 * 12] for data in data_list],
-                [
-                    (data["principal_paid"].iat[10 * 12] + data["deposit"].iat[0])
-                    / (data["principal_paid"].iat[-1] + data["deposit"].iat[0])
-                    * 100
-                    for data in data_list
+                columns=[title_list],
+                index=[
+                    "Monthly Repayment",
+                    "Interest & Fees paid @ year 10",
+                    "Percent Owned @ year 10",
+                    "Interest & Fees paid @ loan end",
+                    "Outgoing cash (present value)",
+                    "Monthly Repayment (today's $)",
+                    "Offset @ loan end (today's $)",
+                    "Interest & Fees paid with best extra repayments",
+                    "Max property value",
+                    "Min deposit",
                 ],
-                [data[["interest", "fee"]].sum(axis=1).cumsum()[-1] for data in data_list],
-            ],
-            columns=[title_list],
-            index=[
-                "Monthly Repayment",
-                "Interest & Fees paid @ year 10",
-                "Percent Owned @ year 10",
-                "Interest & Fees paid @ loan end",
-            ],
+            )
+            .T.apply(
+                lambda s: s.apply(lambda x: "-" if x != x else f"{x:,.1f}%" if "Percent" in s.name else f"${x:,.0f}")
+            )
+            .T.rename_axis(" ")
+            .reset_index()
         )
-        .T.apply(lambda s: s.apply(lambda x: f"{x:,.1f}%" if "Percent" in s.name else f"${x:,.0f}"))
-        .T.rename_axis(" ")
-        .reset_index()
-    )
     return [
         dmc.Paper(table(table_data, striped=True), px="sm", pt="sm"),
         dmc.Space(h="lg"),
+        dmc.Paper(table(stress_test_table(title_list, stress_test), striped=True), px="sm", pt="sm"),
+        dmc.Space(h="lg"),
         fig,
     ]
 
 
+def stress_test_table(title_list: list[str], stress_test: dict) -> pd.DataFrame:
+    """Matrix of the stress test results, with the peak repayment to income ratio and the first month of shortfall"""
+    shortfall = analytics.month_index(np.maximum(stress_test["first_shortfall"], 0).ravel()).strftime("%b %Y")
+    cells = [
+        ("✓ " if passes else "✗ ") + f"{ratio:.0f}%" + (f" · short {month}" if position >= 0 else "")
+        for passes, ratio, position, month in zip(
+            stress_test["passes"].ravel(),
+            stress_test["peak_ratio"].ravel(),
+            stress_test["first_shortfall"].ravel(),
+            shortfall,
+        )
+    ]
+    return pd.DataFrame(
+        np.array(cells).reshape(stress_test["passes"].shape), columns=stress_test["scenarios"]
+    ).assign(**{"Stress test": title_list})[["Stress test"] + stress_test["scenarios"]]
+
+
+clientside_callback(
+    """function(loansData) {
+        const names = Object.keys(loansData || {}).filter(k => !!k)
+        return [names, names, names]
+    }""",
+    Output(refinance_panel.ids.offer, "data"),
+    Output(refinance_panel.ids.new_offer, "data"),
+    Output(sensitivity_panel.ids.offer, "data"),
+    Input(ids.loans, "data"),
+)
+
+
+clientside_callback(
+    """function(loansData, currentValue) {
+        const names = Object.keys(loansData || {}).filter(k => !!k)
+        return [names, (currentValue || []).filter(n => names.includes(n))]
+    }""",
+    Output(backtest_panel.ids.select, "data"),
+    Output(backtest_panel.ids.select, "value"),
+    Input(ids.loans, "data"),
+    State(backtest_panel.ids.select, "value"),
+)
+
+
+@callback(
+    Output(refinance_panel.ids.results, "children"),
+    Input(refinance_panel.ids.offer, "value"),
+    Input(refinance_panel.ids.new_offer, "value"),
+    Input(refinance_panel.ids.switching_cost, "value"),
+    Input(refinance_panel.ids.max_differential, "value"),
+    Input(ModelForm.ids.main("project", "sidebar"), "data"),
+    Input(ModelForm.ids.main("rates", "sidebar"), "data"),
+    Input(ModelForm.ids.main("expenses", "sidebar"), "data"),
+    Input(ids.loans_ref, "data") if session_store.get_store() else Input(ids.loans, "data"),
+    Input(shell_ids.tabs, "value"),
+)
+def compute_refinance(  # pylint: disable = too-many-arguments
+    offer_name, new_offer_name, switching_cost, max_differential, project_data, rates_change, expenses, loans_data, tab
+):
+    """Compute the refinancing break-even surface, while its tab is visible"""
+    if tab != "refinance":
+        return no_update
+    if loans_data and (loans_data := read_loans(loans_data)) is None:
+        return no_update
+    return refinance_panel.refinance_content(
+        offer_name, new_offer_name, switching_cost, max_differential, project_data, rates_change, expenses, loans_data
+    )
+
+
+@callback(
+    Output(backtest_panel.ids.results, "children"),
+    Input(backtest_panel.ids.select, "value"),
+    Input(ModelForm.ids.main("project", "sidebar"), "data"),
+    Input(ModelForm.ids.main("rates", "sidebar"), "data"),
+    Input(ModelForm.ids.main("expenses", "sidebar"), "data"),
+    Input(ids.loans_ref, "data") if session_store.get_store() else Input(ids.loans, "data"),
+    Input(shell_ids.tabs, "value"),
+)
+def compute_backtest(  # pylint: disable = too-many-arguments
+    loans_names, project_data, rates_change, expenses, loans_data, tab
+):
+    """Run the backtest of the selected offers, while its tab is visible"""
+    if tab != "backtest":
+        return no_update
+    if loans_data and (loans_data := read_loans(loans_data)) is None:
+        return no_update
+    return backtest_panel.backtest_content(loans_names, project_data, rates_change, expenses, loans_data)
+
+
+@callback(
+    Output(sensitivity_panel.ids.results, "children"),
+    Input(sensitivity_panel.ids.offer, "value"),
+    Input(ModelForm.ids.main("project", "sidebar"), "data"),
+    Input(ModelForm.ids.main("rates", "sidebar"), "data"),
+    Input(ModelForm.ids.main("expenses", "sidebar"), "data"),
+    Input(ids.loans_ref, "data") if session_store.get_store() else Input(ids.loans, "data"),
+    Input(shell_ids.tabs, "value"),
+)
+def compute_sensitivities(  # pylint: disable = too-many-arguments
+    offer_name, project_data, rates_change, expenses, loans_data, tab
+):
+    """Compute the sensitivities of the selected offer, while its tab is visible"""
+    if tab != "sensitivities":
+        return no_update
+    if loans_data and (loans_data := read_loans(loans_data)) is None:
+        return no_update
+    return sensitivity_panel.sensitivity_content(offer_name, project_data, rates_change, expenses, loans_data)
+
+
+clientside_callback(
+    ClientsideFunction(namespace="home", function_name="cropCharts"),
+    Output(plots.ids.chart(ALL, ALL), "figure"),
+    Input(ids.first_10, "checked"),
+    Input(ids.crop_years, "value"),
+    Input(plots.ids.chart(ALL, ALL), "id"),
+    State(plots.ids.chart(ALL, ALL), "figure"),
+)
+
+
 @callback(
     Output(loan_modal.ids.modal, "children"),
     Output(loan_modal.ids.modal, "title"),
     Input(ids.new_offer_button, "n_clicks"),
     Input(ids.create_offer(ALL), "n_clicks"),
     Input(ids.edit_offer(ALL), "n_clicks"),
-    State(ids.loans, "data"),
+    State(ids.loans_ref if session_store.get_store() else ids.loans, "data"),
 )
 def update_offer_modal_content(  # pylint: disable = unused-argument
     new_trigger, create_triggers, edit_triggers, loans_data
@@ -383,7 +726,7 @@ def update_offer_modal_content(  # pylint: disable = unused-argument
 
     if isinstance(ctx.triggered_id, dict) and ctx.triggered_id["type"] == "edit-offer":
         name = ctx.triggered_id["name"]
-        loan_data = loans_data[name]
+        loan_data = (read_loans(loans_data) or {}).get(name, {"name": name})
     else:
         name = "New Offer"
         loan_data = {"name": "__new__"}
@@ -429,6 +772,9 @@ clientside_callback(
 clientside_callback(
     """(id, chartId, figure) => {
         const el = document.getElementById(JSON.stringify(id, Object.keys(id).sort()))
+        const displayedLayout = () => document
+            .getElementById(JSON.stringify(chartId, Object.keys(chartId).sort()))
+            ?.querySelector(".js-plotly-plot")?.layout || figure.layout
 
         const toOpacity = (color, alpha) => {
             if (color.startsWith("rgb")) return color.replace(/[\d\.]+\)$/g, `${alpha})`)
@@ -445,7 +791,7 @@ clientside_callback(
 
         el.onmouseenter = (e) => {
             if (el.classList.contains("hidden") || !el.classList.contains("active")) return
-            const newFigure = {...figure}
+            const newFigure = {...figure, layout: displayedLayout()}
             newFigure.data.forEach(trace => {
                 if (trace.name !== id.item && trace.line?.color && trace.name !== "Total") {
                     trace.fillcolor = toOpacity(trace.line.color, 0.2)
@@ -459,7 +805,7 @@ clientside_callback(
         }
 
         el.onmouseleave = (e) => {
-            const newFigure = {...figure}
+            const newFigure = {...figure, layout: displayedLayout()}
             newFigure.data.forEach(trace => {
                 if (trace.line?.color && trace.name !== "Total") {
                     trace.fillcolor = toOpacity(trace.line.color, 0.6)
@@ -470,7 +816,7 @@ clientside_callback(
         }
 
         el.onclick = (e) => {
-            const newFigure = {...figure}
+            const newFigure = {...figure, layout: displayedLayout()}
             newFigure.data.forEach(trace => {
                 if (trace.name === id.item) {
                     trace.visible = el.classList.contains("hidden")
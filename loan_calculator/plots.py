@@ -4,10 +4,11 @@ from typing import Literal
 import dash_mantine_components as dmc
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from dash import dcc
-from plotly.subplots import make_subplots
+from plotly.colors import qualitative
+
+from loan_calculator.analytics import month_index, with_date_index
 
 COLOR_DEPOSIT = "rgb(240, 145, 23)"
 COLOR_STAMP_DUTY = "rgb(240, 239, 35)"
@@ -82,6 +83,8 @@ def create_legend_item(label: str, color: str, metric: str, name: str, active: b
 
 
 def make_cumulative_figure(layout: dict, data: pd.DataFrame, cdata: pd.DataFrame, cumulative_y_max: float):
+    import plotly.express as px  # pylint: disable = import-outside-toplevel
+
     fig = (
         px.area(
             cdata.rename(columns={k: v["label"] for k, v in SERIES_CUMULATIVE.items()}),
@@ -123,6 +126,7 @@ def make_cumulative_figure(layout: dict, data: pd.DataFrame, cdata: pd.DataFrame
 
 
 def make_monthly_figure(layout: dict, data: pd.DataFrame, monthly_y_max: float):
+    import plotly.express as px  # pylint: disable = import-outside-toplevel
 
     fig = (
         px.area(
@@ -159,6 +163,7 @@ def make_dmc_chart(
     feasible_list: list[bool] = None,
     breakpoint: Literal["mobile", "desktop"] = "desktop",
 ):
+    data_list = [with_date_index(data) for data in data_list]
     cumulative_data = [
         data[list(SERIES_CUMULATIVE)].cumsum()
         .round(2)
@@ -246,7 +251,7 @@ def make_dmc_chart(
         cols={"base": 1, "lg": len(data_list)},
         spacing="lg",
     )
-px.line
+
 
 def make_comparison_figure(  # pylint: disable = too-many-locals
     data_list: list[pd.DataFrame], title_list: list[str] = None, feasible_list: list[bool] = None
@@ -257,8 +262,11 @@ def make_comparison_figure(  # pylint: disable = too-many-locals
         "principal_paid", "offset", "principal_payment", "interest", "fee", "repayment", "deposit", "stamp_duty"
     :param title_list: Title for each dataframe
     """
+    from plotly.subplots import make_subplots  # pylint: disable = import-outside-toplevel
+
     if not isinstance(data_list, list):
         data_list = [data_list]
+    data_list = [with_date_index(data) for data in data_list]
 
     # Create the subplots and set the layout
     fig = (
@@ -526,3 +534,120 @@ def make_comparison_figure(  # pylint: disable = too-many-locals
         )
 
     return fig
+
+
+def make_refinance_figure(refinance: dict[str, np.ndarray]) -> go.Figure:
+    """Heatmap of the refinancing savings over the switch months and rate differentials, with the break-even rate
+
+    :param refinance: Result of `analytics.compute_refinance`
+    """
+    dates = month_index(refinance["months"])
+    savings = refinance["savings"].T
+    limit = np.abs(savings).max(initial=1)
+    break_even_month = month_index(np.maximum(refinance["break_even_month"].T, 0)).to_numpy().reshape(savings.shape)
+    break_even_text = np.where(
+        refinance["break_even_month"].T >= 0, np.datetime_as_string(break_even_month, unit="M"), "never"
+    )
+
+    layout = deepcopy(BASE_LAYOUT)
+    layout["hovermode"] = "closest"
+    return (
+        go.Figure(
+            [
+                go.Heatmap(
+                    x=dates,
+                    y=refinance["rate_differentials"],
+                    z=savings.round(0),
+                    customdata=break_even_text,
+                    zmin=-limit,
+                    zmax=limit,
+                    colorscale="RdBu",
+                    colorbar={"title": "Savings ($)", "thickness": 12},
+                    hovertemplate="Switch %{x|%b %Y}, rate %{y:+.2f}%<br>Savings $%{z:,.0f}"
+                    "<br>Break-even %{customdata}<extra></extra>",
+                ),
+                go.Scatter(
+                    x=dates,
+                    y=refinance["break_even_rate"],
+                    mode="lines",
+                    line={"color": COLOR_DEPOSIT, "width": 3},
+                    name="Break-even rate",
+                    hovertemplate="Switch %{x|%b %Y}<br>Break-even rate %{y:+.2f}%<extra></extra>",
+                ),
+            ]
+        )
+        .update_layout(layout)
+        .update_layout(
+            yaxis_title="Rate differential (%)",
+            yaxis_range=[refinance["rate_differentials"].min(), refinance["rate_differentials"].max()],
+        )
+    )
+
+
+def make_backtest_figure(backtest: dict[str, np.ndarray], title_list: list[str]) -> go.Figure:
+    """Interest and fees paid on each offer depending on the settlement month of the backtest
+
+    :param backtest: Result of `analytics.backtest_offers`
+    :param title_list: Name of each offer
+    """
+    dates = month_index(backtest["months"])
+    cost = backtest["interest"] + backtest["fees"]
+    colors = qualitative.Plotly
+    layout = deepcopy(BASE_LAYOUT)
+    return (
+        go.Figure(
+            [
+                go.Scatter(
+                    x=dates,
+                    y=cost[i].round(0),
+                    customdata=backtest["payoff_months"][i] / 12,
+                    mode="lines",
+                    line={"color": colors[i % len(colors)], "width": 2},
+                    name=title,
+                    hovertemplate=f"{title}: $%{{y:,.0f}}, repaid in %{{customdata:.1f}} years<extra></extra>",
+                )
+                for i, title in enumerate(title_list)
+            ]
+        )
+        .update_layout(layout)
+        .update_layout(yaxis_title="Interest & Fees ($)", showlegend=True, legend={"orientation": "h", "y": 1.1})
+    )
+
+
+def make_sensitivity_figure(sensitivities: dict) -> go.Figure:
+    """Tornado chart of the change of the interest and fees paid when each input moves up or down
+
+    :param sensitivities: Result of `analytics.compute_sensitivities`
+    """
+    order = np.argsort(np.abs(sensitivities["impact"]))
+    inputs = [sensitivities["inputs"][i] for i in order]
+    impact = sensitivities["impact"][order].round(0)
+    layout = deepcopy(BASE_LAYOUT)
+    layout["hovermode"] = "y unified"
+    return (
+        go.Figure(
+            [
+                go.Bar(
+                    x=sign * impact,
+                    y=inputs,
+                    orientation="h",
+                    marker_color=color,
+                    name=name,
+                    hovertemplate=f"{name}: $%{{x:+,.0f}}<extra></extra>",
+                )
+                for sign, color, name in [(1, COLOR_INTEREST, "Input up"), (-1, COLOR_OFFSET, "Input down")]
+            ]
+        )
+        .update_layout(layout)
+        .update_layout(
+            barmode="overlay",
+            xaxis_title="Change of Interest & Fees ($)",
+            xaxis_showgrid=True,
+            xaxis_gridcolor="rgb(128, 128, 128)",
+            xaxis_griddash="dash",
+            xaxis_zerolinecolor="rgb(128, 128, 128)",
+            yaxis_showgrid=False,
+            showlegend=True,
+            legend={"orientation": "h", "y": 1.1},
+        )
+    )
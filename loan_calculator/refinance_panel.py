@@ -0,0 +1,114 @@
+import dash_mantine_components as dmc
+import numpy as np
+import pandas as pd
+from dash import dcc, html
+from pydantic import ValidationError
+
+from loan_calculator import analytics, plots
+from loan_calculator.components import table
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
+
+
+class ids:  # pylint: disable = invalid-name
+    """Refinance panel IDs"""
+
+    offer = "refinance_offer"
+    new_offer = "refinance_new_offer"
+    switching_cost = "refinance_switching_cost"
+    max_differential = "refinance_max_differential"
+    results = "refinance_results"
+
+
+def layout():
+    """Refinance panel layout"""
+    return [
+        dmc.Group(
+            [
+                dmc.Select(id=ids.offer, label="Current offer", data=[], persistence=True, style={"flex": 1}),
+                dmc.Select(id=ids.new_offer, label="Refinance to", data=[], persistence=True, style={"flex": 1}),
+                dmc.NumberInput(id=ids.switching_cost, label="Switching cost ($)", value=0, min=0, step=500, w=150),
+                dmc.NumberInput(
+                    id=ids.max_differential,
+                    label="Rate differential (%)",
+                    value=1,
+                    min=0.25,
+                    max=5,
+                    step=0.25,
+                    decimalScale=2,
+                    prefix="± ",
+                    w=150,
+                ),
+            ],
+            align="end",
+            gap="md",
+        ),
+        dmc.Space(h="md"),
+        html.Div(id=ids.results),
+    ]
+
+
+def refinance_content(  # pylint: disable = too-many-arguments
+    offer_name: str,
+    new_offer_name: str,
+    switching_cost: float,
+    max_differential: float,
+    project_data: dict,
+    rates_change: dict,
+    expenses: dict,
+    loans_data: dict,
+):
+    """Break-even surface of refinancing an offer of the book to another one"""
+    if not offer_name or not new_offer_name or not loans_data:
+        return dmc.Text("Select the current offer and the offer to refinance to.", c="gray")
+    try:
+        project = Project(**project_data)
+        offer, new_offer = Offer(**loans_data[offer_name]), Offer(**loans_data[new_offer_name])
+    except (ValidationError, TypeError, KeyError):
+        return dmc.Text("Complete the project and the offers to analyse refinancing.", c="gray")
+
+    max_differential = max_differential or 1
+    refinance = analytics.compute_refinance(
+        project=project,
+        offer=offer,
+        new_offer=new_offer,
+        rates_change=RatesForecast(**rates_change),
+        expenses=FutureExpenses(**expenses),
+        rate_differentials=np.linspace(-max_differential, max_differential, 21),
+        switching_cost=switching_cost or 0,
+    )
+    if not refinance["months"].shape[0]:
+        return dmc.Text("The loan is too short to be refinanced.", c="gray")
+
+    rows = np.unique(np.linspace(0, refinance["months"].shape[0] - 1, 6).round().astype(int))
+    no_change = refinance["rate_differentials"].shape[0] // 2
+    break_even = refinance["break_even_month"][rows, no_change]
+    table_data = pd.DataFrame(
+        {
+            "Switch": analytics.month_index(refinance["months"][rows]).strftime("%b %Y"),
+            "Savings": [f"${x:,.0f}" for x in refinance["savings"][rows, no_change]],
+            "Break-even": [
+                d.strftime("%b %Y") if m >= 0 else "Never"
+                for d, m in zip(analytics.month_index(np.maximum(break_even, 0)), break_even)
+            ],
+            "Break-even rate differential": [
+                "" if np.isnan(x) else f"{x:+.2f}%" for x in refinance["break_even_rate"][rows]
+            ],
+            "Break-even switching cost": [
+                "" if np.isnan(x) else f"${x:,.0f}" for x in refinance["break_even_cost"][rows]
+            ],
+        }
+    )
+    return [
+        dmc.Paper(table(table_data, striped=True), px="sm", pt="sm"),
+        dmc.Space(h="lg"),
+        dmc.Paper(
+            dcc.Graph(
+                figure=plots.make_refinance_figure(refinance),
+                responsive=True,
+                style={"height": 400},
+                config={"displayModeBar": False},
+            ),
+            radius="md",
+            p="1rem",
+        ),
+    ]
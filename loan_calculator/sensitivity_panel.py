@@ -0,0 +1,58 @@
+import dash_mantine_components as dmc
+from dash import dcc, html
+from pydantic import ValidationError
+
+from loan_calculator import analytics, plots
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
+
+
+class ids:  # pylint: disable = invalid-name
+    """Sensitivity panel IDs"""
+
+    offer = "sensitivity_offer"
+    results = "sensitivity_results"
+
+
+def layout():
+    """Sensitivity panel layout"""
+    return [
+        dmc.Select(id=ids.offer, label="Offer", data=[], persistence=True, w=300),
+        dmc.Space(h="md"),
+        html.Div(id=ids.results),
+    ]
+
+
+def sensitivity_content(offer_name: str, project_data: dict, rates_change: dict, expenses: dict, loans_data: dict):
+    """Tornado chart of the sensitivities of the interest and fees paid on an offer of the book"""
+    if not offer_name or not loans_data:
+        return dmc.Text("Select an offer to see what its interest and fees are most sensitive to.", c="gray")
+    try:
+        project = Project(**project_data)
+        offer = Offer(**loans_data[offer_name])
+    except (ValidationError, TypeError, KeyError):
+        return dmc.Text("Complete the project and the offer to compute its sensitivities.", c="gray")
+
+    sensitivities = analytics.compute_sensitivities(
+        project=project,
+        offer=offer,
+        rates_change=RatesForecast(**rates_change),
+        expenses=FutureExpenses(**expenses),
+    )
+    return [
+        dmc.Text(
+            f"Interest & Fees paid over the loan: ${sensitivities['cost']:,.0f}, changes to first order",
+            size="sm",
+            c="gray",
+        ),
+        dmc.Space(h="xs"),
+        dmc.Paper(
+            dcc.Graph(
+                figure=plots.make_sensitivity_figure(sensitivities),
+                responsive=True,
+                style={"height": 120 + 40 * len(sensitivities["inputs"])},
+                config={"displayModeBar": False},
+            ),
+            radius="md",
+            p="1rem",
+        ),
+    ]
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows, the file store then only locks within the process
+    fcntl = None
+
+SESSION_STORE_ENV = "LOAN_CALCULATOR_SESSION_STORE"
+SESSION_KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+CACHE_SIZE = 1024
+
+
+class SessionStore(ABC):
+    """Server-side store of versioned session data.
+
+    Each (session, name) entry keeps its latest value and a version number that only increases when the value changes,
+    so that browsers can hold a small reference instead of the data itself.
+    """
+
+    def __init__(self):
+        self._cache: OrderedDict[tuple[str, str, int], Any] = OrderedDict()
+        self._cache_lock = Lock()
+
+    @staticmethod
+    def new_session() -> str:
+        """New session key"""
+        return uuid.uuid4().hex
+
+    def put(self, session: str, name: str, data: Any) -> int:
+        """Store data and return its version, unchanged if the data did not change
+
+        The version is read and written atomically across the workers sharing the store, so that concurrent changes
+        each get their own version.
+        """
+        self._validate(session, name)
+        serialised = json.dumps(data, sort_keys=True)
+        digest = hashlib.blake2b(serialised.encode(), digest_size=16).hexdigest()
+        return self._put(session, name, digest, serialised)
+
+    def get(self, session: str, name: str, version: int) -> Any:
+        """Data stored at a given version, None if missing or superseded"""
+        if not (isinstance(session, str) and SESSION_KEY_PATTERN.match(session) and isinstance(version, int)):
+            return None
+        return self._get(session, name, version)
+
+    def has(self, session: str, name: str, version: int) -> bool:
+        """Whether the data at a given version is available"""
+        return self.get(session, name, version) is not None
+
+    def _get(self, session: str, name: str, version: int) -> Any:
+        """Data stored at a given version, caching only the hits as the data of a version never changes
+
+        A miss is not cached, as the version may be written later, e.g. by another worker.
+        """
+        key = (session, name, version)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        current = self._read(session, name)
+        if current is None or current[0] != version:
+            return None
+        data = json.loads(current[2])
+        with self._cache_lock:
+            self._cache[key] = data
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return data
+
+    @staticmethod
+    def _validate(session: str, name: str):
+        if not (isinstance(session, str) and SESSION_KEY_PATTERN.match(session)):
+            raise ValueError(f"Invalid session key: {session!r}")
+        if not name.isidentifier():
+            raise ValueError(f"Invalid data name: {name!r}")
+
+    @abstractmethod
+    def _read(self, session: str, name: str) -> tuple[int, str, str] | None:
+        """Read the (version, digest, serialised data) of an entry"""
+
+    @abstractmethod
+    def _put(self, session: str, name: str, digest: str, serialised: str) -> int:
+        """Write an entry with the next version if its digest changed, in one transaction, and return its version"""
+
+    @staticmethod
+    def _next_version(current: tuple[int, str, str] | None, digest: str) -> tuple[int, bool]:
+        """Version of an entry written with a digest and whether it changes, from its (version, digest, data)"""
+        if current is not None and current[1] == digest:
+            return current[0], False
+        return (current[0] + 1 if current is not None else 1), True
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store in a local SQLite database."""
+
+    def __init__(self, path: str | Path):
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_data ("
+                "session TEXT, name TEXT, version INTEGER, digest TEXT, data TEXT, updated REAL, "
+                "PRIMARY KEY (session, name))"
+            )
+
+    def _read(self, session: str, name: str) -> tuple[int, str, str] | None:
+        with closing(sqlite3.connect(self.path)) as conn:
+            return conn.execute(
+                "SELECT version, digest, data FROM session_data WHERE session = ? AND name = ?", (session, name)
+            ).fetchone()
+
+    def _put(self, session: str, name: str, digest: str, serialised: str) -> int:
+        # BEGIN IMMEDIATE takes the write lock before the read, so that no other worker writes in between
+        with closing(sqlite3.connect(self.path, isolation_level=None)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = conn.execute(
+                    "SELECT version, digest, data FROM session_data WHERE session = ? AND name = ?", (session, name)
+                ).fetchone()
+                version, changed = self._next_version(current, digest)
+                if changed:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO session_data VALUES (?, ?, ?, ?, ?, ?)",
+                        (session, name, version, digest, serialised, time.time()),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return version
+
+
+class FileSessionStore(SessionStore):
+    """Session store as JSON files in a local directory."""
+
+    def __init__(self, path: str | Path):
+        super().__init__()
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+
+    def _read(self, session: str, name: str) -> tuple[int, str, str] | None:
+        try:
+            entry = json.loads((self.path / session / f"{name}.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        return entry["version"], entry["digest"], entry["data"]
+
+    def _put(self, session: str, name: str, digest: str, serialised: str) -> int:
+        file = self.path / session / f"{name}.json"
+        file.parent.mkdir(exist_ok=True)
+        # An exclusive lock on a lock file next to the entry, held by one worker at a time from the read to the rename
+        with self._lock, open(file.with_suffix(".lock"), "a", encoding="utf-8") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            version, changed = self._next_version(self._read(session, name), digest)
+            if changed:
+                tmp = file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+                tmp.write_text(json.dumps({"version": version, "digest": digest, "data": serialised}), encoding="utf-8")
+                tmp.replace(file)
+        return version
+
+
+@lru_cache
+def get_store() -> SessionStore | None:
+    """Session store configured with the LOAN_CALCULATOR_SESSION_STORE environment variable
+
+    The variable is either `sqlite://<path to database>` or `file://<path to directory>`. Without it, session data
+    only lives in the browser.
+    """
+    config = os.environ.get(SESSION_STORE_ENV)
+    if not config:
+        return None
+    scheme, _, path = config.partition("://")
+    if scheme == "sqlite":
+        return SQLiteSessionStore(path)
+    if scheme == "file":
+        return FileSessionStore(path)
+    raise ValueError(f"{SESSION_STORE_ENV} should start with sqlite:// or file://, got {config!r}")
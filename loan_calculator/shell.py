@@ -4,6 +4,7 @@ from dash_iconify import DashIconify
 from dash_pydantic_form import ModelForm, fields
 from dash_breakpoints import WindowBreakpoints
 
+from loan_calculator import timing
 from loan_calculator.data_models import FutureExpenses, Project, RatesForecast
 
 PRIMARY_COLOR = "yellow"
@@ -22,6 +23,9 @@ class ids:  # pylint: disable = invalid-name
     url = "main-url"
     trigger = "dummy_trigger_btn"
     breakpoints = "breakpoints"
+    session = "session-id"
+    # Tabs of the home page, shared with the panels only computed while visible
+    tabs = "home-tabs"
 
     @staticmethod
     def data_store(name): return {"type": "data-store", "aio_id": name}
@@ -168,6 +172,7 @@ def create_appshell():
         },
         children=[
             dcc.Store(id=ids.theme_store, storage_type="local"),
+            dcc.Store(id=ids.session, storage_type="session"),
             dcc.Location(id=ids.url, refresh="callback-nav"),
             dmc.NotificationProvider(zIndex=2000),
             html.Div(style={"display": "none"}, id=ids.trigger),
@@ -214,6 +219,18 @@ clientside_callback(
     Input(ids.theme_store, "data"),
 )
 
+clientside_callback(
+    """
+    function(_, session) {
+        if (session) return dash_clientside.no_update
+        return window.crypto?.randomUUID ? crypto.randomUUID() : Math.random().toString(36).slice(2) + Date.now()
+    }
+    """,
+    Output(ids.session, "data"),
+    Input(ids.session, "id"),
+    State(ids.session, "data"),
+)
+
 clientside_callback(
     """
     function(trigger, data) {
@@ -234,14 +251,22 @@ clientside_callback(
     State(ids.data_store(ALL), "data"),
     State(ids.breakpoints, "widthBreakpoint"),
 )
+@timing.timed("update_project_wrapper")
 def update_project_wrapper(_, data_stores, breakpoint):
     project_data, rates_data, expenses_data = data_stores
-    project = Project.model_construct(**(project_data or {}))
-    rates_forecast = RatesForecast.model_construct(**(rates_data or {}))
-    expenses = FutureExpenses.model_construct(**(expenses_data or {}))
+    with timing.span("models"):
+        project = Project.model_construct(**(project_data or {}))
+        rates_forecast = RatesForecast.model_construct(**(rates_data or {}))
+        expenses = FutureExpenses.model_construct(**(expenses_data or {}))
 
     children = [
-        ModelForm(project, aio_id="project", form_id="sidebar", debounce_inputs=500),
+        ModelForm(
+            project,
+            aio_id="project",
+            form_id="sidebar",
+            debounce_inputs=500,
+            fields_repr={"budget_changes": fields.Table(table_height=200)},
+        ),
         dmc.Space(h="md"),
         dmc.Accordion(
             [
@@ -0,0 +1,111 @@
+import logging
+from threading import Event, Lock
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_flights: dict[str, "SingleFlight"] = {}
+
+
+class Superseded(Exception):
+    """Raised when a request was superseded by a newer one from the same session."""
+
+
+class _Call:
+    """Computation in flight, shared by identical requests."""
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class _Session:
+    """Requests of a session, run one at a time so that stale ones can be dropped."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latest = 0
+        self.pending = 0
+
+
+class SingleFlight:
+    """Deduplicate and coalesce expensive computations.
+
+    Concurrent requests with the same key share a single computation. Requests of a same session run one after the
+    other and the ones superseded by a newer request of that session while waiting are dropped.
+    State is kept per process.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = {"requests": 0, "computed": 0, "shared": 0, "superseded": 0}
+        self._lock = Lock()
+        self._calls: dict[str, _Call] = {}
+        self._sessions: dict[str, _Session] = {}
+        _flights[name] = self
+
+    def do(self, key: str, func: Callable[[], Any], session: str = None) -> Any:
+        """Run func, or wait for the identical computation in flight
+
+        :param key: Key identifying identical requests
+        :param func: Computation to run
+        :param session: Session sending the request, if any
+        :raises Superseded: When a newer request of the same session arrived in the meantime
+        """
+        if session is None:
+            with self._lock:
+                self.stats["requests"] += 1
+            return self._do(key, func)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            state = self._sessions.setdefault(session, _Session())
+            state.latest += 1
+            state.pending += 1
+            sequence = state.latest
+        try:
+            with state.lock:
+                if state.latest != sequence:
+                    with self._lock:
+                        self.stats["superseded"] += 1
+                    logger.debug("%s: dropped superseded request from session %s", self.name, session)
+                    raise Superseded()
+                return self._do(key, func)
+        finally:
+            with self._lock:
+                state.pending -= 1
+                if not state.pending:
+                    del self._sessions[session]
+
+    def _do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["computed"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except Exception as exc:  # pylint: disable = broad-except
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            logger.debug("%s: sharing the computation in flight for %s", self.name, key)
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+def get_stats() -> dict[str, dict[str, int]]:
+    """Counters of all single flight layers of the process"""
+    return {name: dict(flight.stats) for name, flight in _flights.items()}
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from typing import Callable
+
+import numpy as np
+from flask import Response, g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Level of the timing log lines, e.g. WARNING to turn them off
+LOG_LEVEL_ENV = "LOAN_CALCULATOR_TIMING_LOG_LEVEL"
+# Number of recent requests the percentiles are computed on, per callback and stage
+WINDOW = 1000
+
+_durations: dict[tuple[str, str], deque] = defaultdict(lambda: deque(maxlen=WINDOW))
+_lock = Lock()
+
+
+def configure_logging():
+    """Log the timing JSON lines to stderr, at the level of the LOAN_CALCULATOR_TIMING_LOG_LEVEL environment variable
+
+    The lines are logged at INFO, dropped by the default WARNING level of the root logger, so the timing logger gets its
+    own handler and does not propagate to the handlers of the root logger, e.g. the ones of gunicorn.
+    """
+    logger.setLevel(os.environ.get(LOG_LEVEL_ENV, "INFO").upper())
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.propagate = False
+
+
+@contextmanager
+def span(stage: str):
+    """Time a stage of the callback being served, repeated spans of a stage adding up
+
+    The time of the spans nested in a span is left out of it, so that the stages add up to at most the callback time.
+    Does nothing outside of a callback decorated with `timed`, so that the instrumented code can run anywhere.
+    """
+    if not has_request_context() or "timing_spans" not in g:
+        yield
+        return
+    outer_nested, g.timing_nested = g.timing_nested, 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        g.timing_spans[stage] = g.timing_spans.get(stage, 0) + duration - g.timing_nested
+        g.timing_nested = outer_nested + duration
+
+
+def record(stage: str, duration: float):
+    """Add a duration measured elsewhere, in seconds, to a stage of the callback being served
+
+    For code that cannot depend on flask, e.g. `analytics` measuring its stages with `analytics.timed_stage`. The
+    duration is left out of the enclosing span like a nested span. Does nothing outside of a timed callback.
+    """
+    if not has_request_context() or "timing_spans" not in g:
+        return
+    g.timing_spans[stage] = g.timing_spans.get(stage, 0) + duration
+    g.timing_nested += duration
+
+
+def timed(name: str) -> Callable:
+    """Decorator recording the stage spans of a callback, see `span` and `record_response`"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not has_request_context():
+                return func(*args, **kwargs)
+            g.timing_callback, g.timing_spans, g.timing_nested = name, {}, 0
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                g.timing_end = time.perf_counter()
+                g.timing_total = g.timing_end - start
+
+        return wrapper
+
+    return decorator
+
+
+def record_response(response: Response) -> Response:
+    """Add the stage spans of the callback served to the response as a Server-Timing header, log and record them
+
+    The time of the callback not covered by a stage is "other", and the time from its return to the response, mostly
+    the serialisation of its outputs, is "serialisation".
+    """
+    if not has_request_context() or "timing_total" not in g:
+        return response
+    spans = dict(g.timing_spans)
+    spans["other"] = max(g.timing_total - sum(spans.values()), 0)
+    spans["serialisation"] = time.perf_counter() - g.timing_end
+    spans["total"] = g.timing_total + spans["serialisation"]
+
+    response.headers["Server-Timing"] = ", ".join(
+        f'{stage};desc="{g.timing_callback} {stage}";dur={1000 * duration:.2f}' for stage, duration in spans.items()
+    )
+    logger.info(
+        json.dumps(
+            {
+                "event": "callback_timing",
+                "callback": g.timing_callback,
+                "status": response.status_code,
+                **{f"{stage}_ms": round(1000 * duration, 3) for stage, duration in spans.items()},
+            }
+        )
+    )
+    with _lock:
+        for stage, duration in spans.items():
+            _durations[(g.timing_callback, stage)].append(duration)
+    return response
+
+
+def get_stats() -> dict[str, dict[str, dict[str, float]]]:
+    """Number of recorded requests and p50/p95/p99 durations in ms, per callback and stage"""
+    with _lock:
+        durations = {key: np.array(values) for key, values in _durations.items()}
+    stats = {}
+    for (callback, stage), values in sorted(durations.items()):
+        p50, p95, p99 = np.percentile(1000 * values, [50, 95, 99])
+        stats.setdefault(callback, {})[stage] = {
+            "count": int(values.shape[0]),
+            "p50": round(p50, 3),
+            "p95": round(p95, 3),
+            "p99": round(p99, 3),
+        }
+    return stats
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from loan_calculator import analytics
+
+
+def pytest_addoption(parser):
+    """Options of the test suite"""
+    parser.addoption(
+        "--update-golden",
+        action="store_true",
+        help="Record the golden outputs of the regression tests, after a deliberate change of the results",
+    )
+
+
+@pytest.fixture(autouse=True, scope="session")
+def pinned_historical_rates():
+    """Use the historical rates of the package, so that the results do not change with new rate decisions"""
+    previous = os.environ.get(analytics.HISTORICAL_RATES_ENV)
+    os.environ[analytics.HISTORICAL_RATES_ENV] = str(analytics.HISTORICAL_RATES_PATH)
+    analytics.read_historical_rates.cache_clear()
+    analytics.get_historical_rate_changes.cache_clear()
+    yield
+    if previous is None:
+        del os.environ[analytics.HISTORICAL_RATES_ENV]
+    else:
+        os.environ[analytics.HISTORICAL_RATES_ENV] = previous
+    analytics.read_historical_rates.cache_clear()
+    analytics.get_historical_rate_changes.cache_clear()
@@ -0,0 +1,76 @@
+from datetime import date
+
+import numpy as np
+
+from loan_calculator import analytics
+from loan_calculator.data_models import Expense, FutureExpenses, Offer, Project, RatesForecast
+
+MAX_REPAYMENT_SHARE = 30
+
+
+def test_affordability_meets_constraints():
+    """The largest property value and smallest deposit found keep the repayments under the share of income and the
+    savings non-negative, rather than being marginally over"""
+    project = Project(
+        property_value=800_000,
+        start_capital=250_000,
+        monthly_income=12_000,
+        monthly_costs=6_000,
+        settlement_date=date(2025, 1, 1),
+    )
+    expenses = FutureExpenses(expenses=[Expense(date=date(2030, 1, 1), value=50_000)])
+    offers = analytics.get_offer_columns(
+        [
+            Offer(name="A", rate=6, borrowed_share=80, loan_duration=30, with_offset_account=True),
+            Offer(name="B", rate=7, borrowed_share=90, loan_duration=25, yearly_fees=400),
+            Offer(
+                name="C",
+                rate=6.5,
+                borrowed_share=80,
+                loan_duration=30,
+                with_fixed_rate=True,
+                fixed_rate=5.5,
+                fixed_rate_duration=3,
+            ),
+        ]
+    )
+    affordability = analytics.solve_affordability(
+        project=project,
+        offers=offers,
+        rates_change=RatesForecast(),
+        expenses=expenses,
+        max_repayment_share=MAX_REPAYMENT_SHARE,
+    )
+
+    months = analytics.get_batch_months(project=project, offers=offers)
+    inputs = analytics.get_batch_inputs(
+        project=project,
+        offers=offers,
+        rate_delta=analytics.get_rate_delta_series(
+            months=months, rates_change=RatesForecast(), settlement_date=project.settlement_date
+        ),
+        expenses_series=analytics.get_expenses_series(months=months, expenses=expenses),
+    )
+    tranche_shares, _ = analytics.get_tranches(offers)
+    borrowed = offers["borrowed_share"] / 100
+
+    def margins(property_value: np.ndarray, deposit: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return analytics.get_affordability_margins(
+            project=project,
+            inputs=inputs,
+            principal=(property_value - deposit)[:, None] * tranche_shares,
+            upfront=deposit + property_value * project.stamp_duty_rate / 100,
+            max_repayment_share=MAX_REPAYMENT_SHARE,
+        )
+
+    max_property_value = affordability["max_property_value"]
+    assert np.all(np.isfinite(max_property_value))
+    ratio, shortfall = margins(max_property_value, max_property_value * (1 - borrowed))
+    assert np.all(ratio <= 0) and np.all(shortfall <= 0)
+
+    # NaN where the savings go negative at the project's property value
+    min_deposit = affordability["min_deposit"]
+    found = np.isfinite(min_deposit)
+    assert found.any()
+    ratio, shortfall = margins(np.full(3, project.property_value), np.nan_to_num(min_deposit))
+    assert np.all(ratio[found] <= 0) and np.all(shortfall[found] <= 0)
@@ -0,0 +1,70 @@
+from datetime import date
+
+import numpy as np
+
+from loan_calculator import analytics
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RatesForecast
+
+
+def test_backtest_interest_non_negative():
+    """The cuts replayed from the early history do not push the rates of low rate offers below zero"""
+    project = Project(
+        property_value=800_000,
+        start_capital=250_000,
+        monthly_income=12_000,
+        monthly_costs=6_000,
+        settlement_date=date(2025, 1, 1),
+    )
+    offers = [
+        Offer(name="A", rate=6, borrowed_share=80, loan_duration=30, with_offset_account=True),
+        Offer(name="B", rate=2, borrowed_share=80, loan_duration=30),
+        Offer(
+            name="C",
+            rate=2.5,
+            borrowed_share=80,
+            loan_duration=30,
+            with_fixed_rate=True,
+            fixed_rate=2,
+            fixed_rate_duration=3,
+        ),
+    ]
+    backtest = analytics.backtest_offers(
+        project=project,
+        offers=analytics.get_offer_columns(offers),
+        rates_change=RatesForecast(),
+        expenses=FutureExpenses(),
+    )
+    assert backtest["interest"].shape == (3, backtest["months"].shape[0])
+    assert np.all(backtest["interest"] >= 0)
+    assert np.all(backtest["fees"] >= 0)
+
+
+def test_backtest_matches_loan_timeseries_below_zero():
+    """The backtest and the loan timeseries hold the rates at zero the same way, here cuts of 13.75% on a 6% offer"""
+    project = Project(
+        property_value=800_000,
+        start_capital=250_000,
+        monthly_income=12_000,
+        monthly_costs=6_000,
+        settlement_date=date(1990, 6, 1),
+    )
+    offer = Offer(name="A", rate=6, borrowed_share=80, loan_duration=30)
+    inputs = analytics.get_loan_inputs(
+        project=project, offer=offer, rates_change=RatesForecast(), expenses=FutureExpenses()
+    )
+    rate_delta = analytics.get_rate_delta_series(
+        months=inputs["months"], rates_change=RatesForecast(), settlement_date=project.settlement_date
+    )
+    assert rate_delta.min() < -6
+
+    data, _ = analytics.compute_loan_timeseries(project=project, offer=offer, **inputs)
+    backtest = analytics.backtest_offers(
+        project=project,
+        offers=analytics.get_offer_columns([offer]),
+        rates_change=RatesForecast(),
+        expenses=FutureExpenses(),
+    )
+    start = np.flatnonzero(backtest["months"] == analytics.first_month_on_or_after(project.settlement_date))[0]
+    assert data["interest"].min() >= 0
+    np.testing.assert_allclose(backtest["interest"][0, start], data["interest"].sum(), rtol=1e-9)
+    np.testing.assert_allclose(backtest["fees"][0, start], data["fee"].sum(), rtol=1e-9)
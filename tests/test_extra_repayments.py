@@ -0,0 +1,57 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from loan_calculator import analytics
+from loan_calculator.data_models import Expense, FutureExpenses, Offer, Project, RateDelta, RatesForecast
+
+PROJECT = Project(
+    property_value=800_000,
+    start_capital=200_000,
+    monthly_income=12_000,
+    monthly_costs=4_000,
+    settlement_date=date(2026, 12, 1),
+    stamp_duty_rate=4,
+)
+RATES_CHANGE = RatesForecast(changes=[RateDelta(date=date(2029, 1, 1), value=1)])
+EXPENSES = FutureExpenses(expenses=[Expense(date=date(2031, 5, 10), value=80_000)])
+OFFERS = [
+    Offer(name="no_offset", rate=6, loan_duration=30, yearly_fees=400),
+    Offer(name="offset", rate=6, loan_duration=30, with_offset_account=True, yearly_fees=400),
+    Offer(
+        name="split",
+        rate=6,
+        loan_duration=30,
+        with_offset_account=True,
+        with_fixed_rate=True,
+        fixed_rate=5,
+        fixed_rate_duration=3,
+        fixed_share=50,
+        yearly_fees=400,
+    ),
+]
+
+
+@pytest.mark.parametrize("offer", OFFERS, ids=[offer.name for offer in OFFERS])
+def test_extra_repayments_affordable(offer):
+    """The best plan lowers the cost while the savings still pay for the expenses"""
+    plan = analytics.optimise_extra_repayments(
+        project=PROJECT, offer=offer, rates_change=RATES_CHANGE, expenses=EXPENSES
+    )
+    inputs = analytics.get_loan_inputs(project=PROJECT, offer=offer, rates_change=RATES_CHANGE, expenses=EXPENSES)
+    data, _ = analytics.compute_loan_timeseries(
+        project=PROJECT, offer=offer, **inputs, extra_repayment=plan["extra_repayment"]
+    )
+    income, costs = analytics.get_budget_series(months=inputs["months"], project=PROJECT)
+    start_savings = (
+        PROJECT.start_capital - PROJECT.property_value * (100 - offer.borrowed_share + PROJECT.stamp_duty_rate) / 100
+    )
+    savings = start_savings + np.cumsum(
+        income - costs - inputs["expenses_series"] - data["repayment"] - data["extra_repayment"]
+    )
+
+    assert plan["cost"] < plan["base_cost"]
+    assert data[["interest", "fee"]].to_numpy().sum() == pytest.approx(plan["cost"])
+    assert savings.min() >= -0.01
+    assert plan["lowest_savings"] == pytest.approx(min(savings.min(), start_savings))
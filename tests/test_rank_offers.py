@@ -0,0 +1,84 @@
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from loan_calculator import analytics
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RateDelta, RatesForecast
+
+PROJECT = Project(
+    property_value=800_000,
+    start_capital=250_000,
+    monthly_income=12_000,
+    monthly_costs=6_000,
+    settlement_date=date(2025, 1, 1),
+)
+
+
+def get_offers(n_offers: int, seed: int = 0) -> list[Offer]:
+    """Varied offers: fixed rate, split, with and without offset account"""
+    rng = random.Random(seed)
+    offers = []
+    for i in range(n_offers):
+        fields = {}
+        if i % 3 == 0:
+            fields = {
+                "with_fixed_rate": True,
+                "fixed_rate": round(rng.uniform(1, 6), 2),
+                "fixed_rate_duration": rng.choice([2, 3, 5]),
+            }
+            if i % 7 == 0:
+                fields["fixed_share"] = 50
+        offers.append(
+            Offer(
+                name=f"Offer {i}",
+                rate=round(rng.uniform(1, 7), 2),
+                borrowed_share=rng.choice([70, 80, 90]),
+                loan_duration=rng.choice([25, 30]),
+                yearly_fees=rng.choice([0, 250, 400]),
+                with_offset_account=i % 2 == 0,
+                **fields,
+            )
+        )
+    return offers
+
+
+@pytest.mark.parametrize("years", [None, 10])
+@pytest.mark.parametrize(
+    "rates_change",
+    [RatesForecast(), RatesForecast(changes=[RateDelta(date=date(2028, 1, 1), value=-6)])],
+    ids=["no_change", "negative_delta"],
+)
+def test_rank_offers_matches_brute_force(rates_change, years):
+    """The pruned ranking finds the same top offers as simulating them all, the bounds never exceeding the costs"""
+    offers = analytics.get_offer_columns(get_offers(300))
+    months = analytics.get_batch_months(project=PROJECT, offers=offers)
+    rate_delta = analytics.get_rate_delta_series(
+        months=months, rates_change=rates_change, settlement_date=PROJECT.settlement_date
+    )
+    expenses_series = analytics.get_expenses_series(months=months, expenses=FutureExpenses())
+    data = analytics.calculate_repayments_batch(
+        **analytics.get_batch_inputs(
+            project=PROJECT, offers=offers, rate_delta=rate_delta, expenses_series=expenses_series
+        )
+    )
+    horizon = months.shape[0] if years is None else years * 12
+    costs = data[:, analytics.COST_COLUMNS, :horizon].sum(axis=(1, 2))
+    bounds = analytics.get_cost_lower_bounds(
+        project=PROJECT, offers=offers, rate_delta=rate_delta, expenses_series=expenses_series, years=years
+    )
+    assert np.all(bounds <= costs + 1e-6)
+
+    positions, best_costs, _ = analytics.rank_offers(
+        project=PROJECT,
+        offers=offers,
+        rates_change=rates_change,
+        expenses=FutureExpenses(),
+        k=10,
+        years=years,
+        chunk_size=32,
+    )
+    expected = np.argsort(costs, kind="stable")[:10]
+    np.testing.assert_array_equal(positions, expected)
+    np.testing.assert_allclose(best_costs, costs[expected])
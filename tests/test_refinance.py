@@ -0,0 +1,58 @@
+from datetime import date
+
+import pytest
+
+from loan_calculator import analytics
+from loan_calculator.data_models import FutureExpenses, Offer, Project, RateDelta, RatesForecast
+
+PROJECT = Project(
+    property_value=800_000,
+    start_capital=250_000,
+    monthly_income=12_000,
+    monthly_costs=6_000,
+    settlement_date=date(2026, 1, 1),
+)
+RATES_CHANGE = RatesForecast(changes=[RateDelta(date=date(2028, 1, 1), value=0.5)])
+
+
+@pytest.mark.parametrize("with_offset_account", [False, True])
+@pytest.mark.parametrize("switching_cost", [0, 2_000])
+def test_refinance_paths_agree(with_offset_account, switching_cost):
+    """A single switch saves the same in the refinance surface and in the refinance chain"""
+    offer = Offer(name="current", rate=6.5, loan_duration=30, with_offset_account=with_offset_account, yearly_fees=300)
+    new_offer = Offer(
+        name="new",
+        rate=5.8,
+        loan_duration=30,
+        with_offset_account=with_offset_account,
+        with_fixed_rate=True,
+        fixed_rate=5.2,
+        fixed_rate_duration=2,
+        yearly_fees=100,
+    )
+    expenses = FutureExpenses()
+    switch_month = 36
+    refinance = analytics.compute_refinance(
+        project=PROJECT,
+        offer=offer,
+        new_offer=new_offer,
+        rates_change=RATES_CHANGE,
+        expenses=expenses,
+        switch_months=[switch_month],
+        rate_differentials=[0],
+        switching_cost=switching_cost,
+    )
+    stay, _ = analytics.compute_loan_timeseries(
+        project=PROJECT, offer=offer, rates_change=RATES_CHANGE, expenses=expenses
+    )
+    switch_date = analytics.month_index(stay.index[[switch_month]])[0].date()
+    chain, _ = analytics.compute_refinance_chain(
+        project=PROJECT,
+        offer=offer,
+        switches=[(switch_date, new_offer)],
+        rates_change=RATES_CHANGE,
+        expenses=expenses,
+        switching_cost=switching_cost,
+    )
+    chain_savings = stay[["interest", "fee"]].to_numpy().sum() - chain[["interest", "fee"]].to_numpy().sum()
+    assert refinance["savings"][0, 0] == pytest.approx(chain_savings, abs=0.01)
@@ -0,0 +1,181 @@
+"""Numerical regression tests of the loan engine against its golden outputs over a matrix of cases
+
+The float mode must match within tolerances, the exact mode to the cent and the batch kernel the single loan one.
+`pytest --update-golden` records the golden outputs, after a deliberate change of the results.
+"""
+import itertools
+import json
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from loan_calculator import analytics
+from loan_calculator.data_models import BudgetChange, Expense, FutureExpenses, Offer, Project, RateDelta, RatesForecast
+
+GOLDEN_PATH = Path(__file__).with_name("regression_golden.json")
+# Tolerances of the float mode, allowing for the reorderings of fastmath. The exact mode must match to the cent.
+RTOL = 1e-9
+ATOL = 1e-6
+# Largest difference between the exact and float modes of the balances and totals, mostly the repayments rounded up
+MAX_DIVERGENCE = 50
+# Columns of the golden outputs, the state at the end of each year of the loan and the flows summed over it
+STATE_COLUMNS = ["principal_paid", "offset"]
+FLOW_COLUMNS = ["interest", "fee", "repayment", "extra_repayment", "outflow_present_value"]
+
+PROJECT = {"property_value": 800_000, "start_capital": 250_000, "monthly_income": 12_000, "monthly_costs": 6_000}
+OFFER = {"rate": 6.0, "borrowed_share": 80, "loan_duration": 30, "yearly_fees": 300}
+SETTLEMENT_DATES = {"past": date(2015, 3, 1), "future": date(2040, 1, 1)}
+RATES_CHANGE = RatesForecast(
+    changes=[RateDelta(date=date(2041, 6, 1), value=1), RateDelta(date=date(2046, 1, 1), value=-0.5)]
+)
+
+
+def get_cases() -> dict[str, dict]:
+    """Matrix of engine inputs, by case name
+
+    The cases cross the offset account, a fixed rate period, past and future settlement dates, and large expenses
+    (more than the offset balance), plus cases of split loans, weekly repayments with daily interest, interest only
+    periods and budget changes. Each case holds the keyword arguments of `analytics.compute_loan_timeseries`.
+    """
+    cases = {}
+    for with_offset_account, with_fixed_rate, settlement, large_expenses in itertools.product(
+        [False, True], [False, True], list(SETTLEMENT_DATES), [False, True]
+    ):
+        name = "-".join(
+            [
+                "offset" if with_offset_account else "no_offset",
+                "fixed" if with_fixed_rate else "variable",
+                settlement,
+                "large_expenses" if large_expenses else "no_expenses",
+            ]
+        )
+        settlement_date = SETTLEMENT_DATES[settlement]
+        expenses = [
+            Expense(date=settlement_date.replace(year=settlement_date.year + 3), value=150_000),
+            Expense(date=settlement_date.replace(year=settlement_date.year + 10), value=50_000),
+        ]
+        cases[name] = {
+            "project": Project(**PROJECT, settlement_date=settlement_date),
+            "offer": Offer(
+                name=name,
+                **OFFER,
+                with_offset_account=with_offset_account,
+                with_fixed_rate=with_fixed_rate,
+                fixed_rate=5.5 if with_fixed_rate else None,
+                fixed_rate_duration=3 if with_fixed_rate else None,
+            ),
+            "rates_change": RATES_CHANGE,
+            "expenses": FutureExpenses(expenses=expenses if large_expenses else []),
+        }
+
+    project = Project(**PROJECT, settlement_date=SETTLEMENT_DATES["future"])
+    features = {
+        "split-weekly-daily_interest": {
+            "with_offset_account": True,
+            "with_fixed_rate": True,
+            "fixed_rate": 5.5,
+            "fixed_rate_duration": 5,
+            "fixed_share": 60,
+            "repayment_frequency": "weekly",
+            "daily_interest": True,
+        },
+        "interest_only-fortnightly": {
+            "with_offset_account": True,
+            "interest_only_duration": 5,
+            "repayment_frequency": "fortnightly",
+        },
+    }
+    for name, fields in features.items():
+        cases[name] = {
+            "project": project,
+            "offer": Offer(name=name, **OFFER, **fields),
+            "rates_change": RATES_CHANGE,
+            "expenses": FutureExpenses(),
+        }
+    cases["budget-discount"] = {
+        "project": project.model_copy(
+            update={
+                "income_growth": 3,
+                "costs_growth": 2.5,
+                "budget_changes": [BudgetChange(date=date(2043, 1, 1), income=-4_000)],
+                "discount_rate": 5,
+                "inflation_rate": 3,
+            }
+        ),
+        "offer": Offer(name="budget-discount", **OFFER, with_offset_account=True),
+        "rates_change": RATES_CHANGE,
+        "expenses": FutureExpenses(),
+    }
+    return cases
+
+
+def summarise(data: pd.DataFrame) -> dict[str, list[float]]:
+    """Golden outputs of a loan: the state at the end of each year and the flows summed over each year"""
+    years = np.arange(len(data)) // 12
+    return {
+        **{column: data[column].groupby(years).last().tolist() for column in STATE_COLUMNS},
+        **{column: data[column].groupby(years).sum().tolist() for column in FLOW_COLUMNS},
+    }
+
+
+def compute_outputs(case: dict) -> dict[str, dict[str, list[float]]]:
+    """Golden outputs of a case in the float and exact modes"""
+    return {
+        "float": summarise(analytics.compute_loan_timeseries(**case)[0]),
+        "exact": summarise(analytics.compute_loan_timeseries(**case, exact=True)[0]),
+    }
+
+
+CASES = get_cases()
+
+
+@pytest.fixture(name="golden", scope="module")
+def fixture_golden(request) -> dict:
+    """Golden outputs by case name, recorded first with the --update-golden option"""
+    if request.config.getoption("--update-golden"):
+        golden = {name: compute_outputs(case) for name, case in CASES.items()}
+        GOLDEN_PATH.write_text(json.dumps(golden, indent=1) + "\n", encoding="utf-8")
+    return json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_golden_outputs(name, golden):
+    """The float mode matches the golden outputs within RTOL and ATOL and the exact mode to the cent"""
+    assert name in golden, "no golden outputs, record them with `pytest --update-golden`"
+    for mode, columns in compute_outputs(CASES[name]).items():
+        for column, values in columns.items():
+            values, expected = np.asarray(values), np.asarray(golden[name][mode][column])
+            assert values.shape == expected.shape, f"{mode} {column}"
+            if mode == "exact":
+                np.testing.assert_array_equal(np.round(values * 100), np.round(expected * 100), f"{mode} {column}")
+            else:
+                np.testing.assert_allclose(values, expected, rtol=RTOL, atol=ATOL, err_msg=f"{mode} {column}")
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_batch_matches_single_loan(name):
+    """The batch kernel matches the float mode of the single loan kernel within RTOL and ATOL"""
+    case = CASES[name]
+    data, _ = analytics.compute_loan_timeseries(**case)
+    expected = data[analytics.REPAYMENT_COLUMNS].to_numpy().T
+    _, batch = analytics.compute_loans_batch(
+        project=case["project"],
+        offers=analytics.get_offer_columns([case["offer"]]),
+        rates_change=case["rates_change"],
+        expenses=case["expenses"],
+    )
+    np.testing.assert_allclose(batch[0, :, : expected.shape[1]], expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_exact_mode_divergence(name):
+    """The exact mode, in whole cents, stays within MAX_DIVERGENCE of the float mode"""
+    float_data, _ = analytics.compute_loan_timeseries(**CASES[name])
+    exact_data, _ = analytics.compute_loan_timeseries(**CASES[name], exact=True)
+    for column in STATE_COLUMNS:
+        assert (exact_data[column] - float_data[column]).abs().max() < MAX_DIVERGENCE, column
+    for column in FLOW_COLUMNS:
+        assert abs(exact_data[column].sum() - float_data[column].sum()) < MAX_DIVERGENCE, column
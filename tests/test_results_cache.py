@@ -0,0 +1,136 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from loan_calculator import analytics
+from loan_calculator.data_models import Expense, FutureExpenses, Offer, Project, RateDelta, RatesForecast
+
+PROJECT = Project(
+    property_value=800_000,
+    start_capital=250_000,
+    monthly_income=12_000,
+    monthly_costs=6_000,
+    settlement_date=date(2025, 1, 1),
+)
+# Whole loan at a fixed rate until 2030, the rates only matter after
+FIXED = Offer(
+    name="fixed",
+    rate=6,
+    borrowed_share=80,
+    loan_duration=30,
+    with_fixed_rate=True,
+    fixed_rate=5.5,
+    fixed_rate_duration=5,
+)
+OFFSET = Offer(name="offset", rate=6, borrowed_share=80, loan_duration=30, with_offset_account=True)
+NO_OFFSET = Offer(name="no_offset", rate=6, borrowed_share=80, loan_duration=30)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start each test with an empty results cache"""
+    analytics._results_cache.clear()  # pylint: disable = protected-access
+
+
+def get_rates(*changes: tuple[date, float]) -> RatesForecast:
+    """Rates forecast from (date, value) pairs"""
+    return RatesForecast(changes=[RateDelta(date=change_date, value=value) for change_date, value in changes])
+
+
+def get_expenses(*values: tuple[date, float]) -> FutureExpenses:
+    """Future expenses from (date, value) pairs"""
+    return FutureExpenses(expenses=[Expense(date=expense_date, value=value) for expense_date, value in values])
+
+
+def compute_loan(offer: Offer, rates_change: RatesForecast, future_expenses: FutureExpenses, project=PROJECT):
+    """Cached loan timeseries of an offer"""
+    return analytics.compute_loans(
+        project=project, offers=[offer], rates_change=rates_change, expenses=future_expenses
+    )[0][0]
+
+
+@pytest.mark.parametrize(
+    "offer, before, after",
+    [
+        # Rate change within the fixed rate period, reverted before its end
+        (
+            FIXED,
+            (get_rates((date(2027, 1, 1), 1), (date(2029, 1, 1), 0)), get_expenses()),
+            (get_rates((date(2027, 1, 1), 2), (date(2029, 1, 1), 0)), get_expenses()),
+        ),
+        # Rate change after the end of the loan
+        (
+            NO_OFFSET,
+            (get_rates((date(2060, 1, 1), 1)), get_expenses()),
+            (get_rates((date(2060, 1, 1), 2)), get_expenses()),
+        ),
+        # Expense without offset account
+        (
+            NO_OFFSET,
+            (get_rates(), get_expenses((date(2030, 1, 1), 50_000))),
+            (get_rates(), get_expenses((date(2030, 1, 1), 80_000))),
+        ),
+    ],
+    ids=["fixed_rate_period", "after_loan", "expense_no_offset"],
+)
+def test_change_outside_kept(offer, before, after):
+    """A change outside of the dependencies of a loan serves the cached result, equal to a fresh computation"""
+    cached = compute_loan(offer, *before)
+    assert compute_loan(offer, *after) is cached
+    fresh, _ = analytics.compute_loan_timeseries(project=PROJECT, offer=offer, rates_change=after[0], expenses=after[1])
+    pd.testing.assert_frame_equal(cached, fresh)
+
+
+@pytest.mark.parametrize(
+    "offer, before, after",
+    [
+        # Rate change after the fixed rate period
+        (FIXED, (get_rates((date(2031, 1, 1), 1)), get_expenses()), (get_rates((date(2031, 1, 1), 2)), get_expenses())),
+        # Rate change of a variable loan
+        (
+            NO_OFFSET,
+            (get_rates((date(2027, 1, 1), 1)), get_expenses()),
+            (get_rates((date(2027, 1, 1), 2)), get_expenses()),
+        ),
+        # Expense with offset account
+        (
+            OFFSET,
+            (get_rates(), get_expenses((date(2030, 1, 1), 50_000))),
+            (get_rates(), get_expenses((date(2030, 1, 1), 80_000))),
+        ),
+    ],
+    ids=["after_fixed_rate_period", "variable_rate", "expense_offset"],
+)
+def test_change_inside_recomputed(offer, before, after):
+    """A change within the dependencies of a loan computes it again"""
+    cached = compute_loan(offer, *before)
+    result = compute_loan(offer, *after)
+    assert result is not cached
+    fresh, _ = analytics.compute_loan_timeseries(project=PROJECT, offer=offer, rates_change=after[0], expenses=after[1])
+    pd.testing.assert_frame_equal(result, fresh)
+    assert result["interest"].sum() != cached["interest"].sum()
+
+
+def test_analysis_depends_on_budget():
+    """The analyses cached per offer depend on the budget even without offset account, unlike the loans"""
+    calls = []
+
+    def analysis(*, project, offer, rates_change, expenses):  # pylint: disable = unused-argument
+        calls.append(offer.name)
+        return {"monthly_income": project.monthly_income}
+
+    def analyse(project: Project, rates_change: RatesForecast):
+        return analytics.compute_by_offer(
+            analysis, project=project, offers=[FIXED], rates_change=rates_change, expenses=FutureExpenses()
+        )[0]
+
+    richer = PROJECT.model_copy(update={"monthly_income": 15_000})
+    assert analyse(PROJECT, get_rates((date(2027, 1, 1), 1), (date(2029, 1, 1), 0))) == {"monthly_income": 12_000}
+    assert analyse(PROJECT, get_rates((date(2027, 1, 1), 2), (date(2029, 1, 1), 0))) == {"monthly_income": 12_000}
+    assert calls == ["fixed"]
+    assert analyse(richer, get_rates()) == {"monthly_income": 15_000}
+    assert calls == ["fixed", "fixed"]
+    assert compute_loan(NO_OFFSET, get_rates(), get_expenses(), project=richer) is compute_loan(
+        NO_OFFSET, get_rates(), get_expenses()
+    )
@@ -0,0 +1,84 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from loan_calculator import analytics
+from loan_calculator.data_models import Expense, FutureExpenses, Offer, Project, RatesForecast
+
+PROJECT = Project(
+    property_value=800_000,
+    start_capital=250_000,
+    monthly_income=12_000,
+    monthly_costs=6_000,
+    settlement_date=date(2025, 1, 1),
+)
+EXPENSES = FutureExpenses(expenses=[Expense(date=date(2030, 3, 1), value=60_000)])
+OFFERS = {
+    "variable": Offer(name="variable", rate=6, borrowed_share=80, loan_duration=30, yearly_fees=300),
+    "fixed": Offer(
+        name="fixed",
+        rate=6,
+        borrowed_share=80,
+        loan_duration=30,
+        with_fixed_rate=True,
+        fixed_rate=5.5,
+        fixed_rate_duration=3,
+    ),
+    "offset": Offer(name="offset", rate=6, borrowed_share=80, loan_duration=30, with_offset_account=True),
+    "split": Offer(
+        name="split",
+        rate=6,
+        borrowed_share=80,
+        loan_duration=30,
+        with_offset_account=True,
+        with_fixed_rate=True,
+        fixed_rate=5.5,
+        fixed_rate_duration=5,
+        fixed_share=60,
+    ),
+}
+# Share of each bump used for the finite differences
+STEP = 1e-3
+
+
+def get_cost(project: Project, offer: Offer, expenses: FutureExpenses, rate_bump: float = 0) -> float:
+    """Interest and fees paid over the loan, the rates moved by rate_bump % points where they are not held at zero"""
+    inputs = analytics.get_loan_inputs(project=project, offer=offer, rates_change=RatesForecast(), expenses=expenses)
+    monthly_rate = inputs["monthly_rate"]
+    inputs["monthly_rate"] = np.where(monthly_rate > 0, monthly_rate + rate_bump / 12 / 100, monthly_rate)
+    data, _ = analytics.compute_loan_timeseries(project=project, offer=offer, **inputs)
+    return data[[analytics.REPAYMENT_COLUMNS[column] for column in analytics.COST_COLUMNS]].to_numpy().sum()
+
+
+def bumped_cost(offer: Offer, index: int, step: float) -> float:
+    """Cost with the input `index` of `compute_sensitivities` bumped by `step` times its bump"""
+    if index == 0:
+        return get_cost(PROJECT, offer, EXPENSES, rate_bump=step)
+    if index == 1:
+        return get_cost(PROJECT, offer.model_copy(update={"borrowed_share": offer.borrowed_share + 5 * step}), EXPENSES)
+    if index == 2:
+        return get_cost(PROJECT, offer.model_copy(update={"yearly_fees": offer.yearly_fees + 100 * step}), EXPENSES)
+    if index == 3:
+        project = PROJECT.model_copy(update={"monthly_income": PROJECT.monthly_income * (1 + 0.1 * step)})
+        return get_cost(project, offer, EXPENSES)
+    expenses = FutureExpenses(
+        expenses=[
+            expense.model_copy(update={"value": expense.value * (1 + 0.1 * step)}) for expense in EXPENSES.expenses
+        ]
+    )
+    return get_cost(PROJECT, offer, expenses)
+
+
+@pytest.mark.parametrize("name", list(OFFERS))
+def test_finite_differences(name):
+    """The derivatives of the dual number kernel match central finite differences of the loan engine"""
+    offer = OFFERS[name]
+    sensitivities = analytics.compute_sensitivities(
+        project=PROJECT, offer=offer, rates_change=RatesForecast(), expenses=EXPENSES
+    )
+    assert sensitivities["cost"] == pytest.approx(get_cost(PROJECT, offer, EXPENSES), rel=1e-9)
+    assert len(sensitivities["inputs"]) == 5
+    for index, impact in enumerate(sensitivities["impact"]):
+        expected = (bumped_cost(offer, index, STEP) - bumped_cost(offer, index, -STEP)) / (2 * STEP)
+        assert impact == pytest.approx(expected, rel=1e-4, abs=1e-2), sensitivities["inputs"][index]
@@ -0,0 +1,76 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from loan_calculator.session_store import FileSessionStore, SQLiteSessionStore
+
+N_WORKERS = 4
+N_PUTS = 25
+
+
+def open_store(kind: str, path) -> SQLiteSessionStore | FileSessionStore:
+    """Session store of a kind in a directory"""
+    if kind == "sqlite":
+        return SQLiteSessionStore(path / "sessions.db")
+    return FileSessionStore(path / "sessions")
+
+
+def put_many(kind: str, path, session: str, worker: int) -> list[int]:
+    """Versions of N_PUTS changes of the same entry by a worker process"""
+    store = open_store(kind, path)
+    return [store.put(session, "loans", {"worker": worker, "put": i}) for i in range(N_PUTS)]
+
+
+@pytest.fixture(name="store", params=["sqlite", "file"])
+def fixture_store(request, tmp_path):
+    """Empty session store of each kind"""
+    return open_store(request.param, tmp_path)
+
+
+def test_put_get(store):
+    """The version only increases when the data changes"""
+    session = store.new_session()
+    version = store.put(session, "loans", {"a": 1})
+    assert store.get(session, "loans", version) == {"a": 1}
+    assert store.put(session, "loans", {"a": 1}) == version
+    assert store.put(session, "loans", {"a": 2}) == version + 1
+    assert store.get(session, "loans", version + 1) == {"a": 2}
+
+
+def test_write_after_miss(store):
+    """A version looked up before it is written is found once written"""
+    session = store.new_session()
+    assert not store.has(session, "loans", 1)
+    assert store.get(session, "loans", 1) is None
+    assert store.put(session, "loans", {"a": 1}) == 1
+    assert store.has(session, "loans", 1)
+    assert store.get(session, "loans", 1) == {"a": 1}
+
+
+def test_write_by_other_worker(tmp_path):
+    """A version missed by a worker is found once another worker writes it"""
+    worker, other_worker = SQLiteSessionStore(tmp_path / "sessions.db"), SQLiteSessionStore(tmp_path / "sessions.db")
+    session = worker.new_session()
+    assert not worker.has(session, "loans", 1)
+    other_worker.put(session, "loans", {"a": 1})
+    assert worker.get(session, "loans", 1) == {"a": 1}
+
+
+def test_invalid_session(store):
+    """Invalid session keys are never read nor written"""
+    assert store.get("../etc", "loans", 1) is None
+    with pytest.raises(ValueError):
+        store.put("../etc", "loans", {})
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "file"])
+def test_concurrent_workers(kind, tmp_path):
+    """Changes of the same entry by concurrent worker processes each get their own version, none is lost"""
+    session = open_store(kind, tmp_path).new_session()
+    with ProcessPoolExecutor(N_WORKERS, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(put_many, kind, tmp_path, session, worker) for worker in range(N_WORKERS)]
+        versions = sorted(version for future in futures for version in future.result())
+    assert versions == list(range(1, N_WORKERS * N_PUTS + 1))
+    latest = open_store(kind, tmp_path).get(session, "loans", versions[-1])
+    assert latest is not None and latest["put"] == N_PUTS - 1
@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+
+from loan_calculator.single_flight import SingleFlight, Superseded
+
+N_THREADS = 8
+TIMEOUT = 10
+
+
+def wait_until(predicate, timeout: float = TIMEOUT):
+    """Wait for a condition set by other threads"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def blocking(started: Event, release: Event, result=None, error: Exception = None):
+    """Computation signalling its start and waiting to be released"""
+
+    def func():
+        started.set()
+        assert release.wait(TIMEOUT)
+        if error is not None:
+            raise error
+        return result
+
+    return func
+
+
+def test_identical_calls_shared():
+    """Concurrent calls with the same key run the computation once and all get its result"""
+    flight = SingleFlight("test_shared")
+    started, release = Event(), Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        return blocking(started, release, result={"value": 1})()
+
+    with ThreadPoolExecutor(N_THREADS) as executor:
+        futures = [executor.submit(flight.do, "key", func) for _ in range(N_THREADS)]
+        wait_until(lambda: flight.stats["shared"] == N_THREADS - 1)
+        release.set()
+        results = [future.result(TIMEOUT) for future in futures]
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results) and results[0] == {"value": 1}
+    assert flight.stats == {"requests": N_THREADS, "computed": 1, "shared": N_THREADS - 1, "superseded": 0}
+
+
+def test_different_keys_computed():
+    """Calls with different keys do not share their computations"""
+    flight = SingleFlight("test_keys")
+    assert [flight.do(str(i), lambda i=i: i) for i in range(3)] == [0, 1, 2]
+    assert flight.stats["computed"] == 3
+
+
+def test_stale_requests_superseded():
+    """A request of a session waiting behind a running one is dropped when a newer request of the session arrives"""
+    flight = SingleFlight("test_superseded")
+    started, release = Event(), Event()
+    with ThreadPoolExecutor(3) as executor:
+        running = executor.submit(flight.do, "first", blocking(started, release, result="first"), session="s")
+        assert started.wait(TIMEOUT)
+        stale = executor.submit(flight.do, "second", lambda: "second", session="s")
+        wait_until(lambda: flight.stats["requests"] == 2)
+        latest = executor.submit(flight.do, "third", lambda: "third", session="s")
+        wait_until(lambda: flight.stats["requests"] == 3)
+        release.set()
+        assert running.result(TIMEOUT) == "first"
+        with pytest.raises(Superseded):
+            stale.result(TIMEOUT)
+        assert latest.result(TIMEOUT) == "third"
+    assert flight.stats["superseded"] == 1
+
+
+def test_leader_exception_passed_through():
+    """An exception of the shared computation is raised to the leader and to every caller waiting for it"""
+    flight = SingleFlight("test_exception")
+    started, release = Event(), Event()
+    func = blocking(started, release, error=ValueError("failed"))
+    with ThreadPoolExecutor(N_THREADS) as executor:
+        futures = [executor.submit(flight.do, "key", func) for _ in range(N_THREADS)]
+        wait_until(lambda: flight.stats["shared"] == N_THREADS - 1)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="failed"):
+                future.result(TIMEOUT)
+    assert flight.stats["computed"] == 1
+    # The failed computation is not kept, the next call runs again
+    assert flight.do("key", lambda: "ok") == "ok"